@@ -5,8 +5,11 @@ This is the main driver module for APA102 LEDs
 License: GPL V2
 """
 
-import spidev
 from math import ceil
+from .apa102transport import Transport, SpidevTransport, get_transport
+from . import colors
+from .ledsstats import Histogram
+from .timing import monotonic
 
 RGB_MAP = { 'rgb': [3, 2, 1], 'rbg': [3, 1, 2], 'grb': [2, 3, 1],
             'gbr': [2, 1, 3], 'brg': [1, 3, 2], 'bgr': [1, 2, 3] }
@@ -22,6 +25,11 @@ class APA102:
     Public methods are:
      - set_pixel
      - set_pixel_rgb
+     - set_pixels
+     - encode_pixels
+     - get_pixels
+     - load_pixels
+     - set_brightness
      - show
      - clear_strip
      - cleanup
@@ -76,24 +84,96 @@ class APA102:
     # Constants
     MAX_BRIGHTNESS = 0b11111 # Safeguard: Set to a value appropriate for your setup
     LED_START = 0b11100000 # Three "1" bits, followed by 5 brightness bits
+    START_FRAME_SIZE = 4 # 32 zero bits
+    END_FRAME_SIZE = 4 # At least 32 one bits
+    TRANSFER_BOUNDS = (0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0) # ms
 
     def __init__(self, num_led, global_brightness=MAX_BRIGHTNESS,
-                 order='rgb', bus=0, device=1, max_speed_hz=8000000):
+                 order='rgb', bus=0, device=1, max_speed_hz=8000000, gamma=1.0,
+                 transport=None):
         self.num_led = num_led  # The number of LEDs in the Strip
         order = order.lower()
-        self.rgb = RGB_MAP.get(order, RGB_MAP['rgb'])
+        self.order = order if order in RGB_MAP else 'rgb'
+        self.rgb = RGB_MAP[self.order]
+        # Gamma correction applied to colors and brightness (1.0 disables it)
+        self.gamma = gamma
+        # Color lookup table: 8 bits channel value to gamma corrected value
+        self.gamma_table = bytearray([int(round(255 * (value / 255.0) ** self.gamma)) for value in range(256)])
+        self.__gamma_bytes = bytes(self.gamma_table)
+        self.set_brightness(global_brightness)
+
+        # End frame needs num_led/2 additional clock edges (see clock_end_frame)
+        self.end_frame_size = max(self.END_FRAME_SIZE, (self.num_led + 15) // 16)
+
+        # Frame buffer holding start frame, pixel data and end frame so the
+        # whole strip is clocked out in a single transfer
+        self.frame = bytearray(self.START_FRAME_SIZE + 4 * self.num_led + self.end_frame_size)
+        self.frame[-self.end_frame_size:] = b'\xff' * self.end_frame_size
+        self.frame[self.START_FRAME_SIZE:self.START_FRAME_SIZE + 4 * self.num_led:4] = bytearray([self.LED_START]) * self.num_led
+        self.leds = memoryview(self.frame)[self.START_FRAME_SIZE:self.START_FRAME_SIZE + 4 * self.num_led] # Pixel buffer
+        # Rotation is a logical offset in the pixel buffer (LED 0 is stored at
+        # this index), applied to a second frame buffer only when sent
+        self.__offset = 0
+        self.__rotated_frame = bytearray(self.frame)
+        self.__rotated_leds = memoryview(self.__rotated_frame)[self.START_FRAME_SIZE:self.START_FRAME_SIZE + 4 * self.num_led]
+        # Snapshot of the frame being sent: pixel buffer can be updated by
+        # other threads meanwhile. Swapped with last sent frame after sending
+        self.__send_frame = bytearray(len(self.frame))
+        # Last frame sent to the strip, used to skip unchanged frames
+        self.__last_frame = bytearray(len(self.frame))
+        self.__dirty = True
+        self.frames_sent = 0
+        self.frames_skipped = 0
+        # Duration of frame transfers in milliseconds
+        self.transfer_times = Histogram(self.TRANSFER_BOUNDS)
+        # Frames are sent to SPI bus 0, slave device (CS) 1 unless another
+        # transport (instance or name, see apa102transport) is specified
+        if transport is None:
+            transport = SpidevTransport(bus, device, max_speed_hz)
+        elif not isinstance(transport, Transport):
+            transport = get_transport(transport)
+        self.transport = transport
+        self.transport.open()
+
+    def set_brightness(self, global_brightness):
+        """Sets the global brightness and builds the brightness lookup table.
+
+        The table maps a brightness percentage (0..100) to the LED frame
+        first byte, so set_pixel does not compute it on every write.
+        """
         # Limit the brightness to the maximum if it's set higher
         if global_brightness > self.MAX_BRIGHTNESS:
             self.global_brightness = self.MAX_BRIGHTNESS
         else:
             self.global_brightness = global_brightness
 
-        self.leds = [self.LED_START,0,0,0] * self.num_led # Pixel buffer
-        self.spi = spidev.SpiDev()  # Init the SPI device
-        self.spi.open(bus, device)  # Open SPI port 0, slave device (CS) 1
-        # Up the speed a bit, so that the LEDs are painted faster
-        if max_speed_hz:
-            self.spi.max_speed_hz = max_speed_hz
+        self.brightness_table = [self.__compute_ledstart(percent) for percent in range(101)]
+        # Same table as bytes for bytearray.translate, percentages over 100 are clamped
+        self.__brightness_bytes = bytes(bytearray(self.brightness_table + [self.brightness_table[100]] * 155))
+
+    def __compute_ledstart(self, bright_percent):
+        """Computes LED frame first byte for specified brightness percentage."""
+
+        # Calculate pixel brightness as a percentage of the
+        # defined global_brightness. Round up to nearest integer
+        # as we expect some brightness unless set to 0
+        if self.gamma == 1.0:
+            # same rounding as without gamma correction
+            brightness = int(ceil(bright_percent * self.global_brightness / 100.0))
+        else:
+            brightness = int(ceil(((bright_percent / 100.0) ** self.gamma) * self.global_brightness)) if bright_percent > 0 else 0
+
+        # LED startframe is three "1" bits, followed by 5 brightness bits
+        return (brightness & 0b00011111) | self.LED_START
+
+    def __get_ledstart(self, bright_percent):
+        """Returns LED frame first byte, percentage is clamped to 0..100."""
+
+        # clamped first: negative ints would silently index the table from its end
+        bright_percent = min(max(bright_percent, 0), 100)
+        if isinstance(bright_percent, int):
+            return self.brightness_table[bright_percent]
+        return self.__compute_ledstart(bright_percent)
 
     def clock_start_frame(self):
         """Sends a start frame to the LED strip.
@@ -101,7 +181,7 @@ class APA102:
         This method clocks out a start frame, telling the receiving LED
         that it must update its own color now.
         """
-        self.spi.xfer2([0] * 4)  # Start frame, 32 zero bits
+        self.transport.write(bytearray(self.START_FRAME_SIZE))  # Start frame, 32 zero bits
 
 
     def clock_end_frame(self):
@@ -126,24 +206,19 @@ class APA102:
 
         Ultimately, we need to send additional numLEDs/2 arbitrary data bits,
         in order to trigger numLEDs/2 additional clock changes. This driver
-        sends zeroes, which has the benefit of getting LED one partially or
-        fully ready for the next update to the strip. An optimized version
-        of the driver could omit the "clockStartFrame" method if enough zeroes have
-        been sent as part of "clockEndFrame".
+        sends ones (0xFF bytes): unlike zeroes they can't be taken as the
+        start frame of a next update, whatever the number of LEDs, so the
+        end frame and its padding never interfere with the next frame.
         """
 
-        self.spi.xfer2([0xFF] * 4)
-
-        # Round up num_led/2 bits (or num_led/16 bytes)
-        #for _ in range((self.num_led + 15) // 16):
-        #    self.spi.xfer2([0x00])
+        # Round up num_led/2 bits (or num_led/16 bytes), at least 32 bits
+        self.transport.write(bytearray(b'\xff' * self.end_frame_size))
 
 
     def clear_strip(self):
         """ Turns off the strip and shows the result right away."""
 
-        for led in range(self.num_led):
-            self.set_pixel(led, 0, 0, 0)
+        self.set_pixels(bytearray(3 * self.num_led))
         self.show()
 
 
@@ -153,25 +228,117 @@ class APA102:
         The changed pixel is not shown yet on the Stripe, it is only
         written to the pixel buffer. Colors are passed individually.
         If brightness is not set the global brightness setting is used.
+        Brightness and colors are looked up in precomputed tables, colors
+        are clamped to 0..255.
         """
         if led_num < 0:
             return  # Pixel is invisible, so ignore
         if led_num >= self.num_led:
             return  # again, invisible
 
-        # Calculate pixel brightness as a percentage of the
-        # defined global_brightness. Round up to nearest integer
-        # as we expect some brightness unless set to 0
-        brightness = int(ceil(bright_percent*self.global_brightness/100.0))
+        ledstart = self.__get_ledstart(bright_percent)
+
+        if self.__offset:
+            led_num += self.__offset
+            if led_num >= self.num_led:
+                led_num -= self.num_led
+
+        start_index = self.START_FRAME_SIZE + 4 * led_num
+        gamma_table = self.gamma_table
+        self.frame[start_index] = ledstart
+        # clamped as well: negative colors would index the table from its end
+        self.frame[start_index + self.rgb[0]] = gamma_table[min(max(red, 0), 255)]
+        self.frame[start_index + self.rgb[1]] = gamma_table[min(max(green, 0), 255)]
+        self.frame[start_index + self.rgb[2]] = gamma_table[min(max(blue, 0), 255)]
+        self.__dirty = True
+
+
+    def set_pixels(self, pixels, brightness=None):
+        """Sets the color of several pixels at once, starting with LED 0.
+
+        The changed pixels are not shown yet on the Stripe, they are only
+        written to the pixel buffer. Pixels are a (N,3) RGB or (N,4) RGB +
+        brightness percentage array of 8 bits values: a NumPy uint8 array or
+        any object supporting the buffer protocol (bytes, bytearray...). For
+        flat buffers, 3 channels are used if the buffer size matches the
+        strip, 4 channels otherwise if possible.
+        If brightness is set it is used for all pixels. Otherwise the
+        brightness channel is used, or 100% for RGB pixels.
+        Pixels beyond the strip length are ignored.
+        """
+        data, channels = self.__read_pixels(pixels)
+        if self.__offset:
+            self.__apply_rotation()
+
+        count = min(len(data) // channels, self.num_led)
+        self.__encode_pixels(data, channels, count, brightness, self.frame, self.START_FRAME_SIZE)
+        self.__dirty = True
+
+
+    def encode_pixels(self, pixels, brightness=None, channels=None):
+        """Returns LED frames of pixels, without touching the pixel buffer.
+
+        Pixels and brightness are the same as set_pixels, but there is no
+        strip length limit. Returned LED frames can be written to the pixel
+        buffer with load_pixels, eg. to precompute animations. For flat
+        buffers the number of channels (3 or 4) can be forced.
+        """
+        data, channels = self.__read_pixels(pixels, channels)
+        count = len(data) // channels
+        encoded = bytearray(4 * count)
+        self.__encode_pixels(data, channels, count, brightness, encoded, 0)
+
+        return bytes(encoded)
+
+
+    def __read_pixels(self, pixels, channels=None):
+        """Returns pixels as a bytearray and their number of channels."""
+
+        try:
+            view = memoryview(pixels)
+        except TypeError:
+            # not a buffer (list of ints...)
+            view = memoryview(bytearray(pixels))
+        if view.itemsize != 1:
+            raise ValueError(u'Pixels must be 8 bits values')
+        data = bytearray(view)
+
+        # get number of channels
+        if channels is not None:
+            pass
+        elif view.ndim > 1:
+            channels = view.shape[-1]
+        elif len(data) == 3 * self.num_led or len(data) % 4:
+            channels = 3
+        else:
+            channels = 4
+        if channels not in (3, 4) or len(data) % channels:
+            raise ValueError(u'Pixels must be RGB or RGB + brightness values')
+
+        return data, channels
 
-        # LED startframe is three "1" bits, followed by 5 brightness bits
-        ledstart = (brightness & 0b00011111) | self.LED_START
 
-        start_index = 4 * led_num
-        self.leds[start_index] = ledstart
-        self.leds[start_index + self.rgb[0]] = red
-        self.leds[start_index + self.rgb[1]] = green
-        self.leds[start_index + self.rgb[2]] = blue
+    def __encode_pixels(self, data, channels, count, brightness, target, start):
+        """Writes LED frames of count pixels to target buffer at start position.
+
+        Channels are reordered with extended slices and looked up with
+        bytearray.translate, so there is no per pixel python code.
+        """
+        size = count * channels
+        end = start + 4 * count
+
+        # brightness
+        if brightness is not None:
+            ledstart = self.__get_ledstart(brightness)
+            target[start:end:4] = bytearray([ledstart]) * count
+        elif channels == 4:
+            target[start:end:4] = data[3:size:4].translate(self.__brightness_bytes)
+        else:
+            target[start:end:4] = bytearray([self.brightness_table[100]]) * count
+
+        # colors
+        for channel in range(3):
+            target[start + self.rgb[channel]:end:4] = data[channel:size:channels].translate(self.__gamma_bytes)
 
 
     def set_pixel_rgb(self, led_num, rgb_color, bright_percent=100):
@@ -193,30 +360,107 @@ class APA102:
         Treating the internal LED array as a circular buffer, rotate it by
         the specified number of positions. The number could be negative,
         which means rotating in the opposite direction.
+
+        The pixel buffer is not moved, only the position of the first LED in
+        it is updated. The rotation is applied when the frame is sent.
+        """
+        self.__offset = (self.__offset + positions) % self.num_led
+        self.__dirty = True
+
+
+    def __get_output_frame(self):
+        """Returns the frame to send, with rotation applied.
+
+        Without rotation it is the frame buffer itself, otherwise pixels are
+        copied in rotated order to a preallocated frame buffer.
         """
-        cutoff = 4 * (positions % self.num_led)
-        self.leds = self.leds[cutoff:] + self.leds[:cutoff]
+        if not self.__offset:
+            return self.frame
+
+        cutoff = 4 * self.__offset
+        size = 4 * self.num_led
+        self.__rotated_leds[:size - cutoff] = self.leds[cutoff:]
+        self.__rotated_leds[size - cutoff:] = self.leds[:cutoff]
+        return self.__rotated_frame
+
+
+    def __apply_rotation(self):
+        """Writes pixels in rotated order to the pixel buffer and resets rotation."""
 
+        self.leds[:] = self.__get_output_frame()[self.START_FRAME_SIZE:self.START_FRAME_SIZE + 4 * self.num_led]
+        self.__offset = 0
 
-    def show(self):
+
+    def show(self, force=False):
         """Sends the content of the pixel buffer to the strip.
 
-        Todo: More than 1024 LEDs requires more than one xfer operation.
+        Nothing is sent if the pixel buffer was not modified since the last
+        sent frame or if it is byte-identical to it, unless force is set.
+        Returns True if the frame was sent, False if it was skipped.
+
+        The frame buffer already contains the start frame, the pixel data and
+        the end frame, so it is handed to the transport in a single write.
+
+        The frame is copied to a send buffer and the modified flag cleared
+        before sending: a pixel buffer update made meanwhile by another thread
+        is not lost, it marks the buffer modified again for the next show.
         """
-        self.clock_start_frame()
-        # xfer2 kills the list, unfortunately. So it must be copied first
-        # SPI takes up to 4096 Integers. So we are fine for up to 1024 LEDs.
-        data = list(self.leds)
-        while data:
-            self.spi.xfer2(data[:32])
-            data = data[32:]
-        self.clock_end_frame()
+        if not force and not self.__dirty:
+            self.frames_skipped += 1
+            return False
+        self.__dirty = False
+        frame = self.__send_frame
+        frame[:] = self.__get_output_frame()
+        if not force and frame == self.__last_frame:
+            self.frames_skipped += 1
+            return False
+
+        start = monotonic()
+        self.transport.write(frame)
+        self.transfer_times.add((monotonic() - start) * 1000.0)
+
+        self.__send_frame, self.__last_frame = self.__last_frame, frame
+        self.frames_sent += 1
+        return True
+
+    def get_pixels(self):
+        """Returns a copy of the LED frames of the pixel buffer, in strip order.
+
+        It can be written back with load_pixels, eg. to replay precomputed
+        frames.
+        """
+        frame = self.__get_output_frame()
+        return bytes(frame[self.START_FRAME_SIZE:self.START_FRAME_SIZE + 4 * self.num_led])
+
+    def load_pixels(self, pixels):
+        """Writes LED frames (as returned by get_pixels) to the pixel buffer."""
+
+        self.__offset = 0
+        self.leds[:] = pixels
+        self.__dirty = True
+
+    def get_frame_stats(self):
+        """Returns the number of frames sent to and skipped from the strip,
+        and the histogram of frame transfer durations in milliseconds."""
+
+        return {
+            u'sent': self.frames_sent,
+            u'skipped': self.frames_skipped,
+            u'transfer_ms': self.transfer_times.to_dict()
+        }
+
+    def reset_frame_stats(self):
+        """Clears sent and skipped frames counters and transfer durations."""
+
+        self.frames_sent = 0
+        self.frames_skipped = 0
+        self.transfer_times.reset()
 
 
     def cleanup(self):
         """Release the SPI device; Call this method at the end"""
 
-        self.spi.close()  # Close SPI port
+        self.transport.close()
 
     @staticmethod
     def combine_color(red, green, blue):
@@ -226,21 +470,16 @@ class APA102:
 
 
     def wheel(self, wheel_pos):
-        """Get a color from a color wheel; Green -> Red -> Blue -> Green"""
+        """Get a color from a color wheel; Green -> Red -> Blue -> Green
+
+        Colors are precomputed, see colors module for batch helpers.
+        """
 
-        if wheel_pos > 255:
-            wheel_pos = 255 # Safeguard
-        if wheel_pos < 85:  # Green -> Red
-            return self.combine_color(wheel_pos * 3, 255 - wheel_pos * 3, 0)
-        if wheel_pos < 170:  # Red -> Blue
-            wheel_pos -= 85
-            return self.combine_color(255 - wheel_pos * 3, 0, wheel_pos * 3)
-        # Blue -> Green
-        wheel_pos -= 170
-        return self.combine_color(0, wheel_pos * 3, 255 - wheel_pos * 3)
+        return colors.wheel(wheel_pos)
 
 
     def dump_array(self):
         """For debug purposes: Dump the LED array onto the console."""
 
-        print(self.leds)
+        frame = self.__get_output_frame()
+        print(list(frame[self.START_FRAME_SIZE:self.START_FRAME_SIZE + 4 * self.num_led]))
@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+from collections import deque
+from .timing import monotonic
+
+__all__ = ['Transport', 'SpidevTransport', 'NullTransport', 'RecordingTransport', 'get_transport']
+
+class Transport(object):
+    """
+    Base class of APA102 frames transports. A transport sends a whole frame
+    (start frame, pixels and end frame) at once.
+    """
+
+    def open(self):
+        """
+        Open transport
+        """
+        pass
+
+    def write(self, frame):
+        """
+        Send frame
+
+        Args:
+            frame (bytearray): frame to send. It must not be modified
+        """
+        raise NotImplementedError(u'Method "write" must be implemented in "%s"' % self.__class__.__name__)
+
+    def close(self):
+        """
+        Close transport
+        """
+        pass
+
+class SpidevTransport(Transport):
+    """
+    Send frames to SPI bus using spidev
+    """
+
+    SPIDEV_BUFSIZ = u'/sys/module/spidev/parameters/bufsiz'
+    DEFAULT_BUFSIZ = 4096 # spidev default buffer size
+
+    def __init__(self, bus=0, device=1, max_speed_hz=8000000):
+        """
+        Constructor
+
+        Args:
+            bus (int): SPI bus
+            device (int): SPI slave device (CS)
+            max_speed_hz (int): SPI speed
+        """
+        self.bus = bus
+        self.device = device
+        self.max_speed_hz = max_speed_hz
+        self.spi = None
+        self.max_transfer = self.__get_max_transfer()
+        self.__writebytes2 = False
+
+    def __get_max_transfer(self):
+        """
+        Return the maximum number of bytes spidev accepts in one transfer.
+        It is configured by the spidev kernel module bufsiz parameter.
+
+        Returns:
+            int: max transfer size in bytes
+        """
+        try:
+            with open(self.SPIDEV_BUFSIZ) as fd:
+                return int(fd.read().strip())
+        except (IOError, OSError, ValueError):
+            return self.DEFAULT_BUFSIZ
+
+    def open(self):
+        """
+        Open SPI device
+        """
+        import spidev
+        self.spi = spidev.SpiDev()  # Init the SPI device
+        self.spi.open(self.bus, self.device)  # Open SPI port 0, slave device (CS) 1
+        # Up the speed a bit, so that the LEDs are painted faster
+        if self.max_speed_hz:
+            self.spi.max_speed_hz = self.max_speed_hz
+        # writebytes2 is available since spidev 3.4
+        self.__writebytes2 = hasattr(self.spi, u'writebytes2')
+
+    def write(self, frame):
+        """
+        Send frame in a single write. writebytes2 does not modify its input
+        and accepts the buffer as is. Older spidev versions only provide
+        xfer2 which kills the list, so a copy is sent.
+
+        A single transfer is limited to the spidev buffer size (4096 bytes by
+        default, ie. about 1020 LEDs). writebytes2 splits bigger frames by
+        itself, xfer2 frames are sent in chunks of that size.
+
+        Args:
+            frame (bytearray): frame to send
+        """
+        if self.__writebytes2:
+            self.spi.writebytes2(frame)
+        else:
+            for start in range(0, len(frame), self.max_transfer):
+                self.spi.xfer2(list(frame[start:start + self.max_transfer]))
+
+    def close(self):
+        """
+        Release SPI device
+        """
+        if self.spi:
+            self.spi.close()  # Close SPI port
+            self.spi = None
+
+class NullTransport(Transport):
+    """
+    Discard frames, only count them. Useful to profile LED code off-device
+    """
+
+    def __init__(self):
+        """
+        Constructor
+        """
+        self.frames = 0
+        self.bytes = 0
+
+    def write(self, frame):
+        """
+        Count frame
+
+        Args:
+            frame (bytearray): frame to send
+        """
+        self.frames += 1
+        self.bytes += len(frame)
+
+class RecordingTransport(Transport):
+    """
+    Store timestamped frames in a ring buffer. Recorded frames can be
+    replayed later on another transport.
+    """
+
+    def __init__(self, max_frames=1000):
+        """
+        Constructor
+
+        Args:
+            max_frames (int): number of frames kept (older ones are dropped)
+        """
+        self.frames = deque(maxlen=max_frames)
+
+    def write(self, frame):
+        """
+        Record a copy of frame
+
+        Args:
+            frame (bytearray): frame to send
+        """
+        self.frames.append((monotonic(), bytes(frame)))
+
+    def get_frames(self):
+        """
+        Return recorded frames
+
+        Returns:
+            list: list of (monotonic timestamp, frame) tuples, older first
+        """
+        return list(self.frames)
+
+    def clear(self):
+        """
+        Drop recorded frames
+        """
+        self.frames.clear()
+
+    def replay(self, transport, speed=1.0):
+        """
+        Replay recorded frames on specified transport
+
+        Args:
+            transport (Transport): transport to send frames to
+            speed (float): replay speed factor (0 sends frames without waiting)
+        """
+        previous = None
+        for timestamp, frame in self.get_frames():
+            if speed and previous is not None and timestamp > previous:
+                time.sleep((timestamp - previous) / speed)
+            previous = timestamp
+            transport.write(bytearray(frame))
+
+TRANSPORTS = {
+    u'spidev': SpidevTransport,
+    u'null': NullTransport,
+    u'recording': RecordingTransport,
+}
+
+def get_transport(name, **kwargs):
+    """
+    Return transport instance
+
+    Args:
+        name (string): transport name (see TRANSPORTS)
+        kwargs (dict): transport constructor parameters
+
+    Returns:
+        Transport: transport instance
+
+    Raises:
+        ValueError: if transport does not exist
+    """
+    if name not in TRANSPORTS:
+        raise ValueError(u'Transport "%s" does not exist' % name)
+
+    return TRANSPORTS[name](**kwargs)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Vectorized audio blocks analysis: levels and frequency bands
+
+Blocks are interleaved signed 16 bits samples as delivered by audio sources.
+All computations are done on whole blocks with NumPy, window and band masks
+are precomputed once per block size.
+"""
+
+try:
+    import numpy
+except ImportError: # pragma: no cover
+    numpy = None
+
+__all__ = ['to_samples', 'levels', 'SpectrumAnalyzer']
+
+def _check_numpy():
+    """
+    Check NumPy is available
+
+    Raises:
+        RuntimeError: if NumPy is not installed
+    """
+    if numpy is None:
+        raise RuntimeError(u'NumPy is required for audio analysis')
+
+def to_samples(block, channels):
+    """
+    Convert block to samples array, without copying block data
+
+    Args:
+        block (bytes): interleaved signed 16 bits samples
+        channels (int): number of channels
+
+    Returns:
+        numpy.ndarray: (frames, channels) int16 view of block
+    """
+    _check_numpy()
+    return numpy.frombuffer(block, dtype=u'<i2').reshape(-1, channels)
+
+def levels(samples):
+    """
+    Return RMS and peak levels of samples, mixing all channels
+
+    Args:
+        samples (numpy.ndarray): (frames, channels) int16 samples
+
+    Returns:
+        tuple: (rms, peak) levels [0..1]
+    """
+    _check_numpy()
+    floats = samples.astype(numpy.float32)
+    rms = float(numpy.sqrt(numpy.mean(floats * floats))) / 32768.0
+    peak = float(numpy.max(numpy.abs(floats))) / 32768.0 if floats.size else 0.0
+
+    return rms, peak
+
+class SpectrumAnalyzer(object):
+    """
+    Compute frequency bands levels of blocks with a real FFT
+    """
+
+    BANDS = ((60, 300), (300, 2000), (2000, 6000))
+
+    def __init__(self, rate, block_frames, bands=BANDS):
+        """
+        Constructor
+
+        Args:
+            rate (int): sample rate in Hz
+            block_frames (int): number of frames per block
+            bands (tuple): (low, high) frequencies of bands in Hz
+        """
+        _check_numpy()
+        self.rate = rate
+        self.block_frames = block_frames
+        self.bands = bands
+        self.window = numpy.hanning(block_frames).astype(numpy.float32)
+        #band matrix sums power of band bins, normalized by number of bins
+        freqs = numpy.fft.rfftfreq(block_frames, 1.0 / rate)
+        masks = numpy.array([(freqs>=low) & (freqs<high) for low, high in bands], dtype=numpy.float32)
+        self.band_matrix = masks / numpy.maximum(masks.sum(axis=1, keepdims=True), 1.0)
+        #full scale sine power in its bin, used to normalize levels
+        self.full_scale = (numpy.sum(self.window) * 32768.0 / 2.0) ** 2
+
+    def analyze(self, samples):
+        """
+        Return bands levels of samples (channels are mixed)
+
+        Args:
+            samples (numpy.ndarray): (frames, channels) int16 samples
+
+        Returns:
+            numpy.ndarray: bands levels [0..1] (square root of mean bin power relative to full scale)
+        """
+        mono = samples.mean(axis=1, dtype=numpy.float32)
+        spectrum = numpy.fft.rfft(mono * self.window)
+        power = spectrum.real * spectrum.real + spectrum.imag * spectrum.imag
+
+        return numpy.minimum(numpy.sqrt(self.band_matrix.dot(power) / self.full_scale), 1.0)
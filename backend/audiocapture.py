@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Shared audio capture
+
+Capture device can only be opened once, so a single thread reads it into a
+preallocated ring of blocks and every consumer reads the ring through its own
+CaptureReader. Readers are audio sources: they return memoryviews on ring
+slots (no copy, use audioanalysis.to_samples to get a NumPy view) and have
+independent cursors. Ring keeps the last seconds of audio (pre-roll) so a
+reader can start in the past, for example just before a hotword was detected.
+
+A slot is overwritten once capacity blocks have been captured after it: a
+reader lagging more than that loses blocks (overrun), they are counted and
+reader skips to the oldest block still available.
+
+With auto_stop, capture stops (and releases capture device) when its last
+reader is closed.
+"""
+
+import math
+import logging
+from threading import Thread, Condition
+from .audiosource import AudioSource
+from .timing import monotonic
+
+__all__ = ['AudioCapture', 'CaptureReader']
+
+class AudioCapture(Thread):
+    """
+    Capture audio source into a ring buffer shared by readers
+    """
+
+    def __init__(self, source, preroll=2.0, margin=1.0, auto_stop=False):
+        """
+        Constructor
+
+        Args:
+            source (AudioSource): captured audio source
+            preroll (float): duration of past audio kept for new readers in seconds
+            margin (float): extra buffered duration allowed to slow readers in seconds
+            auto_stop (bool): stop capture when last reader is closed
+        """
+        Thread.__init__(self)
+        self.daemon = True
+
+        #members
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.source = source
+        self.auto_stop = auto_stop
+        self.running = True
+        self.block_duration = float(source.block_frames) / source.rate
+        self.preroll_blocks = int(math.ceil(preroll / self.block_duration))
+        #one more slot is always being written
+        self.capacity = self.preroll_blocks + int(math.ceil(margin / self.block_duration)) + 1
+        self.buffer = bytearray(self.capacity * source.block_size)
+        view = memoryview(self.buffer)
+        self.slots = [view[index * source.block_size:(index + 1) * source.block_size] for index in range(self.capacity)]
+        #number of captured blocks
+        self.blocks = 0
+        self.readers = []
+        self.__condition = Condition()
+
+    def stop(self):
+        """
+        Stop capture. Readers get end of stream once they read all available blocks
+        """
+        self.running = False
+
+    def wait_started(self, timeout):
+        """
+        Wait for first block to be captured
+
+        Args:
+            timeout (float): max waiting duration in seconds
+
+        Returns:
+            bool: True if capture delivers blocks, False if it ended (eg. device can't be opened) or timed out
+        """
+        end = monotonic() + timeout
+        with self.__condition:
+            while self.blocks==0 and self.running:
+                remaining = end - monotonic()
+                if remaining<=0.0:
+                    break
+                self.__condition.wait(remaining)
+
+            return self.blocks>0
+
+    def get_reader(self, preroll=0.0):
+        """
+        Return new reader
+
+        Args:
+            preroll (float): start reader this duration in the past in seconds (limited to capture pre-roll)
+
+        Returns:
+            CaptureReader: reader
+        """
+        blocks = min(int(math.ceil(preroll / self.block_duration)), self.preroll_blocks)
+        with self.__condition:
+            reader = CaptureReader(self, max(self.blocks - blocks, 0))
+            self.readers.append(reader)
+
+        return reader
+
+    def remove_reader(self, reader):
+        """
+        Remove reader
+
+        Args:
+            reader (CaptureReader): reader
+        """
+        with self.__condition:
+            if reader in self.readers:
+                self.readers.remove(reader)
+                if self.auto_stop and len(self.readers)==0:
+                    self.logger.debug(u'No more reader, stop capture')
+                    self.running = False
+            self.__condition.notify_all()
+
+    def read_block(self, reader):
+        """
+        Return block at reader cursor, waiting for it if not captured yet
+
+        Args:
+            reader (CaptureReader): reader
+
+        Returns:
+            memoryview: block or None if capture stopped or reader is closed
+        """
+        with self.__condition:
+            while reader.cursor>=self.blocks and self.running and reader in self.readers:
+                self.__condition.wait(1.0)
+            if reader.cursor>=self.blocks or reader not in self.readers:
+                return None
+
+            oldest = self.blocks - self.capacity + 1
+            if reader.cursor<oldest:
+                reader.overruns += oldest - reader.cursor
+                reader.cursor = oldest
+            slot = self.slots[reader.cursor % self.capacity]
+            reader.cursor += 1
+
+        return slot
+
+    def get_stats(self):
+        """
+        Return capture stats
+
+        Returns:
+            dict: capture stats::
+
+                {
+                    blocks (int): number of captured blocks
+                    capacity (int): ring capacity in blocks
+                    readers (list): readers lag and overruns in blocks
+                }
+
+        """
+        with self.__condition:
+            return {
+                u'blocks': self.blocks,
+                u'capacity': self.capacity,
+                u'readers': [{u'lag': self.blocks - reader.cursor, u'overruns': reader.overruns} for reader in self.readers],
+            }
+
+    def run(self):
+        """
+        Capture blocks until capture is stopped or source ends
+        """
+        try:
+            self.source.open()
+            while self.running:
+                #slot of oldest block is overwritten in place, no allocation
+                if not self.source.read_into(self.slots[self.blocks % self.capacity]):
+                    if self.blocks==0:
+                        self.logger.error(u'Audio source ended before first block')
+                    break
+                with self.__condition:
+                    self.blocks += 1
+                    self.__condition.notify_all()
+        except Exception:
+            self.logger.exception(u'Error capturing audio:')
+        finally:
+            self.source.close()
+            with self.__condition:
+                self.running = False
+                self.__condition.notify_all()
+
+class CaptureReader(AudioSource):
+    """
+    Audio source reading shared capture from its own cursor
+    """
+
+    def __init__(self, capture, cursor):
+        """
+        Constructor
+
+        Args:
+            capture (AudioCapture): audio capture
+            cursor (int): number of first block to read
+        """
+        AudioSource.__init__(self, capture.source.rate, capture.source.channels, capture.source.block_frames)
+
+        #members
+        self.capture = capture
+        self.cursor = cursor
+        self.overruns = 0
+
+    def read(self):
+        """
+        Read next block. Returned view is valid until capture overwrites it:
+        process or copy it before reader lags capture capacity
+
+        Returns:
+            memoryview: block of interleaved samples or None if capture stopped or reader is closed
+        """
+        return self.capture.read_block(self)
+
+    def close(self):
+        """
+        Close reader
+        """
+        self.capture.remove_reader(self)
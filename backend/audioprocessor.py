@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+from threading import Thread
+from .ledsstats import Histogram
+from .timing import monotonic
+
+__all__ = ['AudioProcessor']
+
+class AudioProcessor(Thread):
+    """
+    Thread processing all blocks of an audio source. Subclasses implement
+    process(). Block processing durations are recorded. An optional gate
+    skips blocks, for example to run expensive processing only on speech.
+    """
+
+    #block processing duration buckets (ms)
+    PROCESS_BOUNDS = (0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0)
+
+    def __init__(self, source, gate=None):
+        """
+        Constructor
+
+        Args:
+            source (AudioSource): audio source
+            gate (function): function returning False when block must be skipped (optional)
+        """
+        Thread.__init__(self)
+        self.daemon = True
+
+        #members
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.source = source
+        self.gate = gate
+        self.running = True
+        self.blocks = 0
+        self.skipped_blocks = 0
+        self.process_times = Histogram(self.PROCESS_BOUNDS)
+
+    def stop(self):
+        """
+        Stop processor
+        """
+        self.running = False
+
+    def process(self, block):
+        """
+        Process audio block
+
+        Args:
+            block (bytes): block of interleaved samples
+        """
+        raise NotImplementedError(u'Method "process" must be implemented')
+
+    def run(self):
+        """
+        Run processor until source ends or processor is stopped
+        """
+        self.source.open()
+        try:
+            while self.running:
+                block = self.source.read()
+                if block is None:
+                    break
+                if self.gate is not None and not self.gate():
+                    self.skipped_blocks += 1
+                    continue
+
+                start = monotonic()
+                self.process(block)
+                self.process_times.add((monotonic() - start) * 1000.0)
+                self.blocks += 1
+        except Exception:
+            self.logger.exception(u'Error processing audio:')
+        finally:
+            self.source.close()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Audio capture sources
+
+Sources deliver fixed size blocks of interleaved signed 16 bits little endian
+samples. AlsaSource captures seeed-2mic-voicecard through arecord, WavSource
+reads a WAV file and can be used instead of ALSA to test and benchmark audio
+processing without hardware.
+"""
+
+import time
+import wave
+import logging
+import subprocess
+from .timing import monotonic
+
+__all__ = ['AudioSource', 'AlsaSource', 'WavSource']
+
+class AudioSource(object):
+    """
+    Audio source base class
+    """
+
+    SAMPLE_WIDTH = 2
+
+    def __init__(self, rate=16000, channels=2, block_frames=512):
+        """
+        Constructor
+
+        Args:
+            rate (int): sample rate in Hz
+            channels (int): number of channels
+            block_frames (int): number of frames (samples per channel) per block
+        """
+        self.rate = rate
+        self.channels = channels
+        self.block_frames = block_frames
+        self.block_size = block_frames * channels * self.SAMPLE_WIDTH
+
+    def open(self):
+        """
+        Open source
+        """
+        pass
+
+    def read(self):
+        """
+        Read next block. Blocks until block is available
+
+        Returns:
+            bytes: block of interleaved samples (block_size bytes) or None at end of stream
+        """
+        raise NotImplementedError(u'Method "read" must be implemented')
+
+    def read_into(self, buffer):
+        """
+        Read next block into buffer
+
+        Args:
+            buffer (memoryview): writable buffer of block_size bytes
+
+        Returns:
+            bool: False at end of stream
+        """
+        block = self.read()
+        if block is None:
+            return False
+        buffer[:] = block
+
+        return True
+
+    def close(self):
+        """
+        Close source
+        """
+        pass
+
+class AlsaSource(AudioSource):
+    """
+    Capture ALSA device through arecord
+    """
+
+    DEVICE = u'plughw:CARD=seeed2micvoicec,DEV=0'
+
+    def __init__(self, device=DEVICE, rate=16000, channels=2, block_frames=512):
+        """
+        Constructor
+
+        Args:
+            device (string): ALSA capture device
+            rate (int): sample rate in Hz
+            channels (int): number of channels
+            block_frames (int): number of frames per block
+        """
+        AudioSource.__init__(self, rate, channels, block_frames)
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.device = device
+        self.__process = None
+
+    def open(self):
+        """
+        Start capture
+        """
+        cmd = [u'arecord', u'-q', u'-D', self.device, u'-f', u'S16_LE', u'-r', str(self.rate), u'-c', str(self.channels), u'-t', u'raw']
+        self.logger.debug(u'Capture command: %s' % u' '.join(cmd))
+        self.__process = subprocess.Popen(cmd, stdout=subprocess.PIPE, bufsize=self.block_size)
+
+    def read(self):
+        """
+        Read next captured block
+
+        Returns:
+            bytes: block of interleaved samples or None if capture stopped
+        """
+        if self.__process is None:
+            return None
+        block = self.__process.stdout.read(self.block_size)
+        if len(block)<self.block_size:
+            return None
+
+        return block
+
+    def read_into(self, buffer):
+        """
+        Read next captured block directly into buffer
+
+        Args:
+            buffer (memoryview): writable buffer of block_size bytes
+
+        Returns:
+            bool: False if capture stopped
+        """
+        if self.__process is None:
+            return False
+        count = 0
+        while count<self.block_size:
+            size = self.__process.stdout.readinto(buffer[count:])
+            if not size:
+                return False
+            count += size
+
+        return True
+
+    def close(self):
+        """
+        Stop capture
+        """
+        if self.__process is not None:
+            if self.__process.poll() is not None:
+                #arecord exited by itself (device busy or missing), its error is on stderr
+                self.logger.error(u'Capture command exited with code %s' % self.__process.returncode)
+                self.__process = None
+                return
+            self.__process.terminate()
+            self.__process.wait()
+            self.__process = None
+
+class WavSource(AudioSource):
+    """
+    Read 16 bits WAV file as a capture stream
+    """
+
+    def __init__(self, path, block_frames=512, loop=False, realtime=False):
+        """
+        Constructor
+
+        Args:
+            path (string): WAV file path
+            block_frames (int): number of frames per block
+            loop (bool): restart from file beginning at end of file
+            realtime (bool): deliver blocks at sample rate, like a capture device
+        """
+        self.path = path
+        self.loop = loop
+        self.realtime = realtime
+        self.__wav = wave.open(path, u'rb')
+        if self.__wav.getsampwidth()!=self.SAMPLE_WIDTH:
+            self.__wav.close()
+            raise ValueError(u'Only 16 bits WAV files are supported')
+        AudioSource.__init__(self, self.__wav.getframerate(), self.__wav.getnchannels(), block_frames)
+        self.__next_block = None
+
+    def read(self):
+        """
+        Read next block from file. Last incomplete block is dropped
+
+        Returns:
+            bytes: block of interleaved samples or None at end of file
+        """
+        if self.__wav is None:
+            return None
+        block = self.__wav.readframes(self.block_frames)
+        if len(block)<self.block_size and self.loop:
+            self.__wav.rewind()
+            block = self.__wav.readframes(self.block_frames)
+        if len(block)<self.block_size:
+            return None
+
+        if self.realtime:
+            now = monotonic()
+            if self.__next_block is None:
+                self.__next_block = now
+            self.__next_block += float(self.block_frames) / self.rate
+            if self.__next_block>now:
+                time.sleep(self.__next_block - now)
+
+        return block
+
+    def close(self):
+        """
+        Close file
+        """
+        if self.__wav is not None:
+            self.__wav.close()
+            self.__wav = None
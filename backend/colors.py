@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Color helpers for APA102 leds
+
+Scalar helpers use a precomputed 256 entries color wheel. Batch converters
+work on NumPy arrays and return (N,3) uint8 arrays that can be given as is
+to APA102.set_pixels. NumPy is optional, only batch converters need it.
+"""
+
+try:
+    import numpy
+except ImportError: # pragma: no cover
+    numpy = None
+
+__all__ = ['compute_wheel', 'wheel', 'WHEEL_TABLE', 'WHEEL_PALETTE', 'wheel_colors',
+           'unpack_colors', 'hsv_to_rgb', 'hsl_to_rgb']
+
+def compute_wheel(wheel_pos):
+    """
+    Compute a color from a color wheel: Green -> Red -> Blue -> Green
+
+    Args:
+        wheel_pos (int): position on wheel [0..255]
+
+    Returns:
+        int: 3*8 bits color value
+    """
+    if wheel_pos > 255:
+        wheel_pos = 255 # Safeguard
+    if wheel_pos < 85:  # Green -> Red
+        return ((wheel_pos * 3) << 16) + ((255 - wheel_pos * 3) << 8)
+    if wheel_pos < 170:  # Red -> Blue
+        wheel_pos -= 85
+        return ((255 - wheel_pos * 3) << 16) + wheel_pos * 3
+    # Blue -> Green
+    wheel_pos -= 170
+    return ((wheel_pos * 3) << 8) + 255 - wheel_pos * 3
+
+# Color wheel as 3*8 bits colors and as RGB bytes
+WHEEL_TABLE = tuple([compute_wheel(pos) for pos in range(256)])
+WHEEL_PALETTE = bytes(bytearray([(color >> shift) & 0xFF for color in WHEEL_TABLE for shift in (16, 8, 0)]))
+
+def wheel(wheel_pos):
+    """
+    Get a color from the precomputed color wheel: Green -> Red -> Blue -> Green
+
+    Args:
+        wheel_pos (int): position on wheel [0..255]
+
+    Returns:
+        int: 3*8 bits color value
+    """
+    return WHEEL_TABLE[wheel_pos if wheel_pos < 256 else 255]
+
+def _check_numpy():
+    """
+    Check NumPy is available
+
+    Raises:
+        RuntimeError: if NumPy is not installed
+    """
+    if numpy is None:
+        raise RuntimeError(u'NumPy is required for batch color conversions')
+
+def wheel_colors(positions):
+    """
+    Get colors of several positions of the color wheel
+
+    Args:
+        positions (array): positions on wheel [0..255]
+
+    Returns:
+        numpy.ndarray: (N,3) uint8 RGB colors
+    """
+    _check_numpy()
+    palette = numpy.frombuffer(WHEEL_PALETTE, dtype=numpy.uint8).reshape(256, 3)
+    return palette[numpy.clip(numpy.asarray(positions, dtype=numpy.intp), 0, 255)]
+
+def unpack_colors(colors):
+    """
+    Split 3*8 bits color values into channels
+
+    Args:
+        colors (array): 3*8 bits color values (see APA102.combine_color)
+
+    Returns:
+        numpy.ndarray: (N,3) uint8 RGB colors
+    """
+    _check_numpy()
+    colors = numpy.asarray(colors, dtype=numpy.uint32)
+    return numpy.stack(((colors >> 16) & 0xFF, (colors >> 8) & 0xFF, colors & 0xFF), axis=-1).astype(numpy.uint8)
+
+def hsv_to_rgb(hue, saturation, value):
+    """
+    Convert HSV colors to RGB
+
+    Args:
+        hue (array): hues [0..1], values out of range wrap around
+        saturation (array): saturations [0..1]
+        value (array): values [0..1]
+
+    Returns:
+        numpy.ndarray: (N,3) uint8 RGB colors
+    """
+    _check_numpy()
+    hue, saturation, value = numpy.broadcast_arrays(
+        numpy.asarray(hue, dtype=numpy.float64),
+        numpy.asarray(saturation, dtype=numpy.float64),
+        numpy.asarray(value, dtype=numpy.float64),
+    )
+    hue6 = (hue % 1.0) * 6.0
+    sector = numpy.floor(hue6)
+    fraction = hue6 - sector
+    sector = sector.astype(numpy.intp) % 6
+    p = value * (1.0 - saturation)
+    q = value * (1.0 - saturation * fraction)
+    t = value * (1.0 - saturation * (1.0 - fraction))
+
+    red = numpy.choose(sector, (value, q, p, p, t, value))
+    green = numpy.choose(sector, (t, value, value, q, p, p))
+    blue = numpy.choose(sector, (p, p, t, value, value, q))
+    rgb = numpy.stack((red, green, blue), axis=-1)
+    return numpy.rint(numpy.clip(rgb, 0.0, 1.0) * 255.0).astype(numpy.uint8)
+
+def hsl_to_rgb(hue, saturation, lightness):
+    """
+    Convert HSL colors to RGB
+
+    Args:
+        hue (array): hues [0..1], values out of range wrap around
+        saturation (array): saturations [0..1]
+        lightness (array): lightnesses [0..1]
+
+    Returns:
+        numpy.ndarray: (N,3) uint8 RGB colors
+    """
+    _check_numpy()
+    saturation = numpy.asarray(saturation, dtype=numpy.float64)
+    lightness = numpy.asarray(lightness, dtype=numpy.float64)
+    value = lightness + saturation * numpy.minimum(lightness, 1.0 - lightness)
+    with numpy.errstate(divide=u'ignore', invalid=u'ignore'):
+        hsv_saturation = numpy.where(value > 0.0, 2.0 * (1.0 - lightness / value), 0.0)
+    return hsv_to_rgb(hue, hsv_saturation, value)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Two microphones direction of arrival (DOA) estimation with GCC-PHAT
+
+The cross power spectrum of both channels is whitened (PHAT weighting) and
+the generalized cross correlation is evaluated only at the delays matching a
+grid of angles, with a precomputed steering matrix: one matrix product per
+block instead of an inverse FFT and a peak search.
+
+Angle is 0 in front of the board, positive towards the second channel
+microphone, in -90..90 degrees (a linear array can't tell front from back).
+"""
+
+import math
+try:
+    import numpy
+except ImportError: # pragma: no cover
+    numpy = None
+from .audioprocessor import AudioProcessor
+from .audioanalysis import to_samples
+from .timing import monotonic
+
+__all__ = ['DoaEstimator', 'DoaTracker']
+
+class DoaEstimator(object):
+    """
+    Estimate sound source angle of stereo blocks
+    """
+
+    SOUND_SPEED = 343.0
+    #distance between respeaker 2-mic hat microphones in meters
+    MIC_DISTANCE = 0.058
+
+    def __init__(self, rate, block_frames, mic_distance=MIC_DISTANCE, resolution=2.0, band=(200.0, 4000.0), min_level=0.005, smoothing=0.3):
+        """
+        Constructor
+
+        Args:
+            rate (int): sample rate in Hz
+            block_frames (int): number of frames per block
+            mic_distance (float): distance between microphones in meters
+            resolution (float): angles grid step in degrees
+            band (tuple): (low, high) frequencies used for estimation in Hz
+            min_level (float): blocks with lower RMS level [0..1] are ignored
+            smoothing (float): weight of new estimation in smoothed angle [0..1]
+        """
+        if numpy is None:
+            raise RuntimeError(u'NumPy is required for direction of arrival estimation')
+
+        self.rate = rate
+        self.block_frames = block_frames
+        self.min_level = min_level * 32768.0
+        self.smoothing = smoothing
+        self.angle = None
+        self.confidence = 0.0
+        #fft size avoids circular correlation wrap around
+        self.fft_size = 2 * block_frames
+        freqs = numpy.fft.rfftfreq(self.fft_size, 1.0 / rate)
+        self.bins = numpy.nonzero((freqs>=band[0]) & (freqs<=band[1]))[0]
+        self.angles = numpy.arange(-90.0, 90.0 + resolution / 2.0, resolution)
+        delays = mic_distance * numpy.sin(numpy.radians(self.angles)) / self.SOUND_SPEED
+        self.steering = numpy.exp(2j * numpy.pi * numpy.outer(delays, freqs[self.bins])).astype(numpy.complex64)
+
+    def estimate(self, samples):
+        """
+        Estimate angle of block
+
+        Args:
+            samples (numpy.ndarray): (frames, 2) int16 samples
+
+        Returns:
+            tuple: (angle in degrees, confidence [0..1]) or None if block is too quiet
+        """
+        floats = samples.astype(numpy.float32)
+        if numpy.sqrt(numpy.mean(floats * floats))<self.min_level:
+            return None
+
+        spectrums = numpy.fft.rfft(floats, n=self.fft_size, axis=0)[self.bins]
+        cross = spectrums[:, 0] * numpy.conj(spectrums[:, 1])
+        cross /= numpy.abs(cross) + 1e-12
+        scores = self.steering.dot(cross.astype(numpy.complex64)).real
+        best = int(numpy.argmax(scores))
+
+        return float(self.angles[best]), float(scores[best]) / len(self.bins)
+
+    def process(self, samples):
+        """
+        Estimate angle of block and update smoothed angle
+
+        Args:
+            samples (numpy.ndarray): (frames, 2) int16 samples
+
+        Returns:
+            float: smoothed angle in degrees (None until a block is loud enough)
+        """
+        estimation = self.estimate(samples)
+        if estimation is not None:
+            angle, self.confidence = estimation
+            if self.angle is None:
+                self.angle = angle
+            else:
+                self.angle += self.smoothing * (angle - self.angle)
+
+        return self.angle
+
+class DoaTracker(AudioProcessor):
+    """
+    Track sound source angle of audio source and publish its changes
+    """
+
+    def __init__(self, source, angle_callback, publish_interval=0.5, min_change=5.0, gate=None, **kwargs):
+        """
+        Constructor
+
+        Args:
+            source (AudioSource): stereo audio source
+            angle_callback (function): function called with angle in degrees when it changed
+            publish_interval (float): min delay between published angles in seconds
+            min_change (float): min angle change to publish in degrees
+            gate (function): function returning False when block must be skipped (optional)
+            kwargs (dict): DoaEstimator parameters
+        """
+        AudioProcessor.__init__(self, source, gate)
+
+        #members
+        self.estimator = DoaEstimator(source.rate, source.block_frames, **kwargs)
+        self.angle_callback = angle_callback
+        self.publish_interval = publish_interval
+        self.min_change = min_change
+        self.published_angle = None
+        self.__last_publish = None
+
+    def get_angle(self):
+        """
+        Return current smoothed angle
+
+        Returns:
+            float: angle in degrees or None if unknown
+        """
+        return self.estimator.angle
+
+    def process(self, block):
+        """
+        Update angle with block and publish it if it changed enough
+
+        Args:
+            block (bytes): block of interleaved samples
+        """
+        angle = self.estimator.process(to_samples(block, self.source.channels))
+        if angle is None:
+            return
+
+        now = monotonic()
+        if self.__last_publish is not None and now - self.__last_publish<self.publish_interval:
+            return
+        if self.published_angle is not None and math.fabs(angle - self.published_angle)<self.min_change:
+            return
+        self.published_angle = angle
+        self.__last_publish = now
+        self.angle_callback(angle)
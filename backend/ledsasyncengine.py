@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import logging
+from threading import Thread, Lock
+from .ledsengine import LedsLayer, LedsCompositor
+from .timing import monotonic
+
+__all__ = ['AsyncLedsEngine']
+
+class AsyncLedsEngine(object):
+    """
+    Asyncio leds engine: each layer is a coroutine sleeping until its next
+    deadline on a single event loop, and stopping a layer cancels its task.
+    Several engines (one per animated output) can share the same loop.
+
+    Public API is the same as LedsEngine and is thread safe: calls are handed
+    off to the loop.
+    """
+
+    def __init__(self, show_frame_callback, turn_off_callback, off_pixels, loop=None):
+        """
+        Constructor
+
+        Args:
+            show_frame_callback (function): function called to show LED frames (bytes)
+            turn_off_callback (function): function called to turn off leds when all layers are over
+            off_pixels (bytes): LED frames of turned off leds
+            loop (AbstractEventLoop): event loop to run layers on. If not specified
+                engine runs its own loop in a thread started by start()
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.show_frame_callback = show_frame_callback
+        self.turn_off_callback = turn_off_callback
+        self.compositor = LedsCompositor(off_pixels)
+        self.running = True
+        self.__own_loop = loop is None
+        self.loop = asyncio.new_event_loop() if loop is None else loop
+        self.__thread = None
+        self.__lock = Lock()
+        self.__playing = {}
+        self.__tasks = {}
+        self.__render_pending = False
+        self.__lit = False
+        #last ended layer measures
+        self.stats = {
+            u'profile': None,
+            u'frames': 0,
+            u'drift': 0.0,
+            u'max_lateness': 0.0,
+        }
+
+    def start(self):
+        """
+        Start engine loop thread (if engine owns its loop)
+        """
+        if self.__own_loop and self.__thread is None:
+            self.__thread = Thread(target=self.__run_loop)
+            self.__thread.daemon = True
+            self.__thread.start()
+
+    def join(self, timeout=None):
+        """
+        Wait for engine loop thread end
+
+        Args:
+            timeout (float): timeout in seconds
+        """
+        if self.__thread is not None:
+            self.__thread.join(timeout)
+
+    def __run_loop(self):
+        """
+        Run engine own loop
+        """
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+            #let cancelled layers tasks complete before closing loop
+            tasks = asyncio.all_tasks(self.loop)
+            if tasks:
+                self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        finally:
+            self.loop.close()
+
+    def play(self, profile, timeline, cycles=None, priority=0, blend=LedsLayer.BLEND_OVERRIDE, alpha=1.0, trace=None):
+        """
+        Play profile on layer with specified priority, replacing profile being played on it
+
+        Args:
+            profile (dict): leds profile
+            timeline (LedsTimeline): compiled profile
+            cycles (int): number of times profile is played (None to play indefinitely)
+            priority (int): layer priority (higher is drawn over lower)
+            blend (string): how layer is drawn over lower layers (see LedsLayer)
+            alpha (float): layer opacity for alpha blending [0..1]
+            trace (LedsRenderTrace): render trace (optional)
+        """
+        layer = LedsLayer(profile, timeline, cycles, priority, blend, alpha, trace)
+        if trace:
+            trace.mark_handoff()
+        with self.__lock:
+            self.__playing[priority] = layer
+        self.loop.call_soon_threadsafe(self.__start_layer, layer)
+
+    def stop_playing(self, priority=None):
+        """
+        Stop profile being played on layer. Leds are turned off if no layer remains
+
+        Args:
+            priority (int): priority of layer to stop (None to stop all layers)
+        """
+        with self.__lock:
+            if priority is None:
+                self.__playing.clear()
+            else:
+                self.__playing.pop(priority, None)
+        self.loop.call_soon_threadsafe(self.__stop_layers, priority)
+
+    def is_playing(self, priority=None):
+        """
+        Return True if a profile is being played (or about to be)
+
+        Args:
+            priority (int): check only layer with this priority (None for any layer)
+
+        Returns:
+            bool: True if profile is playing
+        """
+        if priority is None:
+            return len(self.__playing)>0
+
+        return priority in self.__playing
+
+    def stop(self):
+        """
+        Stop engine
+        """
+        self.running = False
+        with self.__lock:
+            self.__playing.clear()
+        self.loop.call_soon_threadsafe(self.__shutdown)
+
+    def __shutdown(self):
+        """
+        Stop all layers, turn off leds and stop own loop (loop side)
+        """
+        self.__stop_layers(None)
+        self.__render()
+        if self.__own_loop:
+            self.loop.stop()
+
+    def __start_layer(self, layer):
+        """
+        Start layer task, cancelling task of layer with same priority (loop side)
+        """
+        task = self.__tasks.pop(layer.priority, None)
+        if task is not None:
+            task.cancel()
+        self.compositor.set_layer(layer, monotonic())
+        self.__tasks[layer.priority] = self.loop.create_task(self.__play_layer(layer))
+        self.__request_render()
+
+    def __stop_layers(self, priority):
+        """
+        Cancel layers tasks (loop side)
+        """
+        priorities = list(self.__tasks.keys()) if priority is None else [priority]
+        for layer_priority in priorities:
+            task = self.__tasks.pop(layer_priority, None)
+            if task is not None:
+                task.cancel()
+        self.compositor.remove_layer(priority)
+        self.__request_render()
+
+    async def __play_layer(self, layer):
+        """
+        Layer coroutine: update layer frame at each deadline until layer ends
+
+        Args:
+            layer (LedsLayer): layer to play
+        """
+        while True:
+            now = monotonic()
+            if layer.update(now):
+                self.__request_render()
+            if layer.is_ended(now):
+                break
+
+            deadline = layer.get_next_deadline()
+            if deadline is None:
+                #static layer, wait for cancellation
+                await self.loop.create_future()
+            else:
+                await asyncio.sleep(max(0.0, deadline - monotonic()))
+
+        layer.drift = now - layer.get_end_time()
+        if self.__tasks.get(layer.priority) is asyncio.current_task(self.loop):
+            del self.__tasks[layer.priority]
+            self.compositor.remove_layer(layer.priority)
+        self.__layer_ended(layer)
+        self.__request_render()
+
+    def __layer_ended(self, layer):
+        """
+        Handle layer end
+        """
+        with self.__lock:
+            if self.__playing.get(layer.priority) is layer:
+                del self.__playing[layer.priority]
+        self.stats = {
+            u'profile': layer.profile[u'uuid'],
+            u'frames': layer.frames,
+            u'drift': layer.drift,
+            u'max_lateness': layer.max_lateness,
+        }
+        self.logger.debug(u'Leds profile "%s" played: drift=%.1fms max lateness=%.1fms' % (
+            layer.profile[u'uuid'], layer.drift * 1000.0, layer.max_lateness * 1000.0
+        ))
+
+    def __request_render(self):
+        """
+        Schedule a single render for all layers changed during current loop iteration
+        """
+        if not self.__render_pending:
+            self.__render_pending = True
+            self.loop.call_soon(self.__render)
+
+    def __render(self):
+        """
+        Show composited frame or turn off leds when all layers are over
+        """
+        self.__render_pending = False
+        try:
+            if self.compositor.has_layers():
+                pixels = self.compositor.compose()
+                self.compositor.mark_traces()
+                self.show_frame_callback(pixels)
+                self.__lit = True
+            elif self.__lit:
+                #end of animations turning off everything
+                self.turn_off_callback()
+                self.__lit = False
+        except Exception:
+            self.logger.exception(u'Error playing leds profiles:')
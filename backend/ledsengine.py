@@ -0,0 +1,467 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+from threading import Thread, Event, Lock
+try:
+    from queue import Queue, Empty
+except ImportError: # pragma: no cover
+    from Queue import Queue, Empty
+from .timing import monotonic
+from .ledsstats import LedsTimingStats
+
+__all__ = ['LedsLayer', 'LedsCompositor', 'LedsEngine']
+
+class LedsLayer(object):
+    """
+    Compiled leds profile played on a layer. Layers with higher priority are
+    drawn over lower ones, only on the leds set by their profile.
+    """
+
+    BLEND_OVERRIDE = u'override'
+    BLEND_ALPHA = u'alpha'
+
+    def __init__(self, profile, timeline, cycles=None, priority=0, blend=BLEND_OVERRIDE, alpha=1.0, trace=None):
+        """
+        Constructor
+
+        Args:
+            profile (dict): leds profile
+            timeline (LedsTimeline): compiled profile
+            cycles (int): number of times profile is played (None to play indefinitely)
+            priority (int): layer priority (higher is drawn over lower)
+            blend (string): how layer is drawn over lower layers (BLEND_OVERRIDE or BLEND_ALPHA)
+            alpha (float): layer opacity for BLEND_ALPHA [0..1]
+            trace (LedsRenderTrace): render trace marked when first frame is shown
+        """
+        self.profile = profile
+        self.timeline = timeline
+        self.cycles = cycles
+        self.priority = priority
+        self.blend = blend
+        self.alpha = alpha
+        self.trace = trace
+        self.start = None
+        #current frame, None until first frame
+        self.pixels = None
+        self.__cycle = 0
+        self.__index = 0
+        #playback measures
+        self.frames = 0
+        self.drift = 0.0
+        self.max_lateness = 0.0
+        #frames timing stats shared by layers (see LedsCompositor)
+        self.stats = None
+
+    def begin(self, now):
+        """
+        Start layer playback
+
+        Args:
+            now (float): monotonic time
+        """
+        self.start = now
+
+    def __get_next_frame_deadline(self):
+        """
+        Return deadline of next frame
+
+        Returns:
+            float: monotonic time or None if there is no more frame
+        """
+        frames = self.timeline.frames
+        if not frames:
+            return None
+        if self.timeline.duration<=0:
+            #no pause in profile, cycles are all the same: play frames once
+            return self.start + frames[self.__index][0] if self.__cycle==0 else None
+        if self.cycles is not None and self.__cycle>=self.cycles:
+            return None
+
+        return self.start + self.__cycle * self.timeline.duration + frames[self.__index][0]
+
+    def get_end_time(self):
+        """
+        Return layer end time
+
+        Returns:
+            float: monotonic time or None if layer plays indefinitely
+        """
+        if self.cycles is None:
+            return None
+
+        return self.start + self.cycles * max(self.timeline.duration, 0.0)
+
+    def get_next_deadline(self):
+        """
+        Return time of next layer change (next frame or end)
+
+        Returns:
+            float: monotonic time or None if layer never changes
+        """
+        deadlines = [deadline for deadline in (self.__get_next_frame_deadline(), self.get_end_time()) if deadline is not None]
+        return min(deadlines) if deadlines else None
+
+    def update(self, now):
+        """
+        Update current frame
+
+        Args:
+            now (float): monotonic time
+
+        Returns:
+            bool: True if current frame changed
+        """
+        changed = False
+        frames = self.timeline.frames
+        deadline = self.__get_next_frame_deadline()
+        while deadline is not None and deadline<=now:
+            offset, self.pixels = frames[self.__index]
+            self.frames += 1
+            lateness = now - deadline
+            self.max_lateness = max(self.max_lateness, lateness)
+            changed = True
+            self.__index += 1
+            #frame ending a cycle is due with first frame of next cycle
+            folded = False
+            if self.__index>=len(frames):
+                self.__index = 0
+                self.__cycle += 1
+                folded = offset>=self.timeline.duration and frames[0][0]<=0.0
+            deadline = self.__get_next_frame_deadline()
+            if self.stats is not None:
+                if deadline is not None and deadline<=now:
+                    #frame replaced by next one before being shown. Frame ending a cycle
+                    #is not dropped: it is only meant to be shown at the end of last cycle
+                    if not folded:
+                        self.stats.add_dropped_frame()
+                else:
+                    self.stats.add_frame(lateness)
+
+        return changed
+
+    def is_ended(self, now):
+        """
+        Return True if layer playback is over
+
+        Args:
+            now (float): monotonic time
+
+        Returns:
+            bool: True if layer is ended
+        """
+        if self.cycles is None:
+            return False
+        if self.timeline.duration<=0:
+            return self.__get_next_frame_deadline() is None
+
+        return now>=self.get_end_time()
+
+class LedsCompositor(object):
+    """
+    Composite layers per led into a single frame
+    """
+
+    def __init__(self, off_pixels):
+        """
+        Constructor
+
+        Args:
+            off_pixels (bytes): LED frames of turned off leds, drawn under all layers
+        """
+        self.off_pixels = off_pixels
+        self.num_led = len(off_pixels) // 4
+        self.layers = {}
+        self.stats = LedsTimingStats()
+
+    def set_layer(self, layer, now):
+        """
+        Start layer, replacing layer with same priority
+
+        Args:
+            layer (LedsLayer): layer to start
+            now (float): monotonic time
+        """
+        layer.begin(now)
+        layer.stats = self.stats
+        self.layers[layer.priority] = layer
+
+    def remove_layer(self, priority=None):
+        """
+        Remove layer
+
+        Args:
+            priority (int): priority of layer to remove (None to remove all layers)
+
+        Returns:
+            list: removed layers
+        """
+        if priority is None:
+            removed = list(self.layers.values())
+            self.layers.clear()
+            return removed
+
+        layer = self.layers.pop(priority, None)
+        return [layer] if layer else []
+
+    def has_layers(self):
+        """
+        Return True if at least one layer is playing
+        """
+        return len(self.layers)>0
+
+    def update(self, now):
+        """
+        Update layers current frame and remove ended layers
+
+        Args:
+            now (float): monotonic time
+
+        Returns:
+            tuple: (changed (bool), ended layers (list))
+        """
+        changed = False
+        ended = []
+        for priority, layer in list(self.layers.items()):
+            changed = layer.update(now) or changed
+            if layer.is_ended(now):
+                layer.drift = now - layer.get_end_time()
+                ended.append(self.layers.pop(priority))
+                changed = True
+
+        return changed, ended
+
+    def get_next_deadline(self):
+        """
+        Return time of next layers change
+
+        Returns:
+            float: monotonic time or None if layers never change
+        """
+        deadlines = [deadline for deadline in [layer.get_next_deadline() for layer in self.layers.values()] if deadline is not None]
+        return min(deadlines) if deadlines else None
+
+    def compose(self):
+        """
+        Composite layers current frames, lower priority first
+
+        Returns:
+            bytes: LED frames
+        """
+        pixels = bytearray(self.off_pixels)
+        for priority in sorted(self.layers.keys()):
+            layer = self.layers[priority]
+            if layer.pixels is None:
+                continue
+            leds = range(self.num_led) if layer.timeline.leds is None else layer.timeline.leds
+            if layer.blend==LedsLayer.BLEND_ALPHA and layer.alpha<1.0:
+                for led in leds:
+                    start = 4 * led
+                    self.__blend(pixels, layer.pixels, start, layer.alpha)
+            elif len(leds)==self.num_led:
+                pixels[:] = layer.pixels
+            else:
+                for led in leds:
+                    start = 4 * led
+                    pixels[start:start + 4] = layer.pixels[start:start + 4]
+
+        return bytes(pixels)
+
+    def mark_traces(self):
+        """
+        Mark render traces of layers whose first frame is about to be shown
+        """
+        for layer in self.layers.values():
+            if layer.trace is not None and layer.pixels is not None:
+                layer.trace.mark_frame()
+                layer.trace = None
+
+    def __blend(self, pixels, layer_pixels, start, alpha):
+        """
+        Blend layer LED frame over pixels LED frame
+
+        Args:
+            pixels (bytearray): LED frames to update
+            layer_pixels (bytes): layer LED frames
+            start (int): LED frame position
+            alpha (float): layer opacity
+        """
+        layer_pixels = bytearray(layer_pixels[start:start + 4])
+        #first byte is 3 bits header + 5 bits brightness
+        brightness = int(round((pixels[start] & 0x1F) * (1.0 - alpha) + (layer_pixels[0] & 0x1F) * alpha))
+        pixels[start] = (pixels[start] & 0xE0) | brightness
+        for index in range(1, 4):
+            pixels[start + index] = int(round(pixels[start + index] * (1.0 - alpha) + layer_pixels[index] * alpha))
+
+class LedsEngine(Thread):
+    """
+    Long-lived thread playing compiled leds profiles on prioritized layers.
+    Layers are composited per led and a single frame is shown per change.
+    Play requests are queued: a request interrupts the layer with the same
+    priority and is handed off to the worker without waiting.
+    """
+
+    def __init__(self, show_frame_callback, turn_off_callback, off_pixels):
+        """
+        Constructor
+
+        Args:
+            show_frame_callback (function): function called to show LED frames (bytes)
+            turn_off_callback (function): function called to turn off leds when all layers are over
+            off_pixels (bytes): LED frames of turned off leds
+        """
+        Thread.__init__(self)
+        self.daemon = True
+
+        #members
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.show_frame_callback = show_frame_callback
+        self.turn_off_callback = turn_off_callback
+        self.compositor = LedsCompositor(off_pixels)
+        self.running = True
+        self.__queue = Queue()
+        self.__interrupt = Event()
+        self.__lock = Lock()
+        self.__playing = {}
+        #last ended layer measures
+        self.stats = {
+            u'profile': None,
+            u'frames': 0,
+            u'drift': 0.0,
+            u'max_lateness': 0.0,
+        }
+
+    def play(self, profile, timeline, cycles=None, priority=0, blend=LedsLayer.BLEND_OVERRIDE, alpha=1.0, trace=None):
+        """
+        Play profile on layer with specified priority, replacing profile being played on it
+
+        Args:
+            profile (dict): leds profile
+            timeline (LedsTimeline): compiled profile
+            cycles (int): number of times profile is played (None to play indefinitely)
+            priority (int): layer priority (higher is drawn over lower)
+            blend (string): how layer is drawn over lower layers (see LedsLayer)
+            alpha (float): layer opacity for alpha blending [0..1]
+            trace (LedsRenderTrace): render trace (optional)
+        """
+        layer = LedsLayer(profile, timeline, cycles, priority, blend, alpha, trace)
+        if trace:
+            trace.mark_handoff()
+        with self.__lock:
+            self.__playing[priority] = layer
+            self.__queue.put((u'play', layer))
+        self.__interrupt.set()
+
+    def stop_playing(self, priority=None):
+        """
+        Stop profile being played on layer. Leds are turned off if no layer remains
+
+        Args:
+            priority (int): priority of layer to stop (None to stop all layers)
+        """
+        with self.__lock:
+            if priority is None:
+                self.__playing.clear()
+            else:
+                self.__playing.pop(priority, None)
+            self.__queue.put((u'stop', priority))
+        self.__interrupt.set()
+
+    def is_playing(self, priority=None):
+        """
+        Return True if a profile is being played (or about to be)
+
+        Args:
+            priority (int): check only layer with this priority (None for any layer)
+
+        Returns:
+            bool: True if profile is playing
+        """
+        if priority is None:
+            return len(self.__playing)>0
+
+        return priority in self.__playing
+
+    def stop(self):
+        """
+        Stop engine
+        """
+        self.running = False
+        self.stop_playing()
+
+    def __process_commands(self, now):
+        """
+        Process queued commands
+
+        Args:
+            now (float): monotonic time
+
+        Returns:
+            bool: True if a command was processed
+        """
+        processed = False
+        try:
+            while True:
+                command, param = self.__queue.get_nowait()
+                processed = True
+                if command==u'play':
+                    self.compositor.set_layer(param, now)
+                else:
+                    self.compositor.remove_layer(param)
+        except Empty:
+            pass
+
+        return processed
+
+    def __layer_ended(self, layer):
+        """
+        Handle layer end
+        """
+        with self.__lock:
+            if self.__playing.get(layer.priority) is layer:
+                del self.__playing[layer.priority]
+        self.stats = {
+            u'profile': layer.profile[u'uuid'],
+            u'frames': layer.frames,
+            u'drift': layer.drift,
+            u'max_lateness': layer.max_lateness,
+        }
+        self.logger.debug(u'Leds profile "%s" played: drift=%.1fms max lateness=%.1fms' % (
+            layer.profile[u'uuid'], layer.drift * 1000.0, layer.max_lateness * 1000.0
+        ))
+
+    def run(self):
+        """
+        Run engine
+        """
+        while True:
+            self.__interrupt.clear()
+            now = monotonic()
+            had_layers = self.compositor.has_layers()
+            processed = self.__process_commands(now)
+
+            try:
+                changed, ended = self.compositor.update(now)
+                for layer in ended:
+                    self.__layer_ended(layer)
+
+                if self.compositor.has_layers():
+                    if changed or processed:
+                        pixels = self.compositor.compose()
+                        self.compositor.mark_traces()
+                        self.show_frame_callback(pixels)
+                elif had_layers or processed:
+                    #end of animations turning off everything
+                    self.turn_off_callback()
+            except Exception:
+                self.logger.exception(u'Error playing leds profiles:')
+
+            if not self.running:
+                break
+
+            #wait until next layers change or new command
+            deadline = self.compositor.get_next_deadline()
+            if deadline is None:
+                self.__interrupt.wait()
+            else:
+                self.__interrupt.wait(max(0.0, deadline - monotonic()))
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+from threading import Thread, Event
+from .timing import monotonic
+
+__all__ = ['LedsFlusher']
+
+class LedsFlusher(Thread):
+    """
+    Thread that owns leds driver output: callers only update the pixel buffer
+    and request a flush. Pending requests are coalesced and at most max_fps
+    frames per second are sent.
+    """
+
+    def __init__(self, leds_driver, max_fps=50, flushed_callback=None):
+        """
+        Constructor
+
+        Args:
+            leds_driver (APA102): leds driver instance
+            max_fps (int): maximum number of frames sent per second
+            flushed_callback (function): function called after each flush with show result (True
+                if frame was sent) and flush start time (optional)
+        """
+        Thread.__init__(self)
+        self.daemon = True
+
+        #members
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.leds_driver = leds_driver
+        self.interval = 1.0 / max_fps
+        self.flushed_callback = flushed_callback
+        self.running = True
+        self.__pending = Event()
+        self.__stopped = Event()
+        self.flush_requests = 0
+        self.flushes = 0
+
+    def flush(self):
+        """
+        Request pixel buffer to be sent. Returns immediately
+        """
+        self.flush_requests += 1
+        self.__pending.set()
+
+    def reset_stats(self):
+        """
+        Clear flush requests and flushes counters
+        """
+        self.flush_requests = 0
+        self.flushes = 0
+
+    def stop(self):
+        """
+        Stop flusher. Pending request is sent before thread ends, without
+        waiting for frame rate cap
+        """
+        self.running = False
+        self.__stopped.set()
+        self.__pending.set()
+
+    def run(self):
+        """
+        Run flusher
+        """
+        last_flush = 0.0
+        while self.running:
+            self.__pending.wait()
+
+            #cap frame rate, requests received meanwhile are coalesced
+            delay = last_flush + self.interval - monotonic()
+            if delay>0:
+                self.__stopped.wait(delay)
+
+            #clear before show so a buffer update during show triggers another flush
+            self.__pending.clear()
+            start = monotonic()
+            sent = False
+            try:
+                sent = self.leds_driver.show()
+            except Exception:
+                self.logger.exception(u'Error flushing leds:')
+            self.flushes += 1
+            last_flush = monotonic()
+            if self.flushed_callback:
+                self.flushed_callback(sent, start)
@@ -0,0 +1,576 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import hashlib
+import logging
+from collections import OrderedDict
+from threading import RLock
+try:
+    import numpy
+except ImportError: # pragma: no cover
+    numpy = None
+from .apa102 import APA102
+from .apa102transport import NullTransport
+
+__all__ = ['LedsTimeline', 'LedsAction', 'LedsProfileStore', 'LedsProfileCompiler']
+
+class LedsTimeline(object):
+    """
+    Compiled leds profile: frames ready to be loaded in leds driver with
+    their offset from the start of the animation
+    """
+
+    __slots__ = ('frames', 'duration', 'leds')
+
+    def __init__(self, frames, duration, leds=None):
+        """
+        Constructor
+
+        Args:
+            frames (list): list of (offset in seconds, LED frames bytes) tuples
+            duration (float): animation duration in seconds
+            leds (tuple): indexes of leds set by profile (None for all leds)
+        """
+        self.frames = frames
+        self.duration = duration
+        self.leds = leds
+
+class LedsProfileStore(object):
+    """
+    In-memory leds profiles indexed by uuid and name. Profiles are loaded once
+    from loader and indexes are rebuilt only after invalidate() is called, so
+    lookups don't read configuration.
+    """
+
+    def __init__(self, loader):
+        """
+        Constructor
+
+        Args:
+            loader (callable): function returning list of leds profiles
+        """
+        self.loader = loader
+        self.__indexes = None
+
+    def __get_indexes(self):
+        """
+        Return profiles indexes, loading profiles if necessary
+
+        Returns:
+            tuple: (profiles list, profiles by uuid dict, profiles by name dict)
+        """
+        indexes = self.__indexes
+        if indexes is None:
+            profiles = self.loader() or []
+            by_uuid = dict([(profile[u'uuid'], profile) for profile in profiles])
+            by_name = dict([(profile[u'name'], profile) for profile in profiles])
+            #single assignment so concurrent lookups always see consistent indexes
+            indexes = self.__indexes = (profiles, by_uuid, by_name)
+
+        return indexes
+
+    def invalidate(self):
+        """
+        Drop indexes. Profiles will be loaded again on next lookup
+        """
+        self.__indexes = None
+
+    def get_profiles(self):
+        """
+        Return all profiles
+
+        Returns:
+            list: list of leds profiles
+        """
+        return list(self.__get_indexes()[0])
+
+    def get(self, profile_uuid):
+        """
+        Return profile by uuid
+
+        Args:
+            profile_uuid (string): profile uuid
+
+        Returns:
+            dict: leds profile or None if not found
+        """
+        return self.__get_indexes()[1].get(profile_uuid)
+
+    def get_by_name(self, name):
+        """
+        Return profile by name
+
+        Args:
+            name (string): profile name
+
+        Returns:
+            dict: leds profile or None if not found
+        """
+        return self.__get_indexes()[2].get(name)
+
+class LedsAction(object):
+    """
+    Parsed leds profile action. Actions are parsed once from profile dicts:
+    colors are resolved to packed 0xRRGGBB values, leds to indexes and pause
+    to seconds, so compiling doesn't perform dict lookups anymore
+    """
+
+    __slots__ = ('opcode', 'leds', 'color', 'brightness', 'duration', 'to_color', 'to_brightness', 'fps', 'easing')
+
+    def __init__(self, opcode, leds=None, color=0, brightness=0, duration=0.0, to_color=0, to_brightness=0, fps=0, easing=None):
+        """
+        Constructor
+
+        Args:
+            opcode (int): action (see LedsProfileCompiler.ACTION_XXX)
+            leds (tuple): indexes of leds set by action
+            color (int): packed RGB color (0xRRGGBB)
+            brightness (int): brightness [0..100]
+            duration (float): pause or fade duration in seconds
+            to_color (int): fade end packed RGB color
+            to_brightness (int): fade end brightness [0..100]
+            fps (int): fade frames per second
+            easing (function): fade easing curve
+        """
+        self.opcode = opcode
+        self.leds = leds
+        self.color = color
+        self.brightness = brightness
+        self.duration = duration
+        self.to_color = to_color
+        self.to_brightness = to_brightness
+        self.fps = fps
+        self.easing = easing
+
+class LedsProfileCompiler(object):
+    """
+    Compile leds profiles actions to timelines, so playing a profile is only
+    "load frame, wait until next frame offset". Compiled timelines are kept in
+    a LRU cache by profile uuid and content. Parsed actions are kept for all
+    profiles, they are small and compile again quickly evicted timelines.
+
+    Compiler is used by several threads (renderer, commands, audio
+    processors): caches and scratch driver are protected by a lock.
+    """
+
+    ACTION_LED1 = 1
+    ACTION_LED2 = 2
+    ACTION_LED3 = 3
+    ACTION_ALL_LEDS = 4
+    ACTION_PAUSE = 5
+    ACTION_FADE = 6
+
+    FADE_FPS = 25
+    EASINGS = {
+        u'linear': lambda t: t,
+        u'ease-in': lambda t: t * t,
+        u'ease-out': lambda t: 1.0 - (1.0 - t) * (1.0 - t),
+        u'ease-in-out': lambda t: t * t * (3.0 - 2.0 * t),
+    }
+
+    def __init__(self, leds_driver, palette, cache_size=32):
+        """
+        Constructor
+
+        Args:
+            leds_driver (APA102): leds driver frames are compiled for
+            palette (dict): RGB colors by name. Other colors must be specified
+                as RGB list or "#RRGGBB" string
+            cache_size (int): max number of timelines in cache
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.palette = dict([(name, (rgb[0] << 16) | (rgb[1] << 8) | rgb[2]) for name, rgb in palette.items()])
+        self.cache_size = cache_size
+        self.__cache = OrderedDict()
+        self.__actions = {}
+        self.__lock = RLock()
+        #scratch driver with the same pixel encoding as leds driver
+        self.__scratch = APA102(
+            num_led=leds_driver.num_led,
+            global_brightness=leds_driver.global_brightness,
+            order=leds_driver.order,
+            gamma=leds_driver.gamma,
+            transport=NullTransport()
+        )
+
+    def get_profile_hash(self, profile):
+        """
+        Return profile content hash
+
+        Args:
+            profile (dict): leds profile
+
+        Returns:
+            string: hash of profile actions
+        """
+        return hashlib.md5(json.dumps(profile[u'actions'], sort_keys=True).encode(u'utf-8')).hexdigest()
+
+    def get_timeline(self, profile):
+        """
+        Return profile timeline, compiling it if not cached
+
+        Args:
+            profile (dict): leds profile
+
+        Returns:
+            LedsTimeline: compiled profile
+
+        Raises:
+            ValueError: if profile action is invalid
+        """
+        profile_hash = self.get_profile_hash(profile)
+        key = (profile[u'uuid'], profile_hash)
+        with self.__lock:
+            timeline = self.__cache.pop(key, None)
+            if timeline is None:
+                timeline = self.compile_actions(profile[u'uuid'], self.__get_actions(profile, profile_hash))
+                if len(self.__cache)>=self.cache_size:
+                    self.__cache.popitem(last=False)
+            self.__cache[key] = timeline
+
+        return timeline
+
+    def __get_actions(self, profile, profile_hash):
+        """
+        Return profile parsed actions, parsing them if profile content changed
+
+        Args:
+            profile (dict): leds profile
+            profile_hash (string): profile content hash
+
+        Returns:
+            tuple: parsed actions
+        """
+        cached = self.__actions.get(profile[u'uuid'])
+        if cached is not None and cached[0]==profile_hash:
+            return cached[1]
+
+        actions = self.parse_actions(profile[u'actions'])
+        self.__actions[profile[u'uuid']] = (profile_hash, actions)
+        return actions
+
+    def invalidate(self, profile_uuid):
+        """
+        Remove profile timelines and parsed actions from cache
+
+        Args:
+            profile_uuid (string): profile uuid
+        """
+        with self.__lock:
+            for key in [key for key in self.__cache.keys() if key[0]==profile_uuid]:
+                del self.__cache[key]
+            self.__actions.pop(profile_uuid, None)
+
+    def get_off_pixels(self):
+        """
+        Return LED frames of turned off leds
+
+        Returns:
+            bytes: LED frames
+        """
+        with self.__lock:
+            self.__scratch.clear_strip()
+            return self.__scratch.get_pixels()
+
+    def parse_color(self, color):
+        """
+        Return packed RGB value of color
+
+        Args:
+            color (string|list): palette color name, "#RRGGBB" string or RGB list
+
+        Returns:
+            int: packed RGB color (0xRRGGBB)
+
+        Raises:
+            ValueError: if color is invalid
+        """
+        if isinstance(color, (list, tuple)):
+            if len(color)!=3 or min(color)<0 or max(color)>255:
+                raise ValueError(u'Invalid RGB color "%s"' % str(color))
+            return (int(color[0]) << 16) | (int(color[1]) << 8) | int(color[2])
+        if color in self.palette:
+            return self.palette[color]
+        if color and color.startswith(u'#') and len(color)==7:
+            return int(color[1:], 16)
+
+        raise ValueError(u'Invalid color "%s"' % color)
+
+    def parse_action(self, action):
+        """
+        Parse leds profile action
+
+        Args:
+            action (dict): leds profile action
+
+        Returns:
+            LedsAction: parsed action
+
+        Raises:
+            ValueError: if action is invalid
+        """
+        opcode = action[u'action']
+        if opcode in (self.ACTION_LED1, self.ACTION_LED2, self.ACTION_LED3, self.ACTION_ALL_LEDS):
+            brightness = action[u'brightness']
+            if brightness<0 or brightness>100:
+                raise ValueError(u'Brightness must be 0..100')
+            if opcode==self.ACTION_ALL_LEDS:
+                leds = tuple(range(self.__scratch.num_led))
+            else:
+                leds = tuple([led for led in [opcode - self.ACTION_LED1] if led<self.__scratch.num_led])
+            return LedsAction(opcode, leds=leds, color=self.parse_color(action[u'color']), brightness=brightness)
+
+        elif opcode==self.ACTION_PAUSE:
+            return LedsAction(opcode, duration=action[u'pause'] / 1000.0)
+
+        elif opcode==self.ACTION_FADE:
+            return self.__parse_fade_action(action)
+
+        raise ValueError(u'Invalid action "%s"' % opcode)
+
+    def __parse_fade_action(self, action):
+        """
+        Parse fade action. Fade action interpolates color and brightness of
+        leds during specified duration::
+
+            {
+                action (int): ACTION_FADE
+                led (int): faded led (1..3, 0 or missing for all leds)
+                color (string): start color
+                brightness (int): start brightness [0..100]
+                to_color (string): end color (start color if missing)
+                to_brightness (int): end brightness [0..100]
+                pause (int): fade duration in milliseconds
+                fps (int): number of frames per second (default 25)
+                easing (string): easing curve (see EASINGS, default linear)
+            }
+
+        Args:
+            action (dict): fade action
+
+        Returns:
+            LedsAction: parsed action
+        """
+        num_led = self.__scratch.num_led
+        led = action.get(u'led', 0)
+        if led<0 or led>num_led:
+            raise ValueError(u'Led must be 0..%d' % num_led)
+        leds = tuple(range(num_led)) if led==0 else (led - 1,)
+        from_brightness = action[u'brightness']
+        to_brightness = action.get(u'to_brightness', from_brightness)
+        duration = action[u'pause'] / 1000.0
+        fps = action.get(u'fps', self.FADE_FPS)
+        easing = self.EASINGS.get(action.get(u'easing', u'linear'))
+        if min(from_brightness, to_brightness)<0 or max(from_brightness, to_brightness)>100:
+            raise ValueError(u'Brightness must be 0..100')
+        if duration<0 or fps<=0:
+            raise ValueError(u'Fade duration and fps must be positive')
+        if easing is None:
+            raise ValueError(u'Invalid easing "%s"' % action.get(u'easing'))
+
+        return LedsAction(
+            self.ACTION_FADE,
+            leds=leds,
+            color=self.parse_color(action[u'color']),
+            brightness=from_brightness,
+            duration=duration,
+            to_color=self.parse_color(action.get(u'to_color') or action[u'color']),
+            to_brightness=to_brightness,
+            fps=fps,
+            easing=easing
+        )
+
+    def parse_actions(self, actions):
+        """
+        Parse leds profile actions
+
+        Args:
+            actions (list): list of actions dicts
+
+        Returns:
+            tuple: tuple of LedsAction
+
+        Raises:
+            ValueError: if action is invalid
+        """
+        return tuple([self.parse_action(action) for action in actions])
+
+    def compile(self, profile):
+        """
+        Parse and compile profile actions into a timeline
+
+        Args:
+            profile (dict): leds profile
+
+        Returns:
+            LedsTimeline: compiled profile
+
+        Raises:
+            ValueError: if profile action is invalid
+        """
+        return self.compile_actions(profile[u'uuid'], self.parse_actions(profile[u'actions']))
+
+    def compile_actions(self, profile_uuid, actions):
+        """
+        Compile parsed actions into a timeline. Actions performed without
+        pause between them produce a single frame.
+
+        Args:
+            profile_uuid (string): profile uuid
+            actions (tuple): parsed actions (see parse_actions)
+
+        Returns:
+            LedsTimeline: compiled profile
+        """
+        self.logger.debug(u'Compile leds profile "%s"' % profile_uuid)
+        with self.__lock:
+            return self.__compile_actions(actions)
+
+    def __compile_actions(self, actions):
+        """
+        Compile parsed actions with scratch driver. Lock must be held
+
+        Args:
+            actions (tuple): parsed actions
+
+        Returns:
+            LedsTimeline: compiled profile
+        """
+        scratch = self.__scratch
+        scratch.clear_strip()
+
+        frames = []
+        offset = 0.0
+        used_leds = set()
+        last_pixels = scratch.get_pixels()
+        pending = False
+        for action in actions:
+            if action.opcode==self.ACTION_PAUSE:
+                if pending:
+                    last_pixels = self.__append_frame(frames, offset, scratch.get_pixels(), last_pixels)
+                    pending = False
+                offset += action.duration
+
+            elif action.opcode==self.ACTION_FADE:
+                #fade frames replace pending frame at same offset
+                offset = self.__append_fade_frames(frames, offset, action)
+                last_pixels = frames[-1][1] if frames else last_pixels
+                used_leds.update(action.leds)
+                pending = True
+
+            else:
+                for led in action.leds:
+                    scratch.set_pixel_rgb(led, action.color, action.brightness)
+                used_leds.update(action.leds)
+                pending = True
+
+        if pending:
+            self.__append_frame(frames, offset, scratch.get_pixels(), last_pixels)
+
+        return LedsTimeline(frames, offset, tuple(sorted(used_leds)))
+
+    def __append_fade_frames(self, frames, offset, action):
+        """
+        Append fade action frames to timeline. Intermediate values of all
+        steps are computed at once (vectorized with NumPy if available) and
+        encoded in a single pass by leds driver. Last step (end values) is
+        left in scratch driver, like a set action, so a fade without duration
+        only sets end values.
+
+        Args:
+            frames (list): timeline frames
+            offset (float): fade start offset in seconds
+            action (LedsAction): fade action
+
+        Returns:
+            float: fade end offset in seconds
+        """
+        scratch = self.__scratch
+        duration = action.duration
+
+        #interpolate RGB + brightness values of all steps, last one being end values
+        steps = int(round(duration * action.fps))
+        if duration>0:
+            steps = max(1, steps)
+        start_values = [(action.color >> 16) & 0xFF, (action.color >> 8) & 0xFF, action.color & 0xFF, action.brightness]
+        end_values = [(action.to_color >> 16) & 0xFF, (action.to_color >> 8) & 0xFF, action.to_color & 0xFF, action.to_brightness]
+        if steps==0:
+            #no intermediate frame
+            encoded = scratch.encode_pixels(end_values, channels=4)
+            pixels = bytearray(scratch.get_pixels())
+            for led in action.leds:
+                pixels[4 * led:4 * led + 4] = encoded
+            scratch.load_pixels(bytes(pixels))
+            return offset
+
+        if frames and frames[-1][0]>=offset:
+            #frame at fade start offset is replaced by first fade frame
+            frames.pop()
+        if numpy is not None:
+            steps_pixels = self.__get_fade_pixels_numpy(action, steps, start_values, end_values)
+        else:
+            steps_pixels = self.__get_fade_pixels(action, steps, start_values, end_values)
+
+        for step, pixels in enumerate(steps_pixels[:-1]):
+            if not frames or frames[-1][1]!=pixels:
+                frames.append((offset + duration * step / steps, pixels))
+        scratch.load_pixels(steps_pixels[-1])
+
+        return offset + duration
+
+    def __get_fade_pixels_numpy(self, action, steps, start_values, end_values):
+        """
+        Return LED frames of all fade steps, computed with NumPy
+
+        Returns:
+            list: LED frames (bytes) of steps 0..steps
+        """
+        scratch = self.__scratch
+        ratios = action.easing(numpy.linspace(0.0, 1.0, steps + 1))
+        start = numpy.array(start_values, dtype=numpy.float64)
+        values = numpy.rint(start + numpy.outer(ratios, numpy.array(end_values, dtype=numpy.float64) - start))
+        encoded = numpy.frombuffer(scratch.encode_pixels(values.astype(numpy.uint8), channels=4), dtype=numpy.uint8)
+
+        #all steps frames from current pixels, faded leds replaced
+        base = numpy.frombuffer(scratch.get_pixels(), dtype=numpy.uint8).reshape(scratch.num_led, 4)
+        pixels = numpy.repeat(base[numpy.newaxis], steps + 1, axis=0)
+        pixels[:, list(action.leds), :] = encoded.reshape(steps + 1, 1, 4)
+
+        return [step.tobytes() for step in pixels]
+
+    def __get_fade_pixels(self, action, steps, start_values, end_values):
+        """
+        Return LED frames of all fade steps, pure python version
+
+        Returns:
+            list: LED frames (bytes) of steps 0..steps
+        """
+        scratch = self.__scratch
+        deltas = [end - start for start, end in zip(start_values, end_values)]
+        values = bytearray()
+        for step in range(steps + 1):
+            ratio = action.easing(step / float(steps))
+            values.extend([int(round(start + delta * ratio)) for start, delta in zip(start_values, deltas)])
+        encoded = scratch.encode_pixels(values, channels=4)
+
+        steps_pixels = []
+        pixels = bytearray(scratch.get_pixels())
+        for step in range(steps + 1):
+            led_pixels = encoded[4 * step:4 * step + 4]
+            for led in action.leds:
+                pixels[4 * led:4 * led + 4] = led_pixels
+            steps_pixels.append(bytes(pixels))
+
+        return steps_pixels
+
+    def __append_frame(self, frames, offset, pixels, last_pixels):
+        """
+        Append frame to timeline if it changes leds
+
+        Returns:
+            bytes: last frame pixels
+        """
+        if pixels!=last_pixels or not frames:
+            frames.append((offset, pixels))
+        return pixels
@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Offline leds profiles renderer
+
+Profiles are played by the leds engine layers and compositor on a virtual
+clock: time jumps from one frame deadline to the next, so rendering a profile
+takes the time needed to compute its frames, not its duration. Rendered
+frames can be saved to a binary dump and loaded back as NumPy arrays.
+
+Dump format (little endian)::
+
+    header: magic "LEDS", version (uint8), number of leds (uint16), number of frames (uint32)
+    timestamps: number of frames * uint32 (microseconds from profile start)
+    pixels: number of frames * number of leds * RGBA uint8
+
+Alpha channel is the led brightness scaled to 0..255.
+"""
+
+import struct
+try:
+    import numpy
+except ImportError: # pragma: no cover
+    numpy = None
+from .apa102 import APA102
+from .apa102transport import NullTransport
+from .ledsprofile import LedsProfileCompiler
+from .ledsengine import LedsLayer, LedsCompositor
+
+__all__ = ['LedsOfflineRenderer', 'write_dump', 'read_dump', 'load_dump']
+
+DUMP_MAGIC = b'LEDS'
+DUMP_VERSION = 1
+DUMP_HEADER = struct.Struct('<4sBHI')
+
+class LedsOfflineRenderer(object):
+    """
+    Render leds profiles to frames without leds and without waiting
+    """
+
+    REPEAT_INF = 99
+
+    def __init__(self, palette, num_led=3, order=u'rgb', gamma=1.0, max_duration=10.0):
+        """
+        Constructor
+
+        Args:
+            palette (dict): RGB colors by name (see LedsProfileCompiler)
+            num_led (int): number of leds
+            order (string): leds colors order (see APA102)
+            gamma (float): gamma correction (see APA102)
+            max_duration (float): rendering duration of infinitely repeated profiles in seconds
+        """
+        self.num_led = num_led
+        self.max_duration = max_duration
+        self.leds_driver = APA102(num_led=num_led, order=order, gamma=gamma, transport=NullTransport())
+        self.compiler = LedsProfileCompiler(self.leds_driver, palette)
+
+    def render(self, profile, cycles=None, max_duration=None):
+        """
+        Render profile frames
+
+        Args:
+            profile (dict): leds profile
+            cycles (int): number of times profile is played (default profile repeat value)
+            max_duration (float): rendering duration limit in seconds (default max_duration)
+
+        Returns:
+            list: list of (timestamp in seconds, LED frames bytes) tuples. Last frame
+                turns off leds if profile ended before duration limit
+
+        Raises:
+            ValueError: if profile action is invalid
+        """
+        if cycles is None:
+            cycles = None if profile[u'repeat']==self.REPEAT_INF else profile[u'repeat']
+        if max_duration is None:
+            max_duration = self.max_duration
+
+        compositor = LedsCompositor(self.compiler.get_off_pixels())
+        compositor.set_layer(LedsLayer(profile, self.compiler.get_timeline(profile), cycles), 0.0)
+        frames = []
+        now = 0.0
+        while now<=max_duration:
+            changed, _ = compositor.update(now)
+            if not compositor.has_layers():
+                #end of animation turning off leds
+                frames.append((now, compositor.compose()))
+                break
+            if changed:
+                frames.append((now, compositor.compose()))
+
+            now = compositor.get_next_deadline()
+            if now is None:
+                break
+
+        return frames
+
+    def decode_pixels(self, pixels):
+        """
+        Convert LED frames to RGBA values
+
+        Args:
+            pixels (bytes): LED frames (see APA102.get_pixels)
+
+        Returns:
+            bytearray: RGBA values of leds
+        """
+        pixels = bytearray(pixels)
+        red, green, blue = self.leds_driver.rgb
+        rgba = bytearray(4 * self.num_led)
+        rgba[0::4] = pixels[red::4]
+        rgba[1::4] = pixels[green::4]
+        rgba[2::4] = pixels[blue::4]
+        rgba[3::4] = bytearray([((header & 0x1F) * 255) // 31 for header in pixels[0::4]])
+        return rgba
+
+    def render_dump(self, profile, path, cycles=None, max_duration=None):
+        """
+        Render profile frames to dump file
+
+        Args:
+            profile (dict): leds profile
+            path (string): dump file path
+            cycles (int): number of times profile is played (default profile repeat value)
+            max_duration (float): rendering duration limit in seconds (default max_duration)
+
+        Returns:
+            int: number of frames
+        """
+        frames = self.render(profile, cycles, max_duration)
+        write_dump(path, [(timestamp, self.decode_pixels(pixels)) for timestamp, pixels in frames], self.num_led)
+        return len(frames)
+
+def write_dump(path, frames, num_led):
+    """
+    Write frames dump
+
+    Args:
+        path (string): dump file path
+        frames (list): list of (timestamp in seconds, RGBA bytes) tuples
+        num_led (int): number of leds
+    """
+    with open(path, u'wb') as dump:
+        dump.write(DUMP_HEADER.pack(DUMP_MAGIC, DUMP_VERSION, num_led, len(frames)))
+        dump.write(struct.pack('<%dI' % len(frames), *[int(round(timestamp * 1000000.0)) for timestamp, _ in frames]))
+        for _, rgba in frames:
+            dump.write(bytes(rgba))
+
+def _read_dump_data(path):
+    """
+    Read dump file and check its header
+
+    Returns:
+        tuple: (number of leds, number of frames, data, data offset)
+
+    Raises:
+        ValueError: if file is not a valid dump
+    """
+    with open(path, u'rb') as dump:
+        data = dump.read()
+    if len(data)<DUMP_HEADER.size:
+        raise ValueError(u'Invalid leds dump')
+    magic, version, num_led, count = DUMP_HEADER.unpack_from(data)
+    if magic!=DUMP_MAGIC or version!=DUMP_VERSION:
+        raise ValueError(u'Invalid leds dump')
+    if len(data)!=DUMP_HEADER.size + 4 * count + 4 * num_led * count:
+        raise ValueError(u'Truncated leds dump')
+
+    return num_led, count, data, DUMP_HEADER.size
+
+def read_dump(path):
+    """
+    Read frames dump
+
+    Args:
+        path (string): dump file path
+
+    Returns:
+        tuple: (number of leds, list of (timestamp in seconds, RGBA bytes) tuples)
+
+    Raises:
+        ValueError: if file is not a valid dump
+    """
+    num_led, count, data, offset = _read_dump_data(path)
+    timestamps = struct.unpack_from('<%dI' % count, data, offset)
+    offset += 4 * count
+    size = 4 * num_led
+    frames = [(timestamp / 1000000.0, data[offset + index * size:offset + (index + 1) * size]) for index, timestamp in enumerate(timestamps)]
+
+    return num_led, frames
+
+def load_dump(path):
+    """
+    Load frames dump into NumPy arrays
+
+    Args:
+        path (string): dump file path
+
+    Returns:
+        tuple: (timestamps (numpy.ndarray): (N,) float64 seconds, pixels (numpy.ndarray): (N,leds,4) uint8 RGBA)
+
+    Raises:
+        ValueError: if file is not a valid dump
+        RuntimeError: if NumPy is not installed
+    """
+    if numpy is None:
+        raise RuntimeError(u'NumPy is required to load leds dump')
+
+    num_led, count, data, offset = _read_dump_data(path)
+    timestamps = numpy.frombuffer(data, dtype=u'<u4', count=count, offset=offset).astype(numpy.float64) / 1000000.0
+    pixels = numpy.frombuffer(data, dtype=numpy.uint8, count=4 * num_led * count, offset=offset + 4 * count).reshape(count, num_led, 4)
+
+    return timestamps, pixels
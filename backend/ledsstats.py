@@ -0,0 +1,353 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from bisect import bisect_left
+from collections import deque
+from threading import Lock
+from .timing import monotonic
+
+__all__ = ['Histogram', 'LedsTimingStats', 'LedsRenderTrace', 'LedsRenderTracer']
+
+class Histogram(object):
+    """
+    Fixed-size histogram: values are counted in buckets delimited by upper
+    bounds, so recording a value doesn't allocate memory
+    """
+
+    __slots__ = ('bounds', 'counts', 'count', 'total', 'max')
+
+    def __init__(self, bounds):
+        """
+        Constructor
+
+        Args:
+            bounds (list): sorted buckets upper bounds. Values greater than last
+                bound are counted in an extra overflow bucket
+        """
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        """
+        Record value
+
+        Args:
+            value (float): value to record
+        """
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value>self.max:
+            self.max = value
+
+    def reset(self):
+        """
+        Clear recorded values
+        """
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def percentile(self, percent):
+        """
+        Return approximated percentile: upper bound of bucket containing it
+
+        Args:
+            percent (float): percentile [0..100]
+
+        Returns:
+            float: percentile value (max value for overflow bucket, None if no value recorded)
+        """
+        if self.count==0:
+            return None
+
+        rank = percent / 100.0 * self.count
+        cumulated = 0
+        for index, count in enumerate(self.counts):
+            cumulated += count
+            if cumulated>=rank and count>0:
+                return self.bounds[index] if index<len(self.bounds) else self.max
+
+        return self.max
+
+    def to_dict(self):
+        """
+        Return histogram as dict
+
+        Returns:
+            dict: histogram::
+
+                {
+                    bounds (list): buckets upper bounds
+                    counts (list): values count per bucket (last one is overflow)
+                    count (int): number of values
+                    mean (float): mean value
+                    max (float): max value
+                    p50 (float): approximated median (see percentile)
+                    p95 (float): approximated 95th percentile
+                    p99 (float): approximated 99th percentile
+                }
+
+        """
+        return {
+            u'bounds': list(self.bounds),
+            u'counts': list(self.counts),
+            u'count': self.count,
+            u'mean': self.total / self.count if self.count else 0.0,
+            u'max': self.max,
+            u'p50': self.percentile(50),
+            u'p95': self.percentile(95),
+            u'p99': self.percentile(99),
+        }
+
+class LedsTimingStats(object):
+    """
+    Animation frames timing: lateness of frames against their deadline, late
+    frames and dropped frames (frames replaced by a later one before being shown)
+    """
+
+    #lateness buckets in milliseconds
+    LATENESS_BOUNDS = (0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 50.0, 100.0)
+    #frame is late if shown after this delay in milliseconds
+    LATE_THRESHOLD = 5.0
+
+    def __init__(self):
+        """
+        Constructor
+        """
+        self.lateness = Histogram(self.LATENESS_BOUNDS)
+        self.frames = 0
+        self.late_frames = 0
+        self.dropped_frames = 0
+
+    def add_frame(self, lateness):
+        """
+        Record shown frame
+
+        Args:
+            lateness (float): delay between frame deadline and update in seconds
+        """
+        lateness = lateness * 1000.0
+        self.lateness.add(lateness)
+        self.frames += 1
+        if lateness>self.LATE_THRESHOLD:
+            self.late_frames += 1
+
+    def add_dropped_frame(self):
+        """
+        Record dropped frame
+        """
+        self.dropped_frames += 1
+
+    def reset(self):
+        """
+        Clear stats
+        """
+        self.lateness.reset()
+        self.frames = 0
+        self.late_frames = 0
+        self.dropped_frames = 0
+
+    def to_dict(self):
+        """
+        Return stats as dict
+
+        Returns:
+            dict: stats::
+
+                {
+                    frames (int): number of shown frames
+                    late_frames (int): number of frames shown after LATE_THRESHOLD
+                    dropped_frames (int): number of frames never shown
+                    lateness (dict): lateness histogram in milliseconds (see Histogram.to_dict)
+                }
+
+        """
+        return {
+            u'frames': self.frames,
+            u'late_frames': self.late_frames,
+            u'dropped_frames': self.dropped_frames,
+            u'lateness': self.lateness.to_dict(),
+        }
+
+class LedsRenderTrace(object):
+    """
+    Timestamps of one rendered event, from render entry to first frame sent
+    to the leds (monotonic times, None until stage is reached)
+    """
+
+    __slots__ = ('tracer', 'entry', 'lookup', 'handoff', 'frame', 'loaded', 'wire')
+
+    def __init__(self, tracer, entry):
+        """
+        Constructor
+
+        Args:
+            tracer (LedsRenderTracer): tracer recording trace
+            entry (float): render entry time
+        """
+        self.tracer = tracer
+        self.entry = entry
+        self.lookup = None
+        self.handoff = None
+        self.frame = None
+        #time frame was loaded in leds driver, only flushes started after it can send the frame
+        self.loaded = None
+        self.wire = None
+
+    def mark_lookup(self):
+        """
+        Profile and its timeline were looked up
+        """
+        self.lookup = monotonic()
+
+    def mark_handoff(self):
+        """
+        Profile is handed off to leds engine
+        """
+        self.handoff = monotonic()
+
+    def mark_frame(self):
+        """
+        First profile frame was shown by leds engine. Trace then waits for
+        frame to be loaded in leds driver and sent to leds
+        """
+        self.frame = monotonic()
+        self.tracer.wait_wire(self)
+
+class LedsRenderTracer(object):
+    """
+    Trace render latency: each rendered event is timestamped when render is
+    entered, profile is looked up, profile is handed off to leds engine,
+    first frame is shown by engine and this frame is sent on the wire.
+    Latencies from render entry are kept for the last events so percentiles
+    can be computed.
+    """
+
+    STAGES = (u'lookup', u'handoff', u'frame', u'wire')
+
+    def __init__(self, size=1000):
+        """
+        Constructor
+
+        Args:
+            size (int): number of events kept per stage
+        """
+        self.size = size
+        self.traces = 0
+        self.__lock = Lock()
+        self.__shown = []
+        self.__waiting = []
+        self.__latencies = dict([(stage, deque(maxlen=size)) for stage in self.STAGES])
+
+    def begin(self):
+        """
+        Start tracing an event, at render entry
+
+        Returns:
+            LedsRenderTrace: trace to mark
+        """
+        return LedsRenderTrace(self, monotonic())
+
+    def wait_wire(self, trace):
+        """
+        Wait for frame to be loaded in leds driver, then sent to leds, to complete trace
+        """
+        with self.__lock:
+            self.__shown.append(trace)
+
+    def frame_loaded(self):
+        """
+        Frame shown by leds engine was loaded in leds driver: its traces wait
+        for a flush started after now
+        """
+        if not self.__shown:
+            return
+
+        now = monotonic()
+        with self.__lock:
+            for trace in self.__shown:
+                trace.loaded = now
+            self.__waiting.extend(self.__shown)
+            self.__shown = []
+
+    def flushed(self, sent, start):
+        """
+        Leds driver was flushed: complete waiting traces whose frame was
+        loaded before flush started, if flush actually sent a frame to leds.
+        Other traces wait for next flush.
+
+        Args:
+            sent (bool): True if a frame was sent, False if flush was skipped (unchanged frame or error)
+            start (float): flush start monotonic time
+        """
+        if not sent or not self.__waiting:
+            return
+
+        now = monotonic()
+        with self.__lock:
+            waiting = []
+            for trace in self.__waiting:
+                if trace.loaded<=start:
+                    trace.wire = now
+                    self.__record(trace)
+                else:
+                    waiting.append(trace)
+            self.__waiting = waiting
+
+    def __record(self, trace):
+        """
+        Record trace latencies in milliseconds
+        """
+        self.traces += 1
+        for stage in self.STAGES:
+            time = getattr(trace, stage)
+            if time is not None:
+                self.__latencies[stage].append((time - trace.entry) * 1000.0)
+
+    def reset(self):
+        """
+        Clear recorded latencies
+        """
+        with self.__lock:
+            self.traces = 0
+            for latencies in self.__latencies.values():
+                latencies.clear()
+
+    def get_summary(self):
+        """
+        Return latencies percentiles per stage
+
+        Returns:
+            dict: summary per stage::
+
+                {
+                    stage (string): {
+                        count (int): number of events
+                        p50 (float): median latency from render entry (ms)
+                        p95 (float): 95th percentile (ms)
+                        p99 (float): 99th percentile (ms)
+                        max (float): max latency (ms)
+                    },
+                    ...
+                }
+
+        """
+        summary = {}
+        for stage in self.STAGES:
+            with self.__lock:
+                latencies = sorted(self.__latencies[stage])
+            count = len(latencies)
+            summary[stage] = {
+                u'count': count,
+                u'p50': latencies[int(0.50 * (count - 1))] if count else None,
+                u'p95': latencies[int(0.95 * (count - 1))] if count else None,
+                u'p99': latencies[int(0.99 * (count - 1))] if count else None,
+                u'max': latencies[-1] if count else None,
+            }
+
+        return summary
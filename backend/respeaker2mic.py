@@ -5,8 +5,6 @@ import time
 import logging
 import os
 import uuid
-from threading import Thread
-import copy
 import shutil
 from raspiot.raspiot import RaspIotRenderer, RaspIotResources
 from raspiot.profiles.speechRecognitionHotwordProfile import SpeechRecognitionHotwordProfile
@@ -15,133 +13,19 @@ from raspiot.utils import CommandError, InvalidParameter, MissingParameter, CATE
 from raspiot.libs.internals.console import Console, EndlessConsole
 import apa102 as apa102
 from .seeed2micaudiodriver import Seeed2micAudioDriver
+from .ledsflusher import LedsFlusher
+from .ledsprofile import LedsProfileCompiler, LedsProfileStore
+from .ledsengine import LedsEngine, LedsLayer
+from .ledsstats import LedsRenderTracer
+from .audiosource import AlsaSource
+from .audiocapture import AudioCapture
+from .vumeter import VuMeter
+from .doa import DoaTracker
+from .vad import VadMonitor
+from .timing import monotonic
 
 __all__ = ['Respeaker2mic']
 
-class LedsProfileTask(Thread):
-    """
-    Class in charge of running leds profile
-    """
-    def __init__(self, respeaker2mic_instance, profile, terminated_callback):
-        """
-        Constructor
-
-        Args:
-            respeaker2mic_instance (Respeaker2mic): respeaker2mic instance
-            profile (dict): profile data
-        """
-        Thread.__init__(self)
-        Thread.daemon = True
-
-        #members
-        #self.logger = respeaker2mic_instance.logger
-        self.logger = logging.getLogger(self.__class__.__name__)
-        self.logger.setLevel(logging.INFO)
-        self.respeaker2mic = respeaker2mic_instance
-        self.profile = profile
-        self.terminated_callback = terminated_callback
-        self.running = True
-        self.test = False
-
-    def stop(self):
-        """
-        Stop task
-        """
-        self.running = False
-
-    def enable_test(self):
-        """
-        Set test to True, do not use repeat profile value
-        """
-        self.test = True
-
-    def get_color(self, color_str):
-        if color_str=='white':
-            return copy.copy(self.respeaker2mic.COLOR_WHITE)
-        elif color_str=='red':
-            return copy.copy(self.respeaker2mic.COLOR_RED)
-        elif color_str=='green':
-            return copy.copy(self.respeaker2mic.COLOR_GREEN)
-        elif color_str=='blue':
-            return copy.copy(self.respeaker2mic.COLOR_BLUE)
-        elif color_str=='yellow':
-            return copy.copy(self.respeaker2mic.COLOR_YELLOW)
-        elif color_str=='magenta':
-            return copy.copy(self.respeaker2mic.COLOR_MAGENTA)
-        elif color_str=='cyan':
-            return copy.copy(self.respeaker2mic.COLOR_CYAN)
-        else:
-            return copy.copy(self.respeaker2mic.COLOR_BLACK)
-
-    def __process_animation(self):
-        """
-        Process profile animation
-        """
-        for action in self.profile[u'actions']:
-            #stop statement if necessary
-            if not self.running:
-                break
-
-            #run action
-            self.logger.debug('Action: %s' % action)
-            if action[u'action'] in (1,2,3):
-                #set led1 or led2 or led3
-                #prepare color and brightness
-                color = self.get_color(action[u'color'])
-                color.append(action[u'brightness'])
-                #turn on leds
-                if action[u'action']==1:
-                    self.respeaker2mic.turn_on_leds(led1=color)
-                elif action[u'action']==2:
-                    self.respeaker2mic.turn_on_leds(led2=color)
-                else:
-                    self.respeaker2mic.turn_on_leds(led3=color)
-
-            elif action[u'action']==4:
-                #set all leds
-                #prepare color and brightness
-                color = self.get_color(action[u'color'])
-                color.append(action[u'brightness'])
-                #turn on leds
-                self.respeaker2mic.turn_on_leds(led1=color, led2=color, led3=color)
-
-            elif action[u'action']==5:
-                #pause
-                count = int(action[u'pause']/50)
-                for i in range(count):
-                    if not self.running:
-                        break
-                    time.sleep(0.05)
-
-    def run(self):
-        """
-        Run task
-        """
-        #compute repeat
-        if self.test:
-            #process animation once
-            self.__process_animation()
-
-        elif self.profile[u'repeat']==self.respeaker2mic.REPEAT_INF:
-            #process indefinitely
-            while self.running:
-                self.__process_animation()
-
-        else:
-            #process amount of times
-            for i in range(self.profile[u'repeat']):
-                if not self.running:
-                    break
-                self.__process_animation()
-
-        #end animation turning off everything
-        self.respeaker2mic.turn_off_leds()
-
-        #end of process
-        self.terminated_callback()
-
-
-
 class Respeaker2mic(RaspIotRenderer, RaspIotResources):
     """
     Respeaker2mic module handles respeaker2mic configuration:
@@ -193,6 +77,14 @@ class Respeaker2mic(RaspIotRenderer, RaspIotResources):
 
     DEFAULT_CONFIG = {
         u'button_gpio_uuid': None,
+        u'leds_transport': u'spidev',
+        u'leds_max_fps': 50,
+        u'leds_engine': u'thread',
+        u'audio_device': AlsaSource.DEVICE,
+        u'audio_preroll': 2.0,
+        u'doa_leds': False,
+        u'vad_leds_profile': None,
+        u'vad_gate_doa': True,
         u'leds_profiles' : [
             {
                 u'name': 'Breathe (blue)',
@@ -200,43 +92,8 @@ class Respeaker2mic(RaspIotRenderer, RaspIotResources):
                 u'repeat': 99,
                 u'default': True,
                 u'actions': [
-                    {"action": 4, "color": "blue", "pause": 0, "brightness": 10}, 
-                    {"action": 5, "color": None, "pause": 100, "brightness": 0}, 
-                    {"action": 4, "color": "blue", "pause": 0, "brightness": 20}, 
-                    {"action": 5, "color": None, "pause": 100, "brightness": 0}, 
-                    {"action": 4, "color": "blue", "pause": 0, "brightness": 30}, 
-                    {"action": 5, "color": None, "pause": 100, "brightness": 0}, 
-                    {"action": 4, "color": "blue", "pause": 0, "brightness": 40}, 
-                    {"action": 5, "color": None, "pause": 100, "brightness": 0}, 
-                    {"action": 4, "color": "blue", "pause": 0, "brightness": 50}, 
-                    {"action": 5, "color": None, "pause": 100, "brightness": 0}, 
-                    {"action": 4, "color": "blue", "pause": 0, "brightness": 60}, 
-                    {"action": 5, "color": None, "pause": 100, "brightness": 0}, 
-                    {"action": 4, "color": "blue", "pause": 0, "brightness": 70}, 
-                    {"action": 5, "color": None, "pause": 100, "brightness": 0}, 
-                    {"action": 4, "color": "blue", "pause": 0, "brightness": 80}, 
-                    {"action": 5, "color": None, "pause": 100, "brightness": 0}, 
-                    {"action": 4, "color": "blue", "pause": 0, "brightness": 90}, 
-                    {"action": 5, "color": None, "pause": 100, "brightness": 0}, 
-                    {"action": 4, "color": "blue", "pause": 0, "brightness": 100}, 
-                    {"action": 5, "color": None, "pause": 100, "brightness": 0}, 
-                    {"action": 4, "color": "blue", "pause": 0, "brightness": 90}, 
-                    {"action": 5, "color": None, "pause": 100, "brightness": 0}, 
-                    {"action": 4, "color": "blue", "pause": 0, "brightness": 80}, 
-                    {"action": 5, "color": None, "pause": 100, "brightness": 0}, 
-                    {"action": 4, "color": "blue", "pause": 0, "brightness": 70}, 
-                    {"action": 5, "color": None, "pause": 100, "brightness": 0}, 
-                    {"action": 4, "color": "blue", "pause": 0, "brightness": 60}, 
-                    {"action": 5, "color": None, "pause": 100, "brightness": 0}, 
-                    {"action": 4, "color": "blue", "pause": 0, "brightness": 50}, 
-                    {"action": 5, "color": None, "pause": 100, "brightness": 0}, 
-                    {"action": 4, "color": "blue", "pause": 0, "brightness": 40}, 
-                    {"action": 5, "color": None, "pause": 100, "brightness": 0}, 
-                    {"action": 4, "color": "blue", "pause": 0, "brightness": 30}, 
-                    {"action": 5, "color": None, "pause": 100, "brightness": 0}, 
-                    {"action": 4, "color": "blue", "pause": 0, "brightness": 20}, 
-                    {"action": 5, "color": None, "pause": 100, "brightness": 0}, 
-                    {"action": 4, "color": "blue", "pause": 0, "brightness": 10}
+                    {"action": 6, "color": "blue", "pause": 900, "brightness": 10, "to_brightness": 100, "easing": "ease-in-out"}, 
+                    {"action": 6, "color": "blue", "pause": 900, "brightness": 100, "to_brightness": 10, "easing": "ease-in-out"}
                 ]
             }, {
                 u'name': 'Blink (red)',
@@ -310,6 +167,17 @@ class Respeaker2mic(RaspIotRenderer, RaspIotResources):
     COLOR_CYAN = [0, 255, 255]
     COLOR_MAGENTA = [255, 0, 255]
 
+    COLORS = {
+        u'black': COLOR_BLACK,
+        u'white': COLOR_WHITE,
+        u'red': COLOR_RED,
+        u'green': COLOR_GREEN,
+        u'blue': COLOR_BLUE,
+        u'yellow': COLOR_YELLOW,
+        u'cyan': COLOR_CYAN,
+        u'magenta': COLOR_MAGENTA,
+    }
+
     LED_OFF = COLOR_BLACK
     LED_ON = COLOR_WHITE
 
@@ -321,6 +189,20 @@ class Respeaker2mic(RaspIotRenderer, RaspIotResources):
     REPEAT_5 = 5
     REPEAT_INF = 99
 
+    LEDS_GAMMA = 2.2
+
+    LEDS_ENGINE_THREAD = u'thread'
+    LEDS_ENGINE_ASYNCIO = u'asyncio'
+
+    LEDS_PRIORITY_AMBIENT = 0
+    LEDS_PRIORITY_NOTIFICATION = 10
+    LEDS_PRIORITY_VAD = 15
+    LEDS_PRIORITY_DOA = 20
+    LEDS_BLENDS = (LedsLayer.BLEND_OVERRIDE, LedsLayer.BLEND_ALPHA)
+
+    #max delay for audio capture to deliver its first block (seconds)
+    AUDIO_START_TIMEOUT = 2.0
+
     def __init__(self, bootstrap, debug_enabled):
         """
         Constructor
@@ -336,7 +218,17 @@ class Respeaker2mic(RaspIotRenderer, RaspIotResources):
         #members
         self.seeed2mic_driver = Seeed2micAudioDriver(self.cleep_filesystem)
         self.leds_driver = None
-        self.__leds_profile_task = None
+        self.leds_flusher = None
+        self.leds_compiler = None
+        self.leds_engine = None
+        self.leds_profiles = LedsProfileStore(lambda: self._get_config_field(u'leds_profiles'))
+        self.leds_tracer = LedsRenderTracer()
+        self.audio_capture = None
+        self.audio_capture_acquired = False
+        self.vu_meter = None
+        self.doa_tracker = None
+        self.vad = None
+        self.__speech_start = None
 
         #register audio driver
         self._register_driver(self.seeed2mic_driver)
@@ -351,9 +243,46 @@ class Respeaker2mic(RaspIotRenderer, RaspIotResources):
 
         #play blink green at startup
         if self.seeed2mic_driver.is_installed():
-            self.leds_driver = apa102.APA102(num_led=3)
+            transport = self._get_config_field(u'leds_transport') or u'spidev'
+            self.leds_driver = apa102.APA102(num_led=3, gamma=self.LEDS_GAMMA, transport=transport)
+            self.leds_compiler = LedsProfileCompiler(self.leds_driver, self.COLORS)
+            if self._get_config_field(u'leds_engine')==self.LEDS_ENGINE_ASYNCIO:
+                #asyncio engine is python3 only
+                from .ledsasyncengine import AsyncLedsEngine
+                self.leds_engine = AsyncLedsEngine(self._show_leds_frame, self.turn_off_leds, self.leds_compiler.get_off_pixels())
+            else:
+                self.leds_engine = LedsEngine(self._show_leds_frame, self.turn_off_leds, self.leds_compiler.get_off_pixels())
+            self.leds_engine.start()
+            #leds frames are sent by flusher if frame rate is capped
+            max_fps = self._get_config_field(u'leds_max_fps')
+            if max_fps:
+                self.leds_flusher = LedsFlusher(self.leds_driver, max_fps, self.leds_tracer.flushed)
+                self.leds_flusher.start()
             self.play_leds_profile(self.LEDS_PROFILE_BLINK_GREEN)
 
+    def _stop(self):
+        """
+        Stop module
+        """
+        if self.vu_meter:
+            self.vu_meter.stop()
+            self.vu_meter.join(1.0)
+        if self.doa_tracker:
+            self.doa_tracker.stop()
+            self.doa_tracker.join(1.0)
+        if self.vad:
+            self.vad.stop()
+            self.vad.join(1.0)
+        if self.audio_capture:
+            self.audio_capture.stop()
+            self.audio_capture.join(1.0)
+        if self.leds_engine:
+            self.leds_engine.stop()
+            self.leds_engine.join(1.0)
+        if self.leds_flusher:
+            self.leds_flusher.stop()
+            self.leds_flusher.join(1.0)
+
     def install_driver(self):
         """
         Install driver
@@ -411,7 +340,7 @@ class Respeaker2mic(RaspIotRenderer, RaspIotResources):
         """
         return {
             u'driverinstalled': self.seeed2mic_driver.is_installed(),
-            u'ledsprofiles': self._get_config_field(u'leds_profiles')
+            u'ledsprofiles': self.leds_profiles.get_profiles()
         }
 
     def _resource_acquired(self, resource_name):
@@ -422,6 +351,8 @@ class Respeaker2mic(RaspIotRenderer, RaspIotResources):
             resource_name (string): acquired resource name
         """
         self.logger.debug(u'Resource "%s" acquired' % resource_name)
+        if resource_name==u'audio.capture':
+            self.audio_capture_acquired = True
 
     def _resource_needs_to_be_released(self, resource_name):
         """
@@ -431,8 +362,23 @@ class Respeaker2mic(RaspIotRenderer, RaspIotResources):
             resource_name (string): resource name to release
         """
         self.logger.debug(u'Resource "%s" needs to be released' % resource_name)
+        if resource_name==u'audio.capture':
+            self.audio_capture_acquired = False
+            self.__release_audio_capture()
         self._release_resource(resource_name)
 
+    def __release_audio_capture(self):
+        """
+        Stop audio consumers and shared capture, so capture device is released
+        """
+        self.stop_vu_meter()
+        self.stop_doa()
+        self.stop_vad()
+        if self.audio_capture is not None:
+            self.audio_capture.stop()
+            self.audio_capture.join(1.0)
+            self.audio_capture = None
+
     def __set_led(self, led_id, color, brightness=10):
         """
         Configure led color and brightness
@@ -450,6 +396,9 @@ class Respeaker2mic(RaspIotRenderer, RaspIotResources):
             raise InvalidParameter(u'Brightness must be 0..100')
         if len(color)==4 and (color[3]<0 or color[3]>100):
             raise InvalidParameter(u'Brightness must be 0..100')
+        for value in color[:3]:
+            if value<0 or value>255:
+                raise InvalidParameter(u'Color values must be 0..255')
 
 	#handle brightness within color value
         if len(color)==4:
@@ -460,6 +409,27 @@ class Respeaker2mic(RaspIotRenderer, RaspIotResources):
         #self.logger.debug(u'Set led%s color R=%s G=%s B=%s with Brightness=%s' % (led_id, color[0], color[1], color[2], brightness))
         self.leds_driver.set_pixel(led_id, color[0], color[1], color[2], brightness)
 
+    def __show_leds(self):
+        """
+        Send pixel buffer to leds, through flusher if enabled
+        """
+        if self.leds_flusher:
+            self.leds_flusher.flush()
+        else:
+            start = monotonic()
+            self.leds_tracer.flushed(self.leds_driver.show(), start)
+
+    def _show_leds_frame(self, pixels):
+        """
+        Show precomputed leds frame
+
+        Args:
+            pixels (bytes): LED frames (see APA102.get_pixels)
+        """
+        self.leds_driver.load_pixels(pixels)
+        self.leds_tracer.frame_loaded()
+        self.__show_leds()
+
     def turn_on_leds(self, led1=None, led2=None, led3=None):
         """
         Turn on leds with specified color. None value does nothing on led
@@ -481,7 +451,7 @@ class Respeaker2mic(RaspIotRenderer, RaspIotResources):
             self.__set_led(2, led3)
 
         #show leds
-        self.leds_driver.show()
+        self.__show_leds()
 
     def turn_off_leds(self, led1=True, led2=True, led3=True):
         """
@@ -503,7 +473,7 @@ class Respeaker2mic(RaspIotRenderer, RaspIotResources):
             self.__set_led(2, self.LED_OFF)
 
         #show leds
-        self.leds_driver.show()
+        self.__show_leds()
 
     def add_leds_profile(self, name, repeat, actions):
         """
@@ -534,23 +504,31 @@ class Respeaker2mic(RaspIotRenderer, RaspIotResources):
             raise InvalidParameter(u'You must add at least one action in leds profile')
 
         #check name
-        leds_profiles = self._get_config_field(u'leds_profiles')
-        for profile in leds_profiles:
-            if profile[u'name']==name:
-                raise InvalidParameter(u'Profile with same name already exists')
+        if self.leds_profiles.get_by_name(name) is not None:
+            raise InvalidParameter(u'Profile with same name already exists')
 
         #append new profile
-        leds_profiles.append({
+        profile = {
             u'name': name,
             u'repeat': repeat,
             u'uuid': str(uuid.uuid4()),
             u'actions': actions,
             u'default': False
-        })
+        }
+
+        #compile profile to check actions and have it ready to play
+        if self.leds_compiler:
+            try:
+                self.leds_compiler.get_timeline(profile)
+            except (ValueError, KeyError, TypeError) as e:
+                raise InvalidParameter(u'Invalid leds profile action: %s' % str(e))
+        leds_profiles = self.leds_profiles.get_profiles()
+        leds_profiles.append(profile)
 
         #save config
         if not self._set_config_field(u'leds_profiles', leds_profiles):
             raise CommandError(u'Unable to save leds profile')
+        self.leds_profiles.invalidate()
 
         return True
 
@@ -562,7 +540,7 @@ class Respeaker2mic(RaspIotRenderer, RaspIotResources):
             profile_uuid (string): leds profile uuid
         """
         #check parameters
-        if self.__leds_profile_task is not None:
+        if self.__is_leds_profile_playing():
             raise CommandError(u'Leds profile is running. Please wait until end of it.')
         if profile_uuid is None or len(profile_uuid)==0:
             raise MissingParameter(u'Parameter profile_uuid is missing')
@@ -570,31 +548,54 @@ class Respeaker2mic(RaspIotRenderer, RaspIotResources):
             raise InvalidParameter(u'You can\'t delete default leds profiles')
 
         #get profile
-        found = False
-        leds_profiles = self._get_config_field(u'leds_profiles')
-        for profile in leds_profiles:
-            if profile[u'uuid']==profile_uuid:
-                #profile found, remove it
-                found = True
-                leds_profiles.remove(profile)
-                break
-
-        #check found
-        if not found:
+        profile = self.leds_profiles.get(profile_uuid)
+        if profile is None:
             self.logger.error(u'Unable to remove profile with uuid %s' % profile_uuid)
             raise CommandError(u'Unable to remove profile')
+        if self.leds_compiler:
+            self.leds_compiler.invalidate(profile_uuid)
 
         #save config
+        leds_profiles = [p for p in self.leds_profiles.get_profiles() if p[u'uuid']!=profile_uuid]
         if not self._set_config_field(u'leds_profiles', leds_profiles):
             raise CommandError(u'Unable to save config')
+        self.leds_profiles.invalidate()
 
         return True
 
-    def __leds_profile_task_terminated(self):
+    def __is_leds_profile_playing(self, priority=None):
         """
-        Reset leds profile task member when task is terminated
+        Return True if a leds profile is playing
+
+        Args:
+            priority (int): check only layer with this priority (None for any layer)
+
+        Returns:
+            bool: True if leds profile is playing
+        """
+        return self.leds_engine is not None and self.leds_engine.is_playing(priority)
+
+    def __get_leds_profile_timeline(self, profile):
         """
-        self.__leds_profile_task = None
+        Return compiled leds profile
+
+        Args:
+            profile (dict): leds profile
+
+        Returns:
+            LedsTimeline: compiled profile
+
+        Raises:
+            CommandError: if driver is not installed or profile is invalid
+        """
+        if self.leds_compiler is None:
+            raise CommandError(u'Driver is not installed')
+
+        try:
+            return self.leds_compiler.get_timeline(profile)
+        except (ValueError, KeyError, TypeError):
+            self.logger.exception(u'Unable to compile leds profile "%s":' % profile[u'uuid'])
+            raise CommandError(u'Invalid leds profile')
 
     def test_leds_profile(self, profile_uuid):
         """
@@ -608,71 +609,452 @@ class Respeaker2mic(RaspIotRenderer, RaspIotResources):
             MissingParameter: if function parameter is missing
         """
         #check parameters
-        if self.__leds_profile_task is not None:
+        if self.vu_meter is not None:
+            raise CommandError(u'Leds are driven by vu meter. Please stop it first.')
+        if self.__is_leds_profile_playing(self.LEDS_PRIORITY_NOTIFICATION):
             raise CommandError(u'Leds profile is running. Please wait until end of it.')
-        if profile_uuid is None or len(profile_uuid)==0:
-            raise MissingParameter(u'Parameter profile_uuid is missing')
 
-        #get profile
-        selected_profile = None
-        for profile in self._get_config_field(u'leds_profiles'):
-            if profile[u'uuid']==profile_uuid:
-                #profile found, stop statement
-                selected_profile = profile
-                break
+        self.__play_leds_profile(profile_uuid, test=True)
 
-        #check profile
-        if selected_profile is None:
-            self.logger.error(u'Unable to test leds profile with uuid %s' % profile_uuid)
-            raise CommandError(u'Unable to test leds profile')
-
-        #play profile
-        self.__leds_profile_task = LedsProfileTask(self, selected_profile, self.__leds_profile_task_terminated)
-        self.__leds_profile_task.enable_test()
-        self.__leds_profile_task.start()
-
-    def play_leds_profile(self, profile_uuid):
+    def play_leds_profile(self, profile_uuid, priority=None, blend=None, alpha=None):
         """
         Play specified leds profile
 
+        Profiles are played on layers: a profile played with higher priority
+        is drawn over profiles with lower priority, only on leds it sets. By
+        default profiles are played on notification layer, over ambient layer.
+
         Args:
             profile_uuid (string): leds profile uuid
+            priority (int): layer priority (default LEDS_PRIORITY_NOTIFICATION)
+            blend (string): how layer is drawn over lower layers: override (default) or alpha
+            alpha (float): layer opacity for alpha blend [0..1] (default 0.5)
 
         Raises:
             CommandError: if error occured during command execution
+            InvalidParameter: if function parameter is invalid
             MissingParameter: if function parameter is missing
         """
         #check parameters
-        if self.__leds_profile_task is not None:
+        if priority is None:
+            priority = self.LEDS_PRIORITY_NOTIFICATION
+        if not isinstance(priority, int) or isinstance(priority, bool):
+            raise InvalidParameter(u'Parameter priority must be an integer')
+        if blend is None:
+            blend = LedsLayer.BLEND_OVERRIDE
+        if blend not in self.LEDS_BLENDS:
+            raise InvalidParameter(u'Parameter blend is not valid. See available values')
+        if alpha is None:
+            alpha = 0.5 if blend==LedsLayer.BLEND_ALPHA else 1.0
+        if alpha<0.0 or alpha>1.0:
+            raise InvalidParameter(u'Parameter alpha must be 0..1')
+        if self.vu_meter is not None:
+            raise CommandError(u'Leds are driven by vu meter. Please stop it first.')
+        if self.__is_leds_profile_playing(priority):
             raise CommandError(u'Leds profile is running. Please wait until end of it.')
+
+        self.__play_leds_profile(profile_uuid, priority=priority, blend=blend, alpha=alpha)
+
+    def stop_leds_profile(self, priority=None):
+        """
+        Stop leds profile
+
+        Args:
+            priority (int): priority of layer to stop (None to stop all profiles)
+
+        Raises:
+            CommandError: if driver is not installed
+            InvalidParameter: if function parameter is invalid
+        """
+        if self.leds_engine is None:
+            raise CommandError(u'Driver is not installed')
+        if priority is not None and (not isinstance(priority, int) or isinstance(priority, bool)):
+            raise InvalidParameter(u'Parameter priority must be an integer')
+
+        self.leds_engine.stop_playing(priority)
+
+    def get_leds_stats(self, reset=False):
+        """
+        Return leds timing stats
+
+        Args:
+            reset (bool): clear driver, animation and flusher stats after reading them
+                (last profile measures are replaced when next profile is played)
+
+        Returns:
+            dict: leds stats::
+
+                {
+                    driver (dict): sent and skipped frames, SPI transfer durations histogram (ms)
+                    animation (dict): shown, late and dropped frames, frames lateness histogram (ms)
+                    flusher (dict): flush requests and flushes (None if flusher is disabled)
+                    last_profile (dict): measures of last played profile
+                }
+
+        Raises:
+            CommandError: if driver is not installed
+        """
+        if self.leds_engine is None:
+            raise CommandError(u'Driver is not installed')
+
+        stats = {
+            u'driver': self.leds_driver.get_frame_stats(),
+            u'animation': self.leds_engine.compositor.stats.to_dict(),
+            u'flusher': {
+                u'requests': self.leds_flusher.flush_requests,
+                u'flushes': self.leds_flusher.flushes,
+            } if self.leds_flusher else None,
+            u'last_profile': dict(self.leds_engine.stats),
+        }
+
+        if reset:
+            self.leds_driver.reset_frame_stats()
+            self.leds_engine.compositor.stats.reset()
+            if self.leds_flusher:
+                self.leds_flusher.reset_stats()
+
+        return stats
+
+    def __play_leds_profile(self, profile_uuid, test=False, priority=LEDS_PRIORITY_NOTIFICATION, blend=LedsLayer.BLEND_OVERRIDE, alpha=1.0, trace=None):
+        """
+        Play specified leds profile, replacing profile being played on same layer
+
+        Args:
+            profile_uuid (string): leds profile uuid
+            test (bool): play profile once if True
+            priority (int): layer priority
+            blend (string): how layer is drawn over lower layers
+            alpha (float): layer opacity for alpha blend
+            trace (LedsRenderTrace): render trace (optional)
+
+        Raises:
+            CommandError: if error occured during command execution
+            MissingParameter: if function parameter is missing
+        """
+        #check parameters
         if profile_uuid is None or len(profile_uuid)==0:
             raise MissingParameter(u'Parameter profile_uuid is missing')
 
         #get profile
-        selected_profile = None
-        for profile in self._get_config_field(u'leds_profiles'):
-            if profile[u'uuid']==profile_uuid:
-                #profile found, stop statement
-                selected_profile = profile
-                break
+        selected_profile = self.leds_profiles.get(profile_uuid)
 
         #check profile
         if selected_profile is None:
             self.logger.error(u'Unable to play leds profile with uuid %s' % profile_uuid)
             raise CommandError(u'Unable to play leds profile')
 
+        #compute repeat
+        if test:
+            cycles = 1
+        elif selected_profile[u'repeat']==self.REPEAT_INF:
+            cycles = None
+        else:
+            cycles = selected_profile[u'repeat']
+
         #play profile
-        self.__leds_profile_task = LedsProfileTask(self, selected_profile, self.__leds_profile_task_terminated)
-        self.__leds_profile_task.start()
+        timeline = self.__get_leds_profile_timeline(selected_profile)
+        if trace:
+            trace.mark_lookup()
+        self.leds_engine.play(selected_profile, timeline, cycles, priority, blend, alpha, trace)
+
+    def get_leds_latency(self, reset=False):
+        """
+        Return render latency summary: latency percentiles from render entry
+        to profile lookup, handoff to leds engine, first frame shown by engine
+        and first frame sent to leds
+
+        Args:
+            reset (bool): clear latencies after reading them
+
+        Returns:
+            dict: latency summary per stage (see LedsRenderTracer.get_summary)
+        """
+        summary = self.leds_tracer.get_summary()
+        if reset:
+            self.leds_tracer.reset()
+
+        return summary
+
+    def get_audio_reader(self, preroll=0.0):
+        """
+        Return reader of shared audio capture, starting capture if needed.
+        Reader must be closed when no longer used: capture is stopped when
+        its last reader is closed, so pre-roll only covers audio captured
+        while another reader is open
+
+        Args:
+            preroll (float): start reading this duration in the past in seconds (limited to audio_preroll config)
+
+        Returns:
+            CaptureReader: audio source reading capture
+
+        Raises:
+            CommandError: if capture device is used by another module or can't be captured
+        """
+        if not self.audio_capture_acquired:
+            #given to another module, it will be acquired again once released
+            raise CommandError(u'Audio capture device is used by another application')
+
+        if self.audio_capture is None or not self.audio_capture.running:
+            if self.audio_capture is not None:
+                #wait for stopped capture to release capture device
+                self.audio_capture.join(1.0)
+            source = AlsaSource(self._get_config_field(u'audio_device') or AlsaSource.DEVICE)
+            self.audio_capture = AudioCapture(source, self._get_config_field(u'audio_preroll') or 0.0, auto_stop=True)
+            self.audio_capture.start()
+
+        reader = self.audio_capture.get_reader(preroll)
+        if not self.audio_capture.wait_started(self.AUDIO_START_TIMEOUT):
+            #capture stops if this is its only reader
+            reader.close()
+            raise CommandError(u'Unable to capture audio device. Is it busy?')
+
+        return reader
+
+    def get_audio_stats(self):
+        """
+        Return shared audio capture stats
+
+        Returns:
+            dict: capture stats (see AudioCapture.get_stats) or None if capture is not running
+        """
+        if self.audio_capture is None:
+            return None
+
+        return self.audio_capture.get_stats()
 
-    def __stop_leds_profile_task(self):
+    def start_vu_meter(self):
         """
-        Stop leds profile task
+        Start audio-reactive leds mode: leds show captured audio levels until
+        vu meter is stopped. Leds profiles are not rendered meanwhile
+
+        Raises:
+            CommandError: if driver is not installed or vu meter can't be started
         """
-        if self.__leds_profile_task is not None:
-            self.__leds_profile_task.stop()
-            #make sure task is stopped (variable is resetted at end of task, see __leds_profile_task_terminated)
-            time.sleep(0.25)
+        if self.leds_engine is None:
+            raise CommandError(u'Driver is not installed')
+        if self.vu_meter is not None and self.vu_meter.is_alive():
+            raise CommandError(u'Vu meter is already running')
+
+        reader = self.get_audio_reader()
+        try:
+            self.vu_meter = VuMeter(reader, self.leds_driver, self._show_leds_frame)
+        except RuntimeError as e:
+            reader.close()
+            raise CommandError(str(e))
+        self.leds_engine.stop_playing()
+        self.vu_meter.start()
+
+    def stop_vu_meter(self):
+        """
+        Stop audio-reactive leds mode
+        """
+        if self.vu_meter is None:
+            return
+
+        self.vu_meter.stop()
+        self.vu_meter.join(1.0)
+        self.vu_meter = None
+        self.turn_off_leds()
+
+    def start_doa(self, leds=None):
+        """
+        Start sound source direction of arrival tracking. Angle changes are
+        published with respeaker2mic.doa.update event
+
+        Args:
+            leds (bool): light led nearest to speaker when hotword is detected (default doa_leds config value)
+
+        Raises:
+            CommandError: if doa tracking can't be started
+        """
+        if self.doa_tracker is not None and self.doa_tracker.is_alive():
+            raise CommandError(u'Direction of arrival tracking is already running')
+        if leds is not None and not self._set_config_field(u'doa_leds', leds):
+            raise CommandError(u'Unable to save config')
+
+        reader = self.get_audio_reader()
+        try:
+            self.doa_tracker = DoaTracker(reader, self.__doa_angle_changed, gate=self.__doa_gate)
+        except RuntimeError as e:
+            reader.close()
+            raise CommandError(str(e))
+        self.doa_tracker.start()
+
+    def stop_doa(self):
+        """
+        Stop direction of arrival tracking
+        """
+        if self.doa_tracker is None:
+            return
+
+        self.doa_tracker.stop()
+        self.doa_tracker.join(1.0)
+        self.doa_tracker = None
+
+    def get_doa(self):
+        """
+        Return sound source angle
+
+        Returns:
+            float: angle in degrees (0 in front of board, positive towards second microphone)
+                or None if unknown or tracking is not running
+        """
+        if self.doa_tracker is None:
+            return None
+
+        return self.doa_tracker.get_angle()
+
+    def __doa_angle_changed(self, angle):
+        """
+        Called by doa tracker when sound source angle changed
+
+        Args:
+            angle (float): angle in degrees
+        """
+        self.send_event(u'respeaker2mic.doa.update', {u'angle': angle})
+
+    def __doa_gate(self):
+        """
+        Direction of arrival is only estimated on speech when voice activity
+        detection is running and vad_gate_doa config is enabled
+
+        Returns:
+            bool: True if block must be processed
+        """
+        if self.vad is None or not self._get_config_field(u'vad_gate_doa'):
+            return True
+
+        return self.vad.is_speech()
+
+    def __show_doa_led(self):
+        """
+        Light led nearest to speaker for a while, over other leds profiles
+        """
+        angle = self.get_doa()
+        if angle is None or self.leds_compiler is None:
+            return
+
+        #leds are spread from first microphone side (-90) to second microphone side (90)
+        led = int(round((angle + 90.0) / 180.0 * (self.leds_driver.num_led - 1)))
+        profile = {
+            u'name': u'Direction of arrival',
+            u'uuid': u'doa-%d' % led,
+            u'repeat': self.REPEAT_1,
+            u'default': True,
+            u'actions': [
+                {u'action': led + 1, u'color': u'white', u'pause': 0, u'brightness': 60},
+                {u'action': 5, u'color': None, u'pause': 1500, u'brightness': 0},
+            ]
+        }
+        timeline = self.__get_leds_profile_timeline(profile)
+        self.leds_engine.play(profile, timeline, 1, self.LEDS_PRIORITY_DOA)
+
+    def start_vad(self, leds_profile_uuid=None):
+        """
+        Start voice activity detection. Speech start and end are published with
+        respeaker2mic.speech.start and respeaker2mic.speech.end events
+
+        Args:
+            leds_profile_uuid (string): leds profile played while speech is detected,
+                empty string to disable it (default vad_leds_profile config value)
+
+        Raises:
+            CommandError: if voice activity detection can't be started
+            InvalidParameter: if leds profile doesn't exist
+        """
+        if self.vad is not None and self.vad.is_alive():
+            raise CommandError(u'Voice activity detection is already running')
+        if leds_profile_uuid is not None:
+            if leds_profile_uuid and self.leds_profiles.get(leds_profile_uuid) is None:
+                raise InvalidParameter(u'Leds profile "%s" does not exist' % leds_profile_uuid)
+            if not self._set_config_field(u'vad_leds_profile', leds_profile_uuid or None):
+                raise CommandError(u'Unable to save config')
+
+        reader = self.get_audio_reader()
+        try:
+            self.vad = VadMonitor(reader, self.__speech_changed)
+        except RuntimeError as e:
+            reader.close()
+            raise CommandError(str(e))
+        self.vad.start()
+
+    def stop_vad(self):
+        """
+        Stop voice activity detection
+        """
+        if self.vad is None:
+            return
+
+        speech = self.vad.is_speech()
+        self.vad.stop()
+        self.vad.join(1.0)
+        self.vad = None
+        if speech:
+            self.__speech_changed(False)
+
+    def get_vad_stats(self):
+        """
+        Return voice activity detection state and cost
+
+        Returns:
+            dict: vad stats or None if vad is not running::
+
+                {
+                    speech (bool): True if speech is detected
+                    energy_db (float): last frame energy (dB relative to full scale)
+                    noise_db (float): noise floor (dB relative to full scale)
+                    cpu (float): processing time per audio time in percent
+                    process_ms (dict): block processing durations histogram
+                }
+
+        """
+        if self.vad is None:
+            return None
+
+        return {
+            u'speech': self.vad.is_speech(),
+            u'energy_db': self.vad.detector.energy_db,
+            u'noise_db': self.vad.detector.noise_db,
+            u'cpu': self.vad.get_cpu_usage(),
+            u'process_ms': self.vad.process_times.to_dict(),
+        }
+
+    def is_speech(self):
+        """
+        Return True if voice activity detection is running and detects speech
+
+        Returns:
+            bool: speech state
+        """
+        return self.vad is not None and self.vad.is_speech()
+
+    def __speech_changed(self, speech):
+        """
+        Called by vad when speech starts or ends
+
+        Args:
+            speech (bool): True if speech started
+        """
+        if speech:
+            self.__speech_start = monotonic()
+            self.send_event(u'respeaker2mic.speech.start', {})
+        else:
+            duration = monotonic() - self.__speech_start if self.__speech_start else 0.0
+            self.__speech_start = None
+            self.send_event(u'respeaker2mic.speech.end', {u'duration': duration})
+
+        #play leds profile while speech is detected
+        profile_uuid = self._get_config_field(u'vad_leds_profile')
+        if not profile_uuid or self.leds_engine is None or self.vu_meter is not None:
+            return
+        if not speech:
+            self.leds_engine.stop_playing(self.LEDS_PRIORITY_VAD)
+            return
+        try:
+            self.__play_leds_profile(profile_uuid, priority=self.LEDS_PRIORITY_VAD)
+        except CommandError:
+            self.logger.warning(u'Unable to play vad leds profile "%s"' % profile_uuid)
 
     def _render(self, profile):
         """
@@ -681,26 +1063,30 @@ class Respeaker2mic(RaspIotRenderer, RaspIotResources):
         Args:
             profile (Profile): profile instance
         """
+        trace = self.leds_tracer.begin()
         self.logger.debug('Render profile: %s' % profile)
+        if self.vu_meter is not None:
+            #leds are driven by vu meter
+            return
+
         if isinstance(profile, SpeechRecognitionHotwordProfile):
             #render hotword profile
             if profile.detected:
                 #hotword detected: breathe
-                self.__stop_leds_profile_task()
-                self.play_leds_profile(self.LEDS_PROFILE_BREATHE_BLUE)
+                self.__play_leds_profile(self.LEDS_PROFILE_BREATHE_BLUE, trace=trace)
+                if self.doa_tracker is not None and self._get_config_field(u'doa_leds'):
+                    self.__show_doa_led()
             else:
                 #hotword released: search command
-                self.__stop_leds_profile_task()
-                self.play_leds_profile(self.LEDS_PROFILE_SLIDE_YELLOW)
+                self.__play_leds_profile(self.LEDS_PROFILE_SLIDE_YELLOW, trace=trace)
         
         elif isinstance(profile, SpeechRecognitionCommandProfile):
             #render command profile
-            self.__stop_leds_profile_task()
             if not profile.error:
                 #command detected: long green
-                self.play_leds_profile(self.LEDS_PROFILE_LONG_GREEN)
+                self.__play_leds_profile(self.LEDS_PROFILE_LONG_GREEN, trace=trace)
             else:
                 #command error: long red
-                self.play_leds_profile(self.LEDS_PROFILE_LONG_RED)
+                self.__play_leds_profile(self.LEDS_PROFILE_LONG_RED, trace=trace)
             
 
@@ -0,0 +1,9 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+
+__all__ = ['monotonic']
+
+#time.monotonic is not available on python2, fallback to wall clock
+monotonic = getattr(time, u'monotonic', time.time)
@@ -0,0 +1,224 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Streaming voice activity detection (VAD)
+
+Blocks are split in short frames and three features are computed on all
+frames of a block at once (zero crossing rate and flatness only when a frame
+is loud enough to be speech, so silence costs almost nothing):
+    - energy (dB relative to full scale), compared to an adaptive noise floor
+    - zero crossing rate, high for noise and hiss
+    - spectral flatness in speech band, close to 0 for voiced sounds and
+      around 0.5 for white noise
+
+A frame is a speech candidate if all features agree. Speech starts after a
+few consecutive candidate frames (onset) and ends after a longer run of non
+candidate frames (hangover), so short pauses between words don't end speech.
+"""
+
+import math
+try:
+    import numpy
+except ImportError: # pragma: no cover
+    numpy = None
+from .audioprocessor import AudioProcessor
+from .audioanalysis import to_samples
+
+__all__ = ['VoiceActivityDetector', 'VadMonitor']
+
+class VoiceActivityDetector(object):
+    """
+    Detect speech in stereo blocks
+    """
+
+    #analysis frame duration in seconds
+    FRAME_DURATION = 0.016
+    #noise floor adaptation rate ratio on speech-like frames
+    SPEECH_NOISE_RATIO = 0.02
+
+    def __init__(self, rate, block_frames, threshold_db=10.0, min_db=-55.0, max_zcr=0.35, max_flatness=0.4, band=(100.0, 4000.0), onset=0.05, hangover=0.3, noise_rate=0.05):
+        """
+        Constructor
+
+        Args:
+            rate (int): sample rate in Hz
+            block_frames (int): number of frames per block
+            threshold_db (float): min energy over noise floor of speech frames in dB
+            min_db (float): min energy of speech frames in dB relative to full scale
+            max_zcr (float): max zero crossing rate of speech frames [0..1]
+            max_flatness (float): max spectral flatness of speech frames [0..1]
+            band (tuple): (low, high) frequencies used for spectral flatness in Hz
+            onset (float): speech starts after this duration of speech frames in seconds
+            hangover (float): speech ends after this duration without speech frames in seconds
+            noise_rate (float): noise floor adaptation rate per non speech frame [0..1]
+        """
+        if numpy is None:
+            raise RuntimeError(u'NumPy is required for voice activity detection')
+
+        self.threshold_db = threshold_db
+        self.min_db = min_db
+        self.max_zcr = max_zcr
+        self.max_flatness = max_flatness
+        self.noise_rate = noise_rate
+        self.frames = max(1, int(round(block_frames / (rate * self.FRAME_DURATION))))
+        self.frame_size = block_frames // self.frames
+        frame_duration = float(self.frame_size) / rate
+        self.onset_frames = max(1, int(math.ceil(onset / frame_duration)))
+        self.hangover_frames = max(1, int(math.ceil(hangover / frame_duration)))
+        self.window = numpy.hanning(self.frame_size).astype(numpy.float32)
+        freqs = numpy.fft.rfftfreq(self.frame_size, 1.0 / rate)
+        self.bins = numpy.nonzero((freqs>=band[0]) & (freqs<=band[1]))[0]
+        self.__energy_scale = 1.0 / (self.frame_size * 32768.0 * 32768.0)
+
+        #state
+        self.speech = False
+        self.noise_db = None
+        self.energy_db = min_db
+        #features of last analyzed loud frame
+        self.zcr = 0.0
+        self.flatness = 1.0
+        self.__run = 0
+
+    def get_frames(self, samples):
+        """
+        Split block in analysis frames
+
+        Args:
+            samples (numpy.ndarray): (frames, channels) int16 samples
+
+        Returns:
+            numpy.ndarray: (frames, frame size) float32 samples of first channel
+        """
+        #first channel is enough: both microphones hear the same speech
+        return samples[:self.frames * self.frame_size, 0].astype(numpy.float32).reshape(self.frames, self.frame_size)
+
+    def get_energies(self, frames):
+        """
+        Compute frames energy
+
+        Args:
+            frames (numpy.ndarray): analysis frames
+
+        Returns:
+            numpy.ndarray: energy of each frame in dB relative to full scale
+        """
+        return 10.0 * numpy.log10(numpy.einsum('ij,ij->i', frames, frames) * self.__energy_scale + 1e-10)
+
+    def get_spectral_features(self, frames):
+        """
+        Compute frames zero crossing rate and spectral flatness
+
+        Args:
+            frames (numpy.ndarray): analysis frames
+
+        Returns:
+            tuple: zero crossing rates and spectral flatnesses (numpy.ndarray per frame)
+        """
+        zcrs = numpy.count_nonzero((frames[:, 1:] * frames[:, :-1])<0.0, axis=1) / float(self.frame_size - 1)
+        spectrums = numpy.fft.rfft(frames * self.window, axis=1)[:, self.bins]
+        powers = spectrums.real * spectrums.real + spectrums.imag * spectrums.imag + 1e-12
+        flatnesses = numpy.exp(numpy.log(powers).mean(axis=1)) / powers.mean(axis=1)
+
+        return zcrs, flatnesses
+
+    def process(self, samples):
+        """
+        Update speech state with block
+
+        Args:
+            samples (numpy.ndarray): (frames, channels) int16 samples
+
+        Returns:
+            bool: True if speech is detected
+        """
+        frames = self.get_frames(samples)
+        energies = self.get_energies(frames)
+        if self.noise_db is None:
+            self.noise_db = float(energies[0])
+
+        #spectral features are only computed if a frame is loud enough to be speech (rarely in silence)
+        loud = energies>=max(self.noise_db + self.threshold_db, self.min_db)
+        if loud.any():
+            zcrs, flatnesses = self.get_spectral_features(frames)
+            voiced = (zcrs<=self.max_zcr) & (flatnesses<=self.max_flatness)
+            self.zcr = float(zcrs[-1])
+            self.flatness = float(flatnesses[-1])
+        else:
+            voiced = loud
+
+        for energy_db, frame_voiced in zip(energies.tolist(), voiced.tolist()):
+            candidate = frame_voiced and energy_db>=max(self.noise_db + self.threshold_db, self.min_db)
+            if energy_db<self.noise_db:
+                #noise floor follows quiet frames immediately
+                self.noise_db = energy_db
+            else:
+                #slowly on speech-like frames, so steady tonal noise doesn't stay detected as speech
+                rate = self.noise_rate * self.SPEECH_NOISE_RATIO if frame_voiced else self.noise_rate
+                self.noise_db += rate * (energy_db - self.noise_db)
+
+            if candidate==self.speech:
+                self.__run = 0
+            else:
+                self.__run += 1
+                if self.__run>=(self.hangover_frames if self.speech else self.onset_frames):
+                    self.speech = not self.speech
+                    self.__run = 0
+
+        self.energy_db = float(energies[-1])
+
+        return self.speech
+
+class VadMonitor(AudioProcessor):
+    """
+    Detect speech in audio source and report speech start and end
+    """
+
+    def __init__(self, source, speech_callback, **kwargs):
+        """
+        Constructor
+
+        Args:
+            source (AudioSource): audio source
+            speech_callback (function): function called with True when speech starts
+                and False when it ends
+            kwargs (dict): VoiceActivityDetector parameters
+        """
+        AudioProcessor.__init__(self, source)
+
+        #members
+        self.detector = VoiceActivityDetector(source.rate, source.block_frames, **kwargs)
+        self.speech_callback = speech_callback
+
+    def is_speech(self):
+        """
+        Return True if speech is being detected
+
+        Returns:
+            bool: speech state
+        """
+        return self.detector.speech
+
+    def get_cpu_usage(self):
+        """
+        Return processing time per audio time
+
+        Returns:
+            float: cpu usage in percent
+        """
+        if self.process_times.count==0:
+            return 0.0
+
+        block_ms = 1000.0 * self.source.block_frames / self.source.rate
+        return 100.0 * self.process_times.total / (self.process_times.count * block_ms)
+
+    def process(self, block):
+        """
+        Update speech state with block and report its changes
+
+        Args:
+            block (bytes): block of interleaved samples
+        """
+        speech = self.detector.speech
+        if self.detector.process(to_samples(block, self.source.channels))!=speech:
+            self.speech_callback(not speech)
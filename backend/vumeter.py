@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import math
+from threading import Thread, Event
+from .audioprocessor import AudioProcessor
+from .audioanalysis import to_samples, levels, SpectrumAnalyzer
+from .timing import monotonic
+
+__all__ = ['VuMeter']
+
+class VuMeter(AudioProcessor):
+    """
+    Audio-reactive leds: audio blocks are read from source and analyzed in
+    frequency bands, each led shows the level of one band (green to red)
+    like a VU meter. Frames of latest levels are shown by a timer thread at
+    a steady frame rate, whatever the block size.
+    """
+
+    #levels under this value (dB relative to full scale) turn led off
+    FLOOR_DB = -60.0
+    #level decay per second after a peak (dB)
+    RELEASE_DB = 30.0
+
+    def __init__(self, source, leds_driver, show_frame_callback, fps=25, max_brightness=60):
+        """
+        Constructor
+
+        Args:
+            source (AudioSource): audio source
+            leds_driver (APA102): leds driver used to encode frames
+            show_frame_callback (function): function called to show LED frames (bytes)
+            fps (int): frames per second
+            max_brightness (int): brightness of leds at full level [0..100]
+        """
+        AudioProcessor.__init__(self, source)
+
+        #members
+        self.leds_driver = leds_driver
+        self.show_frame_callback = show_frame_callback
+        self.interval = 1.0 / fps
+        self.max_brightness = max_brightness
+        self.analyzer = SpectrumAnalyzer(source.rate, source.block_frames, SpectrumAnalyzer.BANDS[:leds_driver.num_led])
+        self.rms = 0.0
+        self.peak = 0.0
+        self.bands_db = [self.FLOOR_DB] * len(self.analyzer.bands)
+        self.frames = 0
+        self.__stopped = Event()
+
+    def stop(self):
+        """
+        Stop processor and frames timer
+        """
+        AudioProcessor.stop(self)
+        self.__stopped.set()
+
+    def run(self):
+        """
+        Run processor and frames timer until source ends or processor is stopped
+        """
+        timer = Thread(target=self.__show_frames)
+        timer.daemon = True
+        timer.start()
+        try:
+            AudioProcessor.run(self)
+        finally:
+            self.__stopped.set()
+            timer.join()
+
+    def __show_frames(self):
+        """
+        Show frame of latest levels at each frame deadline
+        """
+        next_frame = monotonic() + self.interval
+        while not self.__stopped.wait(max(next_frame - monotonic(), 0.0)):
+            try:
+                self.show_frame_callback(self.get_frame())
+            except Exception:
+                self.logger.exception(u'Error showing vu meter frame:')
+            self.frames += 1
+            next_frame += self.interval
+            now = monotonic()
+            if next_frame<now:
+                #too late, restart frame rate from now
+                next_frame = now + self.interval
+
+    def process(self, block):
+        """
+        Analyze audio block and update levels shown by next frame
+
+        Args:
+            block (bytes): block of interleaved samples
+        """
+        samples = to_samples(block, self.source.channels)
+        self.rms, self.peak = levels(samples)
+        release = self.RELEASE_DB * float(self.source.block_frames) / self.source.rate
+        bands_db = []
+        for level, band_db in zip(self.analyzer.analyze(samples), self.bands_db):
+            level_db = 20.0 * math.log10(level) if level>0.0 else self.FLOOR_DB
+            #fast attack, slow release
+            bands_db.append(max(level_db, band_db - release, self.FLOOR_DB))
+        #single assignment so frames timer always reads consistent levels
+        self.bands_db = bands_db
+
+    def get_frame(self):
+        """
+        Return LED frames of current levels
+
+        Returns:
+            bytes: LED frames
+        """
+        values = bytearray()
+        for level_db in self.bands_db:
+            level = (level_db - self.FLOOR_DB) / -self.FLOOR_DB
+            #green -> yellow -> red
+            red = int(255 * min(1.0, 2.0 * level))
+            green = int(255 * min(1.0, 2.0 * (1.0 - level)))
+            brightness = int(round(self.max_brightness * level))
+            values.extend([red, green, 0, brightness])
+        values.extend(bytearray(4 * (self.leds_driver.num_led - len(self.bands_db))))
+
+        return self.leds_driver.encode_pixels(values, channels=4)
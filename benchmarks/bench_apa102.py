@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+APA102 driver benchmark
+
+Measures APA102 driver hot paths (set_pixel, set_pixel_rgb, set_pixels,
+rotate, show and clear_strip) for different strip lengths. For each
+operation it reports:
+    - ns/op: time of one call
+    - alloc B: memory allocated while processing a full frame (peak, needs
+      python 3.9 tracemalloc, otherwise not reported)
+    - frame B: bytes sent to the transport per frame
+    - fps: frames per second show() can send
+
+By default frames are sent to the null transport so only driver overhead is
+measured, use spidev transport on device to measure the bus.
+
+Results can be saved to a baseline file, and compared to it later so that
+driver regressions show up as numeric diffs.
+
+Usage:
+    python -m benchmarks.bench_apa102 [--leds 3 144 1024 4096] [--transport null]
+                                      [--save FILE] [--baseline FILE]
+"""
+
+import os
+import json
+import timeit
+import argparse
+try:
+    import tracemalloc
+except ImportError: # pragma: no cover
+    tracemalloc = None
+
+from backend.apa102 import APA102
+from backend.apa102transport import get_transport
+
+DEFAULT_LEDS = [3, 144, 1024, 4096]
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), u'baseline_apa102.json')
+
+def get_operations(leds):
+    """
+    Return benchmarked operations
+
+    Args:
+        leds (APA102): driver instance
+
+    Returns:
+        list: list of (name, function called once per op, number of ops per frame)
+    """
+    num_led = leds.num_led
+    pixels = bytearray([(index * 7) & 0xFF for index in range(3 * num_led)])
+    state = {u'led': 0, u'color': 0}
+
+    def set_pixel():
+        led = state[u'led']
+        leds.set_pixel(led, 255, led & 0xFF, 64, 50)
+        state[u'led'] = led + 1 if led + 1 < num_led else 0
+
+    def set_pixel_rgb():
+        led = state[u'led']
+        leds.set_pixel_rgb(led, 0x00FF80, 50)
+        state[u'led'] = led + 1 if led + 1 < num_led else 0
+
+    def set_pixels():
+        leds.set_pixels(pixels)
+
+    def rotate():
+        leds.rotate(1)
+
+    def show():
+        leds.set_pixel(0, state[u'color'], 0, 0)
+        state[u'color'] = (state[u'color'] + 1) & 0xFF
+        leds.show()
+
+    def clear_strip():
+        leds.set_pixel(0, 255, 255, 255)
+        leds.clear_strip()
+
+    return [
+        (u'set_pixel', set_pixel, num_led),
+        (u'set_pixel_rgb', set_pixel_rgb, num_led),
+        (u'set_pixels', set_pixels, 1),
+        (u'rotate', rotate, 1),
+        (u'show', show, 1),
+        (u'clear_strip', clear_strip, 1),
+    ]
+
+def measure_time(func, min_duration, repeat=5):
+    """
+    Return best time of one call in nanoseconds
+
+    Args:
+        func (function): function to measure
+        min_duration (float): minimum duration of one measure in seconds
+        repeat (int): number of measures
+    """
+    timer = timeit.Timer(func)
+    number = 1
+    while timer.timeit(number) < min_duration:
+        number *= 10
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e9
+
+def measure_alloc(func, count):
+    """
+    Return peak memory allocated while calling function for a full frame
+
+    Args:
+        func (function): function to measure
+        count (int): number of calls per frame
+
+    Returns:
+        int: allocated bytes or None if not available
+    """
+    if tracemalloc is None or not hasattr(tracemalloc, u'reset_peak'):
+        return None
+
+    func()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    current = tracemalloc.get_traced_memory()[0]
+    for _ in range(count):
+        func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak - current
+
+def run(leds_list, transport, min_duration):
+    """
+    Run benchmarks
+
+    Returns:
+        dict: results by "operation:leds"
+    """
+    results = {}
+    for num_led in leds_list:
+        leds = APA102(num_led=num_led, transport=get_transport(transport))
+        for name, func, count in get_operations(leds):
+            ns_per_op = measure_time(func, min_duration)
+            results[u'%s:%d' % (name, num_led)] = {
+                u'ns_per_op': round(ns_per_op, 1),
+                u'alloc_bytes': measure_alloc(func, count),
+                u'frame_bytes': len(leds.frame) if name in (u'show', u'clear_strip') else 0,
+            }
+        leds.cleanup()
+    return results
+
+def print_results(results, leds_list, baseline=None):
+    """
+    Print results table, with diff to baseline if specified
+    """
+    print(u'%-14s %6s %12s %10s %10s %12s %10s' % (u'operation', u'leds', u'ns/op', u'alloc B', u'frame B', u'fps', u'baseline'))
+    for num_led in leds_list:
+        for name in (u'set_pixel', u'set_pixel_rgb', u'set_pixels', u'rotate', u'show', u'clear_strip'):
+            key = u'%s:%d' % (name, num_led)
+            result = results[key]
+            fps = u'%.1f' % (1e9 / result[u'ns_per_op']) if name==u'show' else u'-'
+            alloc = u'-' if result[u'alloc_bytes'] is None else u'%d' % result[u'alloc_bytes']
+            diff = u'-'
+            if baseline and key in baseline:
+                diff = u'%+.1f%%' % ((result[u'ns_per_op'] / baseline[key][u'ns_per_op'] - 1.0) * 100.0)
+            print(u'%-14s %6d %12.1f %10s %10d %12s %10s' % (name, num_led, result[u'ns_per_op'], alloc, result[u'frame_bytes'], fps, diff))
+
+def main():
+    parser = argparse.ArgumentParser(description=u'APA102 driver benchmark')
+    parser.add_argument(u'--leds', type=int, nargs=u'+', default=DEFAULT_LEDS, help=u'strip lengths')
+    parser.add_argument(u'--transport', default=u'null', help=u'frames transport (null, spidev)')
+    parser.add_argument(u'--min-duration', type=float, default=0.05, help=u'minimum duration of one measure in seconds')
+    parser.add_argument(u'--save', nargs=u'?', const=DEFAULT_BASELINE, help=u'save results to baseline file')
+    parser.add_argument(u'--baseline', nargs=u'?', const=DEFAULT_BASELINE, help=u'compare results to baseline file')
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as fd:
+            baseline = json.load(fd)
+
+    results = run(args.leds, args.transport, args.min_duration)
+    print_results(results, args.leds, baseline)
+
+    if args.save:
+        with open(args.save, u'w') as fd:
+            json.dump(results, fd, indent=4, sort_keys=True)
+        print(u'Results saved to %s' % args.save)
+
+if __name__ == u'__main__':
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Audio processing benchmark
+
+Runs audio processing stages on every block of a WAV file (a generated noisy
+tone if no file is specified) as fast as possible and reports for each stage:
+    - us/block: processing time of one block
+    - cpu %: processing time per second of audio
+
+Usage:
+    python -m benchmarks.bench_audio [--wav FILE] [--block 512] [--duration 10]
+"""
+
+import os
+import time
+import wave
+import shutil
+import argparse
+import tempfile
+import numpy
+
+from backend.audiosource import WavSource
+from backend.apa102 import APA102
+from backend.apa102transport import NullTransport
+from backend.vumeter import VuMeter
+from backend.audioanalysis import to_samples
+from backend.doa import DoaEstimator
+from backend.vad import VoiceActivityDetector
+
+def write_test_wav(path, duration, rate=16000):
+    """
+    Write stereo WAV file: noisy tone with a delay between channels
+
+    Args:
+        path (string): WAV file path
+        duration (float): duration in seconds
+        rate (int): sample rate
+    """
+    rand = numpy.random.RandomState(0)
+    count = int(duration * rate)
+    signal = 0.3 * numpy.sin(2.0 * numpy.pi * 440.0 * numpy.arange(count + 2) / rate) + 0.2 * rand.randn(count + 2)
+    stereo = numpy.stack([signal[2:], signal[:-2]], axis=1)
+    wav = wave.open(path, u'wb')
+    wav.setnchannels(2)
+    wav.setsampwidth(2)
+    wav.setframerate(rate)
+    wav.writeframes((numpy.clip(stereo, -1.0, 1.0) * 32767).astype(u'<i2').tobytes())
+    wav.close()
+
+def get_stages(source):
+    """
+    Return benchmarked stages
+
+    Args:
+        source (AudioSource): audio source
+
+    Returns:
+        list: list of (name, function processing one block)
+    """
+    vu_meter = VuMeter(source, APA102(num_led=3, transport=NullTransport()), lambda pixels: None)
+
+    def vu_meter_stage(block):
+        vu_meter.process(block)
+        vu_meter.get_frame()
+
+    estimator = DoaEstimator(source.rate, source.block_frames)
+
+    def doa_stage(block):
+        estimator.process(to_samples(block, source.channels))
+
+    detector = VoiceActivityDetector(source.rate, source.block_frames)
+
+    def vad_stage(block):
+        detector.process(to_samples(block, source.channels))
+
+    return [
+        (u'vu meter', vu_meter_stage),
+        (u'doa', doa_stage),
+        (u'vad', vad_stage),
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description=u'Audio processing benchmark')
+    parser.add_argument(u'--wav', help=u'16 bits WAV file (generated if not specified)')
+    parser.add_argument(u'--block', type=int, default=512, help=u'frames per block')
+    parser.add_argument(u'--duration', type=float, default=10.0, help=u'generated WAV duration in seconds')
+    args = parser.parse_args()
+
+    path = args.wav
+    tmp_dir = None
+    if path is None:
+        tmp_dir = tempfile.mkdtemp()
+        path = os.path.join(tmp_dir, u'test.wav')
+        write_test_wav(path, args.duration)
+
+    try:
+        source = WavSource(path, block_frames=args.block)
+        blocks = []
+        block = source.read()
+        while block is not None:
+            blocks.append(block)
+            block = source.read()
+        source.close()
+        audio_duration = len(blocks) * float(args.block) / source.rate
+
+        print(u'%d blocks of %d frames, %d channels at %d Hz (%.1f s)' % (len(blocks), args.block, source.channels, source.rate, audio_duration))
+        print(u'%-12s %12s %8s' % (u'stage', u'us/block', u'cpu %'))
+        for name, stage in get_stages(source):
+            start = time.time()
+            for block in blocks:
+                stage(block)
+            duration = time.time() - start
+            print(u'%-12s %12.1f %8.2f' % (name, duration / len(blocks) * 1000000.0, duration / audio_duration * 100.0))
+    finally:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Color helpers benchmark
+
+Compares the scalar color helpers (called once per pixel) with the
+precomputed wheel table and the NumPy batch converters, for a full strip
+frame. NumPy must be installed.
+
+Usage:
+    python -m benchmarks.bench_colors [--leds 3 144 1024] [--repeat 20]
+"""
+
+import timeit
+import argparse
+import colorsys
+
+import numpy
+from backend import colors
+from backend.apa102 import APA102
+
+DEFAULT_LEDS = [3, 144, 1024]
+
+def bench(func, repeat):
+    """
+    Return best time of specified function in seconds
+    """
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+def bench_wheel(num_led, repeat):
+    """
+    Rainbow frame: one wheel color per led
+
+    Returns:
+        tuple: (scalar time, table time, batch time)
+    """
+    positions = [(led * 256 // num_led) & 255 for led in range(num_led)]
+    positions_array = numpy.array(positions)
+
+    def scalar():
+        return [colors.compute_wheel(pos) for pos in positions]
+    def table():
+        return [colors.wheel(pos) for pos in positions]
+    def batch():
+        return colors.wheel_colors(positions_array)
+
+    return bench(scalar, repeat), bench(table, repeat), bench(batch, repeat)
+
+def bench_hsv(num_led, repeat):
+    """
+    Hue sweep frame: one HSV color per led
+
+    Returns:
+        tuple: (scalar time, batch time)
+    """
+    hues = [led / float(num_led) for led in range(num_led)]
+    hues_array = numpy.array(hues)
+
+    def scalar():
+        out = []
+        for hue in hues:
+            red, green, blue = colorsys.hsv_to_rgb(hue, 1.0, 0.5)
+            out.append(APA102.combine_color(int(round(red * 255)), int(round(green * 255)), int(round(blue * 255))))
+        return out
+    def batch():
+        return colors.hsv_to_rgb(hues_array, 1.0, 0.5)
+
+    return bench(scalar, repeat), bench(batch, repeat)
+
+def main():
+    parser = argparse.ArgumentParser(description=u'Color helpers benchmark')
+    parser.add_argument(u'--leds', type=int, nargs=u'+', default=DEFAULT_LEDS, help=u'strip lengths')
+    parser.add_argument(u'--repeat', type=int, default=20, help=u'number of measures (best is kept)')
+    args = parser.parse_args()
+
+    print(u'%6s %6s %12s %12s %12s %10s' % (u'leds', u'helper', u'scalar us', u'table us', u'batch us', u'speedup'))
+    for num_led in args.leds:
+        scalar, table, batch = bench_wheel(num_led, args.repeat)
+        print(u'%6d %6s %12.1f %12.1f %12.1f %9.1fx' % (num_led, u'wheel', scalar * 1e6, table * 1e6, batch * 1e6, scalar / min(table, batch)))
+        scalar, batch = bench_hsv(num_led, args.repeat)
+        print(u'%6d %6s %12.1f %12s %12.1f %9.1fx' % (num_led, u'hsv', scalar * 1e6, u'-', batch * 1e6, scalar / batch))
+
+if __name__ == u'__main__':
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Render latency harness
+
+Fires synthetic render events at a configurable rate through the same leds
+pipeline as Respeaker2mic._render (profile lookup in profiles store, timeline
+compilation cache, handoff to leds engine, flusher and driver) and reports
+latency percentiles from render entry to each stage:
+    - lookup: profile and timeline looked up
+    - handoff: profile handed off to leds engine
+    - frame: first profile frame shown by engine
+    - wire: first frame sent to the transport
+
+Usage:
+    python -m benchmarks.bench_render [--rate 20] [--duration 5] [--engine thread]
+                                      [--max-fps 50] [--transport null]
+"""
+
+import time
+import argparse
+
+from backend.apa102 import APA102
+from backend.apa102transport import get_transport
+from backend.ledsflusher import LedsFlusher
+from backend.ledsprofile import LedsProfileStore, LedsProfileCompiler
+from backend.ledsengine import LedsEngine
+from backend.ledsstats import LedsRenderTracer
+from backend.timing import monotonic
+
+PALETTE = {
+    u'black': [0, 0, 0],
+    u'red': [255, 0, 0],
+    u'green': [0, 255, 0],
+    u'blue': [0, 0, 255],
+    u'yellow': [255, 255, 0],
+}
+
+PROFILES = [
+    {
+        u'uuid': u'1',
+        u'name': u'breathe',
+        u'repeat': 99,
+        u'actions': [
+            {u'action': 6, u'color': u'blue', u'pause': 900, u'brightness': 10, u'to_brightness': 100, u'easing': u'ease-in-out'},
+            {u'action': 6, u'color': u'blue', u'pause': 900, u'brightness': 100, u'to_brightness': 10, u'easing': u'ease-in-out'},
+        ]
+    }, {
+        u'uuid': u'2',
+        u'name': u'slide',
+        u'repeat': 99,
+        u'actions': [
+            {u'action': 1, u'color': u'yellow', u'pause': 0, u'brightness': 60},
+            {u'action': 5, u'color': None, u'pause': 100, u'brightness': 0},
+            {u'action': 1, u'color': u'black', u'pause': 0, u'brightness': 60},
+            {u'action': 2, u'color': u'yellow', u'pause': 0, u'brightness': 60},
+            {u'action': 5, u'color': None, u'pause': 100, u'brightness': 0},
+            {u'action': 2, u'color': u'black', u'pause': 0, u'brightness': 60},
+        ]
+    }, {
+        u'uuid': u'3',
+        u'name': u'long',
+        u'repeat': 4,
+        u'actions': [
+            {u'action': 4, u'color': u'green', u'pause': 0, u'brightness': 60},
+            {u'action': 5, u'color': None, u'pause': 500, u'brightness': 0},
+        ]
+    },
+]
+
+def get_engine(name, show_frame_callback, turn_off_callback, off_pixels):
+    """
+    Return leds engine
+
+    Args:
+        name (string): engine name (thread or asyncio)
+        show_frame_callback (function): show frame function
+        turn_off_callback (function): turn off leds function
+        off_pixels (bytes): LED frames of turned off leds
+
+    Returns:
+        LedsEngine or AsyncLedsEngine instance
+    """
+    if name==u'asyncio':
+        from backend.ledsasyncengine import AsyncLedsEngine
+        return AsyncLedsEngine(show_frame_callback, turn_off_callback, off_pixels)
+
+    return LedsEngine(show_frame_callback, turn_off_callback, off_pixels)
+
+def run(rate, duration, engine_name, max_fps, transport):
+    """
+    Fire render events and return latency summary
+
+    Args:
+        rate (float): render events per second
+        duration (float): harness duration in seconds
+        engine_name (string): leds engine (thread or asyncio)
+        max_fps (int): flusher max frame rate (0 to show frames from engine)
+        transport (string): frames transport
+
+    Returns:
+        dict: latency summary (see LedsRenderTracer.get_summary)
+    """
+    tracer = LedsRenderTracer()
+    leds = APA102(num_led=3, gamma=2.2, transport=get_transport(transport))
+    store = LedsProfileStore(lambda: PROFILES)
+    compiler = LedsProfileCompiler(leds, PALETTE)
+    flusher = LedsFlusher(leds, max_fps, tracer.flushed) if max_fps else None
+
+    def show_frame(pixels):
+        leds.load_pixels(pixels)
+        tracer.frame_loaded()
+        if flusher:
+            flusher.flush()
+        else:
+            start = monotonic()
+            tracer.flushed(leds.show(), start)
+
+    def turn_off():
+        show_frame(compiler.get_off_pixels())
+
+    engine = get_engine(engine_name, show_frame, turn_off, compiler.get_off_pixels())
+    engine.start()
+    if flusher:
+        flusher.start()
+
+    #same steps as Respeaker2mic._render
+    interval = 1.0 / rate
+    events = int(duration * rate)
+    start = time.time()
+    for event in range(events):
+        trace = tracer.begin()
+        profile = store.get(PROFILES[event % len(PROFILES)][u'uuid'])
+        timeline = compiler.get_timeline(profile)
+        trace.mark_lookup()
+        engine.play(profile, timeline, None, 10, trace=trace)
+        delay = start + (event + 1) * interval - time.time()
+        if delay>0:
+            time.sleep(delay)
+
+    engine.stop()
+    engine.join(1.0)
+    if flusher:
+        flusher.stop()
+        flusher.join(1.0)
+
+    return tracer.get_summary()
+
+def main():
+    parser = argparse.ArgumentParser(description=u'Render latency harness')
+    parser.add_argument(u'--rate', type=float, default=20.0, help=u'render events per second')
+    parser.add_argument(u'--duration', type=float, default=5.0, help=u'harness duration in seconds')
+    parser.add_argument(u'--engine', default=u'thread', choices=[u'thread', u'asyncio'], help=u'leds engine')
+    parser.add_argument(u'--max-fps', type=int, default=50, help=u'flusher max frame rate (0 disables flusher)')
+    parser.add_argument(u'--transport', default=u'null', help=u'frames transport (null, spidev)')
+    args = parser.parse_args()
+
+    summary = run(args.rate, args.duration, args.engine, args.max_fps, args.transport)
+
+    print(u'%-10s %8s %10s %10s %10s %10s' % (u'stage', u'events', u'p50 ms', u'p95 ms', u'p99 ms', u'max ms'))
+    for stage in LedsRenderTracer.STAGES:
+        latency = summary[stage]
+        if not latency[u'count']:
+            print(u'%-10s %8d' % (stage, 0))
+            continue
+        print(u'%-10s %8d %10.3f %10.3f %10.3f %10.3f' % (
+            stage, latency[u'count'], latency[u'p50'], latency[u'p95'], latency[u'p99'], latency[u'max']
+        ))
+
+if __name__ == '__main__':
+    main()
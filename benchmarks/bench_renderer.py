@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Offline renderer benchmark
+
+Renders generated leds profiles on the virtual clock and reports how many
+profiles and frames are rendered per second, with and without writing dump
+files.
+
+Usage:
+    python -m benchmarks.bench_renderer [--profiles 500] [--max-duration 10]
+"""
+
+import os
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+from backend.ledsrenderer import LedsOfflineRenderer
+
+PALETTE = {
+    u'black': [0, 0, 0],
+    u'red': [255, 0, 0],
+    u'green': [0, 255, 0],
+    u'blue': [0, 0, 255],
+    u'yellow': [255, 255, 0],
+}
+
+def get_profiles(count, seed=0):
+    """
+    Generate random leds profiles
+
+    Args:
+        count (int): number of profiles
+        seed (int): random seed
+
+    Returns:
+        list: list of leds profiles
+    """
+    rand = random.Random(seed)
+    colors = sorted(PALETTE.keys())
+    profiles = []
+    for index in range(count):
+        actions = []
+        for _ in range(rand.randint(2, 12)):
+            if rand.random()<0.2:
+                actions.append({u'action': 6, u'color': rand.choice(colors), u'to_color': rand.choice(colors), u'pause': rand.randint(100, 1000), u'brightness': rand.randint(0, 100)})
+            else:
+                actions.append({u'action': rand.randint(1, 4), u'color': rand.choice(colors), u'pause': 0, u'brightness': rand.randint(0, 100)})
+            actions.append({u'action': 5, u'color': None, u'pause': rand.randint(50, 500), u'brightness': 0})
+        profiles.append({u'uuid': str(index), u'name': str(index), u'repeat': rand.choice([1, 2, 5, 99]), u'actions': actions})
+
+    return profiles
+
+def main():
+    parser = argparse.ArgumentParser(description=u'Offline renderer benchmark')
+    parser.add_argument(u'--profiles', type=int, default=500, help=u'number of profiles')
+    parser.add_argument(u'--max-duration', type=float, default=10.0, help=u'rendering duration limit of infinite profiles in seconds')
+    args = parser.parse_args()
+
+    profiles = get_profiles(args.profiles)
+    renderer = LedsOfflineRenderer(PALETTE, max_duration=args.max_duration)
+
+    start = time.time()
+    frames = sum([len(renderer.render(profile)) for profile in profiles])
+    render_duration = time.time() - start
+
+    path = tempfile.mkdtemp()
+    try:
+        start = time.time()
+        for profile in profiles:
+            renderer.render_dump(profile, os.path.join(path, u'%s.leds' % profile[u'uuid']))
+        dump_duration = time.time() - start
+    finally:
+        shutil.rmtree(path)
+
+    print(u'%d profiles, %d frames' % (len(profiles), frames))
+    print(u'render: %.1f ms (%.0f profiles/s, %.0f frames/s)' % (render_duration * 1000.0, len(profiles) / render_duration, frames / render_duration))
+    print(u'render + dump: %.1f ms (%.0f profiles/s)' % (dump_duration * 1000.0, len(profiles) / dump_duration))
+
+if __name__ == '__main__':
+    main()
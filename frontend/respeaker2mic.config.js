@@ -22,7 +22,20 @@ var respeaker2micConfigDirective = function($rootScope, toast, respeaker2micServ
             {label:'Set LED2', value:2},
             {label:'Set LED3', value:3},
             {label:'Set all LEDs', value:4},
-            {label:'Pause', value:5}
+            {label:'Pause', value:5},
+            {label:'Fade', value:6}
+        ];
+        self.fadeLeds = [
+            {label:'All LEDs', value:0},
+            {label:'LED1', value:1},
+            {label:'LED2', value:2},
+            {label:'LED3', value:3}
+        ];
+        self.easings = [
+            {label:'Linear', value:'linear'},
+            {label:'Ease in', value:'ease-in'},
+            {label:'Ease out', value:'ease-out'},
+            {label:'Ease in out', value:'ease-in-out'}
         ];
         self.colors = [
             {label:'White', value:'white'},
@@ -63,6 +76,10 @@ var respeaker2micConfigDirective = function($rootScope, toast, respeaker2micServ
         self.newLedsProfileBrightness = 50;
         self.newLedsProfilePause = 250;
         self.newLedsProfileRepeat = 0;
+        self.newLedsProfileFadeLed = 0;
+        self.newLedsProfileToColor = 'white';
+        self.newLedsProfileToBrightness = 0;
+        self.newLedsProfileEasing = 'linear';
 
         /**
          * Install driver
@@ -99,12 +116,21 @@ var respeaker2micConfigDirective = function($rootScope, toast, respeaker2micServ
         self.addLedsProfileAction = function()
         {
             //append new action
-            self.selectedLedsProfile.actions.push({
+            var action = {
                 action: self.newLedsProfileAction,
                 color: self.newLedsProfileColor,
                 brightness: self.newLedsProfileBrightness,
                 pause: self.newLedsProfilePause
-            });
+            };
+            if( self.newLedsProfileAction===6 )
+            {
+                //fade from color/brightness to target values during pause duration
+                action.led = self.newLedsProfileFadeLed;
+                action.to_color = self.newLedsProfileToColor;
+                action.to_brightness = self.newLedsProfileToBrightness;
+                action.easing = self.newLedsProfileEasing;
+            }
+            self.selectedLedsProfile.actions.push(action);
         };
 
         /**
@@ -0,0 +1,243 @@
+import unittest
+import math
+import logging
+import sys
+sys.path.append('../')
+from backend.apa102 import APA102
+from backend import apa102transport
+from backend.apa102transport import RecordingTransport, NullTransport, SpidevTransport, get_transport
+
+class TestApa102(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = RecordingTransport()
+        self.leds = APA102(num_led=3, transport=self.transport)
+
+    def tearDown(self):
+        self.leds.cleanup()
+
+    def get_sent_pixels(self):
+        frame = bytearray(self.transport.get_frames()[-1][1])
+        return list(frame[4:16])
+
+    def test_frame_size(self):
+        self.assertEqual(len(self.leds.frame), 4 + 3*4 + 4)
+        leds = APA102(num_led=1024, transport=NullTransport())
+        self.assertEqual(len(leds.frame), 4 + 1024*4 + 64)
+
+    def test_show(self):
+        self.leds.set_pixel(1, 255, 128, 0, 100)
+        self.assertTrue(self.leds.show())
+
+        frame = bytearray(self.transport.get_frames()[-1][1])
+        self.assertEqual(list(frame[:4]), [0, 0, 0, 0])
+        self.assertEqual(list(frame[8:12]), [0xFF, 0, 128, 255])
+        self.assertEqual(list(frame[-4:]), [0xFF, 0xFF, 0xFF, 0xFF])
+
+    def test_show_skip_unchanged_frame(self):
+        self.leds.set_pixel(0, 255, 0, 0)
+        self.assertTrue(self.leds.show())
+        self.assertFalse(self.leds.show())
+        self.leds.set_pixel(0, 255, 0, 0)
+        self.assertFalse(self.leds.show())
+        self.assertTrue(self.leds.show(force=True))
+        stats = self.leds.get_frame_stats()
+        self.assertEqual((stats[u'sent'], stats[u'skipped']), (2, 2))
+        self.assertEqual(stats[u'transfer_ms'][u'count'], 2)
+        self.assertEqual(len(self.transport.get_frames()), 2)
+
+        self.leds.reset_frame_stats()
+        stats = self.leds.get_frame_stats()
+        self.assertEqual((stats[u'sent'], stats[u'skipped']), (0, 0))
+        self.assertEqual(stats[u'transfer_ms'][u'count'], 0)
+
+    def test_show_update_during_write(self):
+        #other thread updates pixel buffer while frame is being sent
+        write = self.transport.write
+        def write_and_update(frame):
+            write(frame)
+            self.leds.set_pixel(1, 255, 255, 255)
+        self.transport.write = write_and_update
+        self.leds.set_pixel(0, 255, 0, 0)
+        self.assertTrue(self.leds.show())
+        self.transport.write = write
+
+        #update is sent by next show
+        self.assertTrue(self.leds.show())
+        self.assertEqual(self.get_sent_pixels()[4:8], [0xFF, 255, 255, 255])
+        self.assertFalse(self.leds.show())
+
+    def test_set_pixel_brightness(self):
+        self.leds.set_pixel(0, 0, 0, 0, 0)
+        self.leds.set_pixel(1, 0, 0, 0, 50)
+        self.leds.set_pixel(2, 0, 0, 0, 10)
+        self.leds.show()
+
+        pixels = self.get_sent_pixels()
+        self.assertEqual(pixels[0], 0xE0)
+        self.assertEqual(pixels[4], 0xE0 | 16)
+        self.assertEqual(pixels[8], 0xE0 | 4)
+
+    def test_set_pixel_out_of_range_brightness(self):
+        self.leds.set_pixel(0, 0, 0, 0, -1)
+        self.leds.set_pixel(1, 0, 0, 0, 150)
+        self.leds.set_pixels(bytearray(3), brightness=-50)
+        self.leds.show()
+
+        pixels = self.get_sent_pixels()
+        self.assertEqual(pixels[0], 0xE0)
+        self.assertEqual(pixels[4], 0xE0 | 31)
+
+    def test_set_pixel_out_of_range_color(self):
+        self.leds.set_pixel(0, -1, 300, 0)
+        self.leds.show()
+
+        pixels = self.get_sent_pixels()
+        self.assertEqual(pixels[1:4], [0, 255, 0])
+
+    def test_brightness_without_gamma(self):
+        leds = APA102(num_led=3, global_brightness=25, transport=NullTransport())
+        for percent in range(101):
+            self.assertEqual(leds.brightness_table[percent], 0xE0 | int(math.ceil(percent * 25 / 100.0)))
+
+    def test_gamma(self):
+        leds = APA102(num_led=3, gamma=2.2, transport=NullTransport())
+        self.assertEqual(leds.gamma_table[0], 0)
+        self.assertEqual(leds.gamma_table[255], 255)
+        self.assertLess(leds.gamma_table[128], 128)
+        self.assertEqual(leds.brightness_table[100], 0xFF)
+
+    def test_set_pixels(self):
+        self.leds.set_pixels(bytearray([255, 0, 0, 0, 255, 0, 0, 0, 255]))
+        self.leds.show()
+        self.assertEqual(self.get_sent_pixels(), [0xFF, 0, 0, 255, 0xFF, 0, 255, 0, 0xFF, 255, 0, 0])
+
+        self.leds.set_pixels(bytearray([1, 2, 3, 0]), brightness=None)
+        self.leds.show()
+        self.assertEqual(self.get_sent_pixels()[:4], [0xE0, 3, 2, 1])
+
+    def test_set_pixels_same_as_set_pixel(self):
+        leds = APA102(num_led=3, order='grb', gamma=2.2, transport=RecordingTransport())
+        leds.set_pixel(0, 10, 20, 30, 40)
+        leds.set_pixel(1, 40, 50, 60, 70)
+        leds.set_pixel(2, 70, 80, 90, 100)
+        self.leds = APA102(num_led=3, order='grb', gamma=2.2, transport=self.transport)
+        self.leds.set_pixels(bytearray([10, 20, 30, 40, 40, 50, 60, 70, 70, 80, 90, 100]))
+        self.assertEqual(leds.frame, self.leds.frame)
+
+    def test_set_pixels_invalid(self):
+        with self.assertRaises(ValueError):
+            self.leds.set_pixels(bytearray(5))
+
+    def test_rotate(self):
+        self.leds.set_pixel(0, 1, 1, 1)
+        self.leds.set_pixel(1, 2, 2, 2)
+        self.leds.set_pixel(2, 3, 3, 3)
+        self.leds.rotate(1)
+        self.leds.show()
+        self.assertEqual(self.get_sent_pixels()[1::4], [2, 3, 1])
+
+        self.leds.set_pixel(0, 4, 4, 4)
+        self.leds.rotate(-2)
+        self.leds.show()
+        self.assertEqual(self.get_sent_pixels()[1::4], [3, 1, 4])
+
+    def test_get_transport(self):
+        self.assertTrue(isinstance(get_transport(u'null'), NullTransport))
+        with self.assertRaises(ValueError):
+            get_transport(u'dummy')
+
+    def test_recording_replay(self):
+        self.leds.set_pixel(0, 1, 2, 3)
+        self.leds.show()
+        self.leds.set_pixel(0, 3, 2, 1)
+        self.leds.show()
+
+        null = NullTransport()
+        self.transport.replay(null, speed=0)
+        self.assertEqual(null.frames, 2)
+        self.assertEqual(null.bytes, 2*len(self.leds.frame))
+
+    def test_recording_monotonic_timestamps(self):
+        #wall clock jump (eg. ntp sync) must not be recorded
+        time_ = apa102transport.time.time
+        apa102transport.time.time = lambda: time_() + 3600.0
+        try:
+            self.leds.set_pixel(0, 1, 2, 3)
+            self.leds.show()
+        finally:
+            apa102transport.time.time = time_
+        self.leds.set_pixel(0, 3, 2, 1)
+        self.leds.show()
+
+        frames = self.transport.get_frames()
+        self.assertLess(abs(frames[1][0] - frames[0][0]), 1.0)
+
+class FakeSpiDev(object):
+    """
+    Fake spidev.SpiDev recording transfers
+    """
+
+    def __init__(self):
+        self.transfers = []
+
+    def open(self, bus, device):
+        pass
+
+    def close(self):
+        pass
+
+    def xfer2(self, data):
+        self.transfers.append(list(data))
+
+class FakeSpiDevWritebytes2(FakeSpiDev):
+
+    def writebytes2(self, data):
+        self.transfers.append(bytearray(data))
+
+class FakeSpidevModule(object):
+
+    def __init__(self, spidev_class):
+        self.SpiDev = spidev_class
+
+class TestSpidevTransport(unittest.TestCase):
+
+    def setUp(self):
+        self.spidev = sys.modules.get('spidev')
+
+    def tearDown(self):
+        if self.spidev is None:
+            sys.modules.pop('spidev', None)
+        else:
+            sys.modules['spidev'] = self.spidev
+
+    def get_transport(self, spidev_class):
+        sys.modules['spidev'] = FakeSpidevModule(spidev_class)
+        transport = SpidevTransport()
+        transport.max_transfer = SpidevTransport.DEFAULT_BUFSIZ
+        transport.open()
+        return transport
+
+    def test_writebytes2(self):
+        transport = self.get_transport(FakeSpiDevWritebytes2)
+        leds = APA102(num_led=4096, transport=transport)
+        leds.set_pixel(0, 1, 2, 3)
+        leds.show()
+
+        #whole frame in a single write
+        self.assertEqual(len(transport.spi.transfers), 1)
+        self.assertEqual(transport.spi.transfers[0], leds.frame)
+
+    def test_xfer2_chunks(self):
+        transport = self.get_transport(FakeSpiDev)
+        leds = APA102(num_led=4096, transport=transport)
+        leds.set_pixel(0, 1, 2, 3)
+        leds.show()
+
+        #16648 bytes frame: 4 full chunks and a 260 bytes one
+        sizes = [len(transfer) for transfer in transport.spi.transfers]
+        self.assertEqual(sizes, [4096] * 4 + [260])
+        self.assertEqual(bytearray(sum(transport.spi.transfers, [])), leds.frame)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+import unittest
+import os
+import sys
+import math
+import time
+import wave
+import struct
+import tempfile
+sys.path.append('../')
+from backend.audiosource import WavSource
+from backend.apa102 import APA102
+from backend.apa102transport import NullTransport
+from backend.timing import monotonic
+try:
+    import numpy
+    from backend.audioanalysis import to_samples, levels, SpectrumAnalyzer
+    from backend.vumeter import VuMeter
+except ImportError:
+    numpy = None
+
+def write_wav(path, frequencies, duration=0.5, rate=16000, amplitude=0.5):
+    """
+    Write stereo WAV file with one sine per channel
+    """
+    frames = []
+    for index in range(int(duration * rate)):
+        for frequency in frequencies:
+            frames.append(int(amplitude * 32767 * math.sin(2.0 * math.pi * frequency * index / rate)))
+    wav = wave.open(path, 'wb')
+    wav.setnchannels(len(frequencies))
+    wav.setsampwidth(2)
+    wav.setframerate(rate)
+    wav.writeframes(struct.pack('<%dh' % len(frames), *frames))
+    wav.close()
+
+class TestWavSource(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mktemp(suffix=u'.wav')
+        write_wav(self.path, (1000, 1000), duration=0.1)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_read(self):
+        source = WavSource(self.path, block_frames=512)
+        source.open()
+        blocks = []
+        block = source.read()
+        while block is not None:
+            blocks.append(block)
+            block = source.read()
+        source.close()
+
+        #1600 frames: 3 full blocks
+        self.assertEqual(len(blocks), 3)
+        self.assertEqual(len(blocks[0]), 512 * 2 * 2)
+        self.assertEqual((source.rate, source.channels), (16000, 2))
+
+    def test_loop_realtime(self):
+        source = WavSource(self.path, block_frames=800, loop=True, realtime=True)
+        start = time.time()
+        for _ in range(4):
+            self.assertIsNotNone(source.read())
+        source.close()
+        self.assertGreaterEqual(time.time() - start, 0.19)
+
+@unittest.skipIf(numpy is None, u'NumPy is not installed')
+class TestAudioAnalysis(unittest.TestCase):
+
+    def get_block(self, frequency, amplitude=0.5, frames=512, rate=16000):
+        signal = amplitude * 32767 * numpy.sin(2.0 * numpy.pi * frequency * numpy.arange(frames) / rate)
+        return numpy.repeat(signal.astype(u'<i2')[:, None], 2, axis=1).tobytes()
+
+    def test_levels(self):
+        samples = to_samples(self.get_block(1000), 2)
+        self.assertEqual(samples.shape, (512, 2))
+        rms, peak = levels(samples)
+        self.assertAlmostEqual(rms, 0.5 / math.sqrt(2.0), places=2)
+        self.assertAlmostEqual(peak, 0.5, places=2)
+
+    def test_bands(self):
+        analyzer = SpectrumAnalyzer(16000, 512)
+        for frequency, band in ((150, 0), (1000, 1), (4000, 2)):
+            bands = analyzer.analyze(to_samples(self.get_block(frequency), 2))
+            self.assertEqual(int(numpy.argmax(bands)), band)
+
+@unittest.skipIf(numpy is None, u'NumPy is not installed')
+class TestVuMeter(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mktemp(suffix=u'.wav')
+        write_wav(self.path, (1000, 1000), duration=1.0)
+        self.frames = []
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def show_frame(self, pixels):
+        self.frames.append(pixels)
+        self.times.append(monotonic())
+
+    def test_run(self):
+        self.times = []
+        leds = APA102(num_led=3, transport=NullTransport())
+        vu_meter = VuMeter(WavSource(self.path, block_frames=512, realtime=True), leds, self.show_frame, fps=25)
+        vu_meter.start()
+        vu_meter.join(2.0)
+
+        self.assertFalse(vu_meter.is_alive())
+        self.assertEqual(vu_meter.blocks, 31)
+        #frames follow frame rate, not 32ms blocks arrival
+        self.assertGreaterEqual(len(self.frames), 20)
+        self.assertEqual(vu_meter.frames, len(self.frames))
+        intervals = [b - a for a, b in zip(self.times, self.times[1:])]
+        self.assertAlmostEqual(sum(intervals) / len(intervals), 0.04, delta=0.005)
+        self.assertLess(max(intervals), 0.06)
+        #mid band led is the brightest
+        headers = [bytearray(self.frames[-1])[index] & 0x1F for index in (0, 4, 8)]
+        self.assertEqual(headers.index(max(headers)), 1)
+        self.assertEqual(vu_meter.process_times.count, 31)
+
+if __name__ == "__main__":
+    unittest.main()
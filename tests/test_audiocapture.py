@@ -0,0 +1,158 @@
+import unittest
+import sys
+import struct
+import time
+sys.path.append('../')
+from backend.audiosource import AudioSource
+from backend.audiocapture import AudioCapture
+
+class CounterSource(AudioSource):
+    """
+    Source of count blocks, first sample of each block is block number
+    """
+
+    def __init__(self, count):
+        AudioSource.__init__(self, rate=16000, channels=2, block_frames=160)
+        self.count = count
+        self.index = 0
+        self.closed = False
+
+    def read(self):
+        if self.index>=self.count:
+            return None
+        block = struct.pack('<h', self.index) + bytes(bytearray(self.block_size - 2))
+        self.index += 1
+        return block
+
+    def close(self):
+        self.closed = True
+
+def read_numbers(reader):
+    numbers = []
+    block = reader.read()
+    while block is not None:
+        numbers.append(struct.unpack('<h', block[:2].tobytes())[0])
+        block = reader.read()
+    return numbers
+
+class TestAudioCapture(unittest.TestCase):
+
+    def test_capacity(self):
+        #10 ms blocks: 20 blocks of pre-roll, 10 blocks of margin and writer slot
+        capture = AudioCapture(CounterSource(10), preroll=0.2, margin=0.1)
+        self.assertEqual(capture.capacity, 31)
+        self.assertEqual(len(capture.buffer), 31 * 640)
+
+    def test_readers(self):
+        capture = AudioCapture(CounterSource(20), preroll=0.5)
+        first = capture.get_reader()
+        second = capture.get_reader()
+        capture.start()
+        capture.join(1.0)
+
+        self.assertTrue(capture.source.closed)
+        self.assertEqual(read_numbers(first), list(range(20)))
+        self.assertEqual(read_numbers(second), list(range(20)))
+        self.assertEqual(first.overruns, 0)
+
+    def test_zero_copy(self):
+        capture = AudioCapture(CounterSource(3), preroll=0.1)
+        reader = capture.get_reader()
+        capture.start()
+        capture.join(1.0)
+
+        block = reader.read()
+        self.assertIsInstance(block, memoryview)
+        self.assertIs(block.obj, capture.buffer)
+        self.assertEqual(len(block), reader.block_size)
+
+    def test_preroll(self):
+        capture = AudioCapture(CounterSource(50), preroll=0.1, margin=0.1)
+        capture.start()
+        capture.join(1.0)
+
+        #reader starts 5 blocks in the past
+        reader = capture.get_reader(preroll=0.05)
+        self.assertEqual(read_numbers(reader), list(range(45, 50)))
+        #pre-roll is limited to capture pre-roll
+        reader = capture.get_reader(preroll=10.0)
+        self.assertEqual(read_numbers(reader), list(range(40, 50)))
+
+    def test_overrun(self):
+        capture = AudioCapture(CounterSource(50), preroll=0.1, margin=0.0)
+        reader = capture.get_reader()
+        capture.start()
+        capture.join(1.0)
+
+        #capacity is 11 blocks, last 10 ones are still available
+        self.assertEqual(read_numbers(reader), list(range(40, 50)))
+        self.assertEqual(reader.overruns, 40)
+        self.assertEqual(capture.get_stats()[u'readers'], [{u'lag': 0, u'overruns': 40}])
+
+    def test_close_reader(self):
+        capture = AudioCapture(CounterSource(5), preroll=0.1)
+        reader = capture.get_reader()
+        reader.close()
+        capture.start()
+        capture.join(1.0)
+
+        self.assertIsNone(reader.read())
+        self.assertEqual(capture.get_stats()[u'readers'], [])
+
+class EndlessSource(CounterSource):
+
+    def __init__(self):
+        CounterSource.__init__(self, 0)
+
+    def read(self):
+        time.sleep(0.01)
+        return bytes(bytearray(self.block_size))
+
+class TestAudioCaptureAutoStop(unittest.TestCase):
+
+    def test_stop_with_last_reader(self):
+        capture = AudioCapture(EndlessSource(), preroll=0.1, auto_stop=True)
+        first = capture.get_reader()
+        second = capture.get_reader()
+        capture.start()
+        self.assertIsNotNone(first.read())
+
+        first.close()
+        time.sleep(0.05)
+        self.assertTrue(capture.is_alive())
+        second.close()
+        capture.join(1.0)
+        self.assertFalse(capture.is_alive())
+        self.assertTrue(capture.source.closed)
+
+    def test_wait_started(self):
+        capture = AudioCapture(EndlessSource(), preroll=0.1)
+        capture.start()
+        self.assertTrue(capture.wait_started(1.0))
+        capture.stop()
+        capture.join(1.0)
+
+    def test_wait_started_source_error(self):
+        #eg. capture device busy: source ends before first block
+        capture = AudioCapture(CounterSource(0), preroll=0.1)
+        reader = capture.get_reader()
+        start = time.time()
+        capture.start()
+
+        self.assertFalse(capture.wait_started(1.0))
+        self.assertLess(time.time() - start, 0.5)
+        self.assertIsNone(reader.read())
+        self.assertTrue(capture.source.closed)
+
+    def test_no_auto_stop(self):
+        capture = AudioCapture(EndlessSource(), preroll=0.1)
+        capture.get_reader().close()
+        capture.start()
+        time.sleep(0.05)
+        self.assertTrue(capture.is_alive())
+        capture.stop()
+        capture.join(1.0)
+        self.assertFalse(capture.is_alive())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+import colorsys
+import sys
+sys.path.append('../')
+from backend import colors
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+class TestColors(unittest.TestCase):
+
+    def test_wheel(self):
+        for pos in range(300):
+            self.assertEqual(colors.wheel(pos), colors.compute_wheel(pos))
+
+    @unittest.skipIf(numpy is None, u'NumPy is not installed')
+    def test_wheel_colors(self):
+        rgb = colors.wheel_colors([0, 100, 255])
+        self.assertEqual(rgb.shape, (3, 3))
+        self.assertEqual(rgb.tolist(), colors.unpack_colors([colors.wheel(0), colors.wheel(100), colors.wheel(255)]).tolist())
+
+    @unittest.skipIf(numpy is None, u'NumPy is not installed')
+    def test_unpack_colors(self):
+        self.assertEqual(colors.unpack_colors([0x123456]).tolist(), [[0x12, 0x34, 0x56]])
+
+    @unittest.skipIf(numpy is None, u'NumPy is not installed')
+    def test_hsv_hsl_to_rgb(self):
+        hues = numpy.linspace(0.0, 1.0, 50)
+        hsv = colors.hsv_to_rgb(hues, 0.8, 0.6).tolist()
+        hsl = colors.hsl_to_rgb(hues, 0.8, 0.6).tolist()
+        for index, hue in enumerate(hues):
+            self.assertEqual(hsv[index], [int(round(c * 255)) for c in colorsys.hsv_to_rgb(hue, 0.8, 0.6)])
+            self.assertEqual(hsl[index], [int(round(c * 255)) for c in colorsys.hls_to_rgb(hue, 0.6, 0.8)])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+import os
+import sys
+import wave
+import tempfile
+sys.path.append('../')
+from backend.audiosource import WavSource
+try:
+    import numpy
+    from backend.doa import DoaEstimator, DoaTracker
+except ImportError:
+    numpy = None
+
+def get_stereo(shift, frames, amplitude=0.3, seed=0):
+    """
+    Return noise samples with second channel delayed by shift samples
+    (negative shift: second channel leads)
+    """
+    rand = numpy.random.RandomState(seed)
+    signal = amplitude * 32767 * numpy.clip(rand.randn(frames + 8) / 3.0, -1.0, 1.0)
+    left = signal[4:4 + frames]
+    right = signal[4 - shift:4 - shift + frames]
+    return numpy.stack([left, right], axis=1).astype(u'<i2')
+
+@unittest.skipIf(numpy is None, u'NumPy is not installed')
+class TestDoaEstimator(unittest.TestCase):
+
+    def setUp(self):
+        self.estimator = DoaEstimator(16000, 512)
+
+    def test_front(self):
+        angle, confidence = self.estimator.estimate(get_stereo(0, 512))
+        self.assertEqual(angle, 0.0)
+        self.assertGreater(confidence, 0.9)
+
+    def test_sides(self):
+        #second channel leads: source is on second microphone side
+        self.assertGreater(self.estimator.estimate(get_stereo(-2, 512))[0], 30.0)
+        self.assertLess(self.estimator.estimate(get_stereo(2, 512))[0], -30.0)
+
+    def test_quiet(self):
+        self.assertIsNone(self.estimator.estimate(get_stereo(2, 512, amplitude=0.0001)))
+        self.assertIsNone(self.estimator.process(get_stereo(2, 512, amplitude=0.0001)))
+
+    def test_smoothing(self):
+        self.assertEqual(self.estimator.process(get_stereo(0, 512)), 0.0)
+        angle = self.estimator.process(get_stereo(-2, 512, seed=1))
+        #first estimation moves angle partially
+        self.assertGreater(angle, 0.0)
+        self.assertLess(angle, 30.0)
+        for seed in range(2, 20):
+            angle = self.estimator.process(get_stereo(-2, 512, seed=seed))
+        self.assertGreater(angle, 30.0)
+
+@unittest.skipIf(numpy is None, u'NumPy is not installed')
+class TestDoaTracker(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mktemp(suffix=u'.wav')
+        wav = wave.open(self.path, 'wb')
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(16000)
+        wav.writeframes(get_stereo(-2, 16000).tobytes())
+        wav.close()
+        self.angles = []
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_run(self):
+        tracker = DoaTracker(WavSource(self.path, block_frames=512), self.angles.append)
+        tracker.start()
+        tracker.join(2.0)
+
+        self.assertEqual(tracker.blocks, 31)
+        #first angle is published, next ones are throttled
+        self.assertEqual(len(self.angles), 1)
+        self.assertGreater(tracker.get_angle(), 30.0)
+
+    def test_gate(self):
+        tracker = DoaTracker(WavSource(self.path, block_frames=512), self.angles.append, gate=lambda: False)
+        tracker.start()
+        tracker.join(2.0)
+
+        self.assertEqual((tracker.blocks, tracker.skipped_blocks), (0, 31))
+        self.assertEqual(self.angles, [])
+        self.assertIsNone(tracker.get_angle())
+
+if __name__ == "__main__":
+    unittest.main()
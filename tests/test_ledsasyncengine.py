@@ -0,0 +1,84 @@
+import unittest
+import time
+import sys
+sys.path.append('../')
+from backend.ledsasyncengine import AsyncLedsEngine
+from backend.ledsprofile import LedsTimeline
+
+OFF = b'\xe0\x00\x00\x00' * 2
+RED = b'\xff\x00\x00\xff' * 2
+BLUE = b'\xff\xff\x00\x00' * 2
+
+class TestAsyncLedsEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.frames = []
+        self.turn_offs = 0
+        self.engine = AsyncLedsEngine(self.show_frame, self.turn_off, OFF)
+        self.engine.start()
+
+    def tearDown(self):
+        self.engine.stop()
+        self.engine.join(1.0)
+
+    def show_frame(self, pixels):
+        self.frames.append(pixels)
+
+    def turn_off(self):
+        self.turn_offs += 1
+
+    def test_play(self):
+        timeline = LedsTimeline([(0.0, RED), (0.02, BLUE)], 0.04)
+        self.engine.play({u'uuid': u'1'}, timeline, 2)
+        self.assertTrue(self.engine.is_playing())
+        time.sleep(0.2)
+
+        self.assertEqual(self.frames, [RED, BLUE, RED, BLUE])
+        self.assertFalse(self.engine.is_playing())
+        self.assertEqual(self.turn_offs, 1)
+        self.assertEqual(self.engine.stats[u'frames'], 4)
+
+    def test_play_interrupts_same_priority(self):
+        self.engine.play({u'uuid': u'1'}, LedsTimeline([(0.0, RED), (1.0, BLUE)], 2.0), None)
+        time.sleep(0.05)
+        self.engine.play({u'uuid': u'2'}, LedsTimeline([(0.0, BLUE)], 0.01), 1)
+        time.sleep(0.1)
+
+        self.assertEqual(self.frames, [RED, BLUE])
+        #replaced profile does not turn off leds
+        self.assertEqual(self.turn_offs, 1)
+        self.assertFalse(self.engine.is_playing())
+
+    def test_layers(self):
+        self.engine.play({u'uuid': u'1'}, LedsTimeline([(0.0, RED)], 1.0, (0, 1)), None, priority=0)
+        time.sleep(0.05)
+        self.engine.play({u'uuid': u'2'}, LedsTimeline([(0.0, BLUE)], 0.05, (1,)), 1, priority=10)
+        time.sleep(0.15)
+
+        self.assertTrue(self.engine.is_playing(0))
+        self.assertFalse(self.engine.is_playing(10))
+        self.assertEqual(self.frames, [RED, RED[:4] + BLUE[4:], RED])
+        self.assertEqual(self.turn_offs, 0)
+
+    def test_stop_playing(self):
+        self.engine.play({u'uuid': u'1'}, LedsTimeline([(0.0, RED)], 1.0), None)
+        time.sleep(0.05)
+        self.engine.stop_playing()
+        time.sleep(0.05)
+
+        self.assertFalse(self.engine.is_playing())
+        self.assertEqual(self.turn_offs, 1)
+
+    def test_shared_loop(self):
+        other_frames = []
+        other = AsyncLedsEngine(other_frames.append, lambda: None, OFF, loop=self.engine.loop)
+        self.engine.play({u'uuid': u'1'}, LedsTimeline([(0.0, RED), (0.02, BLUE)], 0.04), 1)
+        other.play({u'uuid': u'2'}, LedsTimeline([(0.0, BLUE), (0.02, RED)], 0.04), 1)
+        time.sleep(0.1)
+
+        self.assertEqual(self.frames, [RED, BLUE])
+        self.assertEqual(other_frames, [BLUE, RED])
+        self.assertFalse(other.is_playing())
+
+if __name__ == "__main__":
+    unittest.main()
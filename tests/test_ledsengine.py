@@ -0,0 +1,96 @@
+import unittest
+import time
+import sys
+sys.path.append('../')
+from backend.ledsengine import LedsEngine, LedsLayer, LedsCompositor
+from backend.ledsprofile import LedsTimeline
+
+OFF = b'\xe0\x00\x00\x00' * 2
+RED = b'\xff\x00\x00\xff' * 2
+BLUE = b'\xff\xff\x00\x00' * 2
+
+class TestLedsEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.frames = []
+        self.turn_offs = 0
+        self.engine = LedsEngine(self.show_frame, self.turn_off, OFF)
+        self.engine.start()
+
+    def tearDown(self):
+        self.engine.stop()
+        self.engine.join(1.0)
+
+    def show_frame(self, pixels):
+        self.frames.append(pixels)
+
+    def turn_off(self):
+        self.turn_offs += 1
+
+    def test_play(self):
+        timeline = LedsTimeline([(0.0, RED), (0.02, BLUE)], 0.04)
+        self.engine.play({u'uuid': u'1'}, timeline, 2)
+        self.assertTrue(self.engine.is_playing())
+        time.sleep(0.2)
+
+        self.assertEqual(self.frames, [RED, BLUE, RED, BLUE])
+        self.assertFalse(self.engine.is_playing())
+        self.assertEqual(self.turn_offs, 1)
+        self.assertEqual(self.engine.stats[u'frames'], 4)
+
+    def test_play_interrupts_same_priority(self):
+        self.engine.play({u'uuid': u'1'}, LedsTimeline([(0.0, RED), (1.0, BLUE)], 2.0), None)
+        time.sleep(0.05)
+        self.engine.play({u'uuid': u'2'}, LedsTimeline([(0.0, BLUE)], 0.01), 1)
+        time.sleep(0.1)
+
+        self.assertEqual(self.frames, [RED, BLUE])
+        #replaced profile does not turn off leds
+        self.assertEqual(self.turn_offs, 1)
+        self.assertFalse(self.engine.is_playing())
+
+    def test_layers(self):
+        self.engine.play({u'uuid': u'1'}, LedsTimeline([(0.0, RED)], 1.0, (0, 1)), None, priority=0)
+        time.sleep(0.05)
+        self.engine.play({u'uuid': u'2'}, LedsTimeline([(0.0, BLUE)], 0.05, (1,)), 1, priority=10)
+        time.sleep(0.15)
+
+        self.assertTrue(self.engine.is_playing(0))
+        self.assertFalse(self.engine.is_playing(10))
+        self.assertEqual(self.frames, [RED, RED[:4] + BLUE[4:], RED])
+        self.assertEqual(self.turn_offs, 0)
+
+    def test_stop_playing(self):
+        self.engine.play({u'uuid': u'1'}, LedsTimeline([(0.0, RED)], 1.0), None)
+        time.sleep(0.05)
+        self.engine.stop_playing()
+        time.sleep(0.05)
+
+        self.assertFalse(self.engine.is_playing())
+        self.assertEqual(self.turn_offs, 1)
+
+class TestLedsCompositor(unittest.TestCase):
+
+    def test_compose_alpha(self):
+        compositor = LedsCompositor(OFF)
+        compositor.set_layer(LedsLayer({u'uuid': u'1'}, LedsTimeline([(0.0, RED)], 1.0), None, priority=0), 0.0)
+        compositor.set_layer(LedsLayer({u'uuid': u'2'}, LedsTimeline([(0.0, BLUE)], 1.0, (0,)), None, priority=1, blend=LedsLayer.BLEND_ALPHA, alpha=0.5), 0.0)
+        compositor.update(0.0)
+
+        pixels = bytearray(compositor.compose())
+        self.assertEqual(list(pixels[:4]), [0xFF, 128, 0, 128])
+        self.assertEqual(bytes(pixels[4:]), RED[4:])
+
+    def test_layer_end(self):
+        compositor = LedsCompositor(OFF)
+        compositor.set_layer(LedsLayer({u'uuid': u'1'}, LedsTimeline([(0.0, RED), (0.5, BLUE)], 1.0), 2), 10.0)
+
+        self.assertEqual(compositor.update(10.0)[0], True)
+        self.assertEqual(compositor.get_next_deadline(), 10.5)
+        self.assertEqual(compositor.update(11.6)[1], [])
+        changed, ended = compositor.update(12.0)
+        self.assertEqual(len(ended), 1)
+        self.assertFalse(compositor.has_layers())
+
+if __name__ == "__main__":
+    unittest.main()
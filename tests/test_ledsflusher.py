@@ -0,0 +1,98 @@
+import unittest
+import sys
+import time
+sys.path.append('../')
+from backend.ledsflusher import LedsFlusher
+from backend.timing import monotonic
+
+class FakeLedsDriver(object):
+
+    def __init__(self):
+        self.shows = []
+        self.changed = True
+
+    def show(self):
+        self.shows.append(monotonic())
+        return self.changed
+
+class TestLedsFlusher(unittest.TestCase):
+
+    def setUp(self):
+        self.driver = FakeLedsDriver()
+        self.flushed = []
+        self.flusher = None
+
+    def tearDown(self):
+        if self.flusher:
+            self.flusher.stop()
+            self.flusher.join(1.0)
+
+    def start(self, max_fps):
+        self.flusher = LedsFlusher(self.driver, max_fps, lambda sent, start: self.flushed.append((sent, start)))
+        self.flusher.start()
+
+    def test_coalesce(self):
+        self.start(10)
+        self.flusher.flush()
+        time.sleep(0.05)
+        #requests received during frame interval are sent in a single frame
+        for _ in range(10):
+            self.flusher.flush()
+        time.sleep(0.25)
+
+        self.assertEqual(len(self.driver.shows), 2)
+        self.assertEqual(self.flusher.flush_requests, 11)
+        self.assertEqual(self.flusher.flushes, 2)
+        self.assertEqual(len(self.flushed), 2)
+        #callback gets show result and flush start time
+        self.assertTrue(self.flushed[0][0])
+        self.assertLessEqual(self.flushed[0][1], self.driver.shows[0])
+
+        self.flusher.reset_stats()
+        self.assertEqual((self.flusher.flush_requests, self.flusher.flushes), (0, 0))
+
+    def test_skipped_flush(self):
+        self.start(50)
+        self.driver.changed = False
+        self.flusher.flush()
+        time.sleep(0.05)
+
+        self.assertEqual(len(self.flushed), 1)
+        self.assertFalse(self.flushed[0][0])
+
+    def test_fps_cap(self):
+        self.start(20)
+        end = monotonic() + 0.5
+        while monotonic()<end:
+            self.flusher.flush()
+            time.sleep(0.005)
+        time.sleep(0.1)
+
+        self.assertLessEqual(len(self.driver.shows), 12)
+        intervals = [b - a for a, b in zip(self.driver.shows, self.driver.shows[1:])]
+        self.assertGreaterEqual(min(intervals), 0.045)
+
+    def test_no_request(self):
+        self.start(50)
+        time.sleep(0.1)
+
+        self.assertEqual(self.driver.shows, [])
+
+    def test_stop_flushes_pending(self):
+        self.start(1)
+        self.flusher.flush()
+        time.sleep(0.05)
+        #next frame is delayed by frame rate cap
+        self.flusher.flush()
+        time.sleep(0.05)
+        self.assertEqual(len(self.driver.shows), 1)
+
+        start = monotonic()
+        self.flusher.stop()
+        self.flusher.join(1.0)
+        self.assertFalse(self.flusher.is_alive())
+        self.assertEqual(len(self.driver.shows), 2)
+        self.assertLess(monotonic() - start, 0.5)
+
+if __name__ == "__main__":
+    unittest.main()
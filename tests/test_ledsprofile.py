@@ -0,0 +1,209 @@
+import unittest
+import sys
+from threading import Thread
+sys.path.append('../')
+from backend.apa102 import APA102
+from backend.apa102transport import NullTransport
+from backend.ledsprofile import LedsProfileCompiler, LedsProfileStore, LedsAction
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+PALETTE = {
+    u'black': [0, 0, 0],
+    u'red': [255, 0, 0],
+    u'blue': [0, 0, 255],
+}
+
+class TestLedsProfileCompiler(unittest.TestCase):
+
+    def setUp(self):
+        self.leds = APA102(num_led=3, transport=NullTransport())
+        self.compiler = LedsProfileCompiler(self.leds, PALETTE, cache_size=2)
+
+    def get_profile(self, uuid, actions):
+        return {u'uuid': uuid, u'name': uuid, u'repeat': 1, u'actions': actions}
+
+    def test_compile(self):
+        profile = self.get_profile(u'1', [
+            {u'action': 4, u'color': u'red', u'pause': 0, u'brightness': 100},
+            {u'action': 5, u'color': None, u'pause': 120, u'brightness': 0},
+            {u'action': 1, u'color': u'blue', u'pause': 0, u'brightness': 100},
+            {u'action': 2, u'color': u'blue', u'pause': 0, u'brightness': 100},
+            {u'action': 5, u'color': None, u'pause': 80, u'brightness': 0},
+        ])
+        timeline = self.compiler.compile(profile)
+
+        self.assertAlmostEqual(timeline.duration, 0.2)
+        self.assertEqual(len(timeline.frames), 2)
+        self.assertEqual(timeline.frames[0][0], 0.0)
+        self.assertAlmostEqual(timeline.frames[1][0], 0.12)
+        self.leds.set_pixel(0, 0, 0, 255)
+        self.leds.set_pixel(1, 0, 0, 255)
+        self.leds.set_pixel(2, 255, 0, 0)
+        self.assertEqual(timeline.frames[1][1], self.leds.get_pixels())
+
+    def test_compile_unchanged_frames_dropped(self):
+        profile = self.get_profile(u'1', [
+            {u'action': 4, u'color': u'red', u'pause': 0, u'brightness': 50},
+            {u'action': 5, u'color': None, u'pause': 100, u'brightness': 0},
+            {u'action': 4, u'color': u'red', u'pause': 0, u'brightness': 50},
+            {u'action': 5, u'color': None, u'pause': 100, u'brightness': 0},
+        ])
+        timeline = self.compiler.compile(profile)
+        self.assertEqual(len(timeline.frames), 1)
+        self.assertAlmostEqual(timeline.duration, 0.2)
+
+    def test_compile_invalid_action(self):
+        with self.assertRaises(ValueError):
+            self.compiler.compile(self.get_profile(u'1', [{u'action': 9, u'color': None, u'pause': 0, u'brightness': 0}]))
+        with self.assertRaises(ValueError):
+            self.compiler.compile(self.get_profile(u'1', [{u'action': 4, u'color': u'red', u'pause': 0, u'brightness': 120}]))
+
+    def test_compile_fade(self):
+        profile = self.get_profile(u'1', [
+            {u'action': 6, u'color': u'red', u'pause': 200, u'brightness': 0, u'to_brightness': 100, u'fps': 10},
+        ])
+        timeline = self.compiler.compile(profile)
+        self.assertAlmostEqual(timeline.duration, 0.2)
+        self.assertEqual(len(timeline.frames), 3)
+        self.assertAlmostEqual(timeline.frames[1][0], 0.1)
+        #last frame holds the target value
+        self.leds.set_pixel_rgb(0, 0xFF0000, 100)
+        self.leds.set_pixel_rgb(1, 0xFF0000, 100)
+        self.leds.set_pixel_rgb(2, 0xFF0000, 100)
+        self.assertEqual(timeline.frames[-1][1], self.leds.get_pixels())
+
+    def test_compile_fade_single_led(self):
+        profile = self.get_profile(u'1', [
+            {u'action': 6, u'led': 2, u'color': u'red', u'to_color': u'blue', u'pause': 100, u'brightness': 100, u'fps': 10},
+        ])
+        timeline = self.compiler.compile(profile)
+        self.assertEqual(timeline.leds, (1,))
+        pixels = bytearray(timeline.frames[-1][1])
+        self.assertEqual(list(pixels[4:8]), list(bytearray(self.leds.encode_pixels([0, 0, 255], 100))))
+
+    def test_compile_fade_without_duration(self):
+        profile = self.get_profile(u'1', [
+            {u'action': 6, u'color': u'red', u'pause': 0, u'brightness': 0, u'to_brightness': 100},
+            {u'action': 5, u'color': None, u'pause': 100, u'brightness': 0},
+        ])
+        timeline = self.compiler.compile(profile)
+        #only end values frame
+        self.assertEqual(len(timeline.frames), 1)
+        self.assertEqual(timeline.frames[0][0], 0.0)
+        self.leds.set_pixels([255, 0, 0] * 3, brightness=100)
+        self.assertEqual(timeline.frames[0][1], self.leds.get_pixels())
+
+    @unittest.skipIf(numpy is None, u'NumPy is not installed')
+    def test_compile_fade_python_same_as_numpy(self):
+        action = self.compiler.parse_action({u'action': 6, u'led': 2, u'color': u'red', u'to_color': u'#102030', u'pause': 500, u'brightness': 10, u'to_brightness': 90, u'easing': u'ease-in-out'})
+        start_values = [255, 0, 0, 10]
+        end_values = [16, 32, 48, 90]
+        numpy_pixels = self.compiler._LedsProfileCompiler__get_fade_pixels_numpy(action, 12, start_values, end_values)
+        python_pixels = self.compiler._LedsProfileCompiler__get_fade_pixels(action, 12, start_values, end_values)
+        self.assertEqual(len(numpy_pixels), 13)
+        self.assertEqual(numpy_pixels, python_pixels)
+
+    def test_compile_fade_invalid(self):
+        with self.assertRaises(ValueError):
+            self.compiler.compile(self.get_profile(u'1', [{u'action': 6, u'color': u'red', u'pause': 100, u'brightness': 0, u'easing': u'bounce'}]))
+        with self.assertRaises(ValueError):
+            self.compiler.compile(self.get_profile(u'1', [{u'action': 6, u'color': u'red', u'pause': 100, u'brightness': 0, u'to_brightness': 150}]))
+
+    def test_parse_action(self):
+        action = self.compiler.parse_action({u'action': 2, u'color': u'blue', u'pause': 0, u'brightness': 30})
+        self.assertIsInstance(action, LedsAction)
+        self.assertEqual(action.leds, (1,))
+        self.assertEqual(action.color, 0x0000FF)
+        self.assertEqual(action.brightness, 30)
+        self.assertFalse(hasattr(action, u'__dict__'))
+        action = self.compiler.parse_action({u'action': 5, u'color': None, u'pause': 250, u'brightness': 0})
+        self.assertAlmostEqual(action.duration, 0.25)
+
+    def test_parse_color(self):
+        self.assertEqual(self.compiler.parse_color(u'red'), 0xFF0000)
+        self.assertEqual(self.compiler.parse_color(u'#102030'), 0x102030)
+        self.assertEqual(self.compiler.parse_color([16, 32, 48]), 0x102030)
+        with self.assertRaises(ValueError):
+            self.compiler.parse_color(u'unknown')
+        with self.assertRaises(ValueError):
+            self.compiler.parse_color([0, 0, 300])
+
+    def test_compile_rgb_color(self):
+        timeline = self.compiler.compile(self.get_profile(u'1', [{u'action': 1, u'color': [16, 32, 48], u'pause': 0, u'brightness': 100}]))
+        self.leds.clear_strip()
+        self.leds.set_pixel(0, 16, 32, 48, 100)
+        self.assertEqual(timeline.frames[0][1], self.leds.get_pixels())
+
+    def test_cache(self):
+        actions = [{u'action': 4, u'color': u'red', u'pause': 0, u'brightness': 50}]
+        timeline = self.compiler.get_timeline(self.get_profile(u'1', actions))
+        self.assertIs(self.compiler.get_timeline(self.get_profile(u'1', actions)), timeline)
+
+        #content change compiles again
+        other_actions = [{u'action': 4, u'color': u'blue', u'pause': 0, u'brightness': 50}]
+        self.assertIsNot(self.compiler.get_timeline(self.get_profile(u'1', other_actions)), timeline)
+
+        #lru eviction and invalidation
+        self.compiler.get_timeline(self.get_profile(u'2', actions))
+        self.assertIsNot(self.compiler.get_timeline(self.get_profile(u'1', actions)), timeline)
+        timeline = self.compiler.get_timeline(self.get_profile(u'1', actions))
+        self.compiler.invalidate(u'1')
+        self.assertIsNot(self.compiler.get_timeline(self.get_profile(u'1', actions)), timeline)
+
+    def test_concurrent_compile(self):
+        colors = [u'red', u'blue', [16, 32, 48], u'#102030']
+        profiles = [self.get_profile(u'%d' % index, [
+            {u'action': 1 + index % 3, u'color': colors[index % 4], u'pause': 0, u'brightness': 10 + index},
+            {u'action': 6, u'color': colors[(index + 1) % 4], u'pause': 100, u'brightness': 0, u'to_brightness': 100, u'fps': 50},
+        ]) for index in range(40)]
+        expected = [LedsProfileCompiler(self.leds, PALETTE).compile(profile).frames for profile in profiles]
+
+        compiler = LedsProfileCompiler(self.leds, PALETTE, cache_size=100)
+        errors = []
+        def compile_all(order):
+            for index in order:
+                if compiler.get_timeline(profiles[index]).frames!=expected[index]:
+                    errors.append(index)
+        threads = [Thread(target=compile_all, args=(list(range(40))[::step],)) for step in (1, -1, 1, -1)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+
+class TestLedsProfileStore(unittest.TestCase):
+
+    def setUp(self):
+        self.loads = 0
+        self.profiles = [
+            {u'uuid': u'1', u'name': u'one', u'repeat': 1, u'actions': []},
+            {u'uuid': u'2', u'name': u'two', u'repeat': 1, u'actions': []},
+        ]
+        self.store = LedsProfileStore(self.load)
+
+    def load(self):
+        self.loads += 1
+        return list(self.profiles)
+
+    def test_lookups_load_once(self):
+        self.assertEqual(self.store.get(u'2')[u'name'], u'two')
+        self.assertEqual(self.store.get_by_name(u'one')[u'uuid'], u'1')
+        self.assertIsNone(self.store.get(u'3'))
+        self.assertIsNone(self.store.get_by_name(u'three'))
+        self.assertEqual(len(self.store.get_profiles()), 2)
+        self.assertEqual(self.loads, 1)
+
+    def test_invalidate(self):
+        self.assertIsNone(self.store.get(u'3'))
+        self.profiles.append({u'uuid': u'3', u'name': u'three', u'repeat': 1, u'actions': []})
+        self.assertIsNone(self.store.get(u'3'))
+        self.store.invalidate()
+        self.assertEqual(self.store.get(u'3')[u'name'], u'three')
+        self.assertEqual(self.loads, 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+import os
+import sys
+import tempfile
+sys.path.append('../')
+from backend.ledsrenderer import LedsOfflineRenderer, write_dump, read_dump, load_dump
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+PALETTE = {
+    u'black': [0, 0, 0],
+    u'red': [255, 0, 0],
+    u'blue': [0, 0, 255],
+}
+
+BLINK = {
+    u'uuid': u'1',
+    u'name': u'blink',
+    u'repeat': 2,
+    u'actions': [
+        {u'action': 4, u'color': u'red', u'pause': 0, u'brightness': 100},
+        {u'action': 5, u'color': None, u'pause': 100, u'brightness': 0},
+        {u'action': 4, u'color': u'black', u'pause': 0, u'brightness': 100},
+        {u'action': 5, u'color': None, u'pause': 100, u'brightness': 0},
+    ]
+}
+
+class TestLedsOfflineRenderer(unittest.TestCase):
+
+    def setUp(self):
+        self.renderer = LedsOfflineRenderer(PALETTE)
+        self.path = tempfile.mktemp(suffix=u'.leds')
+
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_render(self):
+        frames = self.renderer.render(BLINK)
+
+        self.assertEqual([round(timestamp, 3) for timestamp, _ in frames], [0.0, 0.1, 0.2, 0.3, 0.4])
+        self.assertEqual(list(self.renderer.decode_pixels(frames[0][1])[0:4]), [255, 0, 0, 255])
+        self.assertEqual(list(self.renderer.decode_pixels(frames[1][1])[0:4]), [0, 0, 0, 255])
+        #leds turned off at the end
+        self.assertEqual(frames[-1][1], self.renderer.compiler.get_off_pixels())
+
+    def test_render_infinite_profile(self):
+        profile = dict(BLINK, repeat=99)
+        frames = self.renderer.render(profile, max_duration=1.0)
+        self.assertEqual(len(frames), 11)
+        self.assertAlmostEqual(frames[-1][0], 1.0)
+
+    def test_dump(self):
+        count = self.renderer.render_dump(BLINK, self.path)
+        num_led, frames = read_dump(self.path)
+
+        self.assertEqual(num_led, 3)
+        self.assertEqual(len(frames), count)
+        self.assertAlmostEqual(frames[1][0], 0.1)
+        self.assertEqual(list(bytearray(frames[0][1])), [255, 0, 0, 255] * 3)
+
+    def test_invalid_dump(self):
+        write_dump(self.path, [(0.0, bytearray(12))], 3)
+        with open(self.path, u'ab') as dump:
+            dump.write(b'\x00')
+        with self.assertRaises(ValueError):
+            read_dump(self.path)
+
+    @unittest.skipIf(numpy is None, u'NumPy is not installed')
+    def test_load_dump(self):
+        self.renderer.render_dump(BLINK, self.path)
+        timestamps, pixels = load_dump(self.path)
+
+        self.assertEqual(pixels.shape, (5, 3, 4))
+        self.assertEqual(pixels.dtype, numpy.uint8)
+        self.assertTrue(numpy.allclose(timestamps, [0.0, 0.1, 0.2, 0.3, 0.4]))
+        self.assertEqual(pixels[0, :, 0].tolist(), [255, 255, 255])
+
+if __name__ == "__main__":
+    unittest.main()
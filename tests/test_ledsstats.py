@@ -0,0 +1,158 @@
+import unittest
+import sys
+sys.path.append('../')
+from backend.ledsstats import Histogram, LedsTimingStats, LedsRenderTracer
+from backend.ledsengine import LedsLayer
+from backend.ledsprofile import LedsTimeline, LedsProfileCompiler
+from backend.apa102 import APA102
+from backend.apa102transport import NullTransport
+from backend.timing import monotonic
+
+#default "Slide (yellow)" profile, ending with a set action
+SLIDE_PROFILE = {
+    u'uuid': u'6',
+    u'name': u'Slide (yellow)',
+    u'repeat': 3,
+    u'actions': [
+        {u'action': 1, u'color': u'yellow', u'pause': 0, u'brightness': 60},
+        {u'action': 5, u'color': None, u'pause': 100, u'brightness': 0},
+        {u'action': 1, u'color': u'black', u'pause': 0, u'brightness': 60},
+        {u'action': 2, u'color': u'yellow', u'pause': 0, u'brightness': 60},
+        {u'action': 5, u'color': None, u'pause': 100, u'brightness': 0},
+        {u'action': 2, u'color': u'black', u'pause': 0, u'brightness': 60},
+        {u'action': 3, u'color': u'yellow', u'pause': 0, u'brightness': 60},
+        {u'action': 5, u'color': None, u'pause': 100, u'brightness': 0},
+        {u'action': 3, u'color': u'black', u'pause': 0, u'brightness': 60},
+        {u'action': 2, u'color': u'yellow', u'pause': 0, u'brightness': 60},
+        {u'action': 5, u'color': None, u'pause': 100, u'brightness': 0},
+        {u'action': 2, u'color': u'black', u'pause': 0, u'brightness': 60},
+    ]
+}
+
+class TestHistogram(unittest.TestCase):
+
+    def test_add(self):
+        histogram = Histogram((1.0, 2.0, 5.0))
+        for value in (0.5, 1.0, 1.5, 3.0, 8.0):
+            histogram.add(value)
+
+        data = histogram.to_dict()
+        self.assertEqual(data[u'counts'], [2, 1, 1, 1])
+        self.assertEqual(data[u'count'], 5)
+        self.assertAlmostEqual(data[u'mean'], 2.8)
+        self.assertEqual(data[u'max'], 8.0)
+        self.assertEqual(data[u'p50'], 2.0)
+        self.assertEqual(data[u'p99'], 8.0)
+
+    def test_percentile(self):
+        histogram = Histogram((1.0, 2.0, 5.0))
+        self.assertIsNone(histogram.percentile(50))
+        for value in [0.5] * 90 + [1.5] * 9 + [7.0]:
+            histogram.add(value)
+
+        self.assertEqual(histogram.percentile(50), 1.0)
+        self.assertEqual(histogram.percentile(95), 2.0)
+        self.assertEqual(histogram.percentile(100), 7.0)
+
+    def test_reset(self):
+        histogram = Histogram((1.0,))
+        histogram.add(3.0)
+        histogram.reset()
+        self.assertEqual(histogram.to_dict()[u'counts'], [0, 0])
+        self.assertEqual(histogram.max, 0.0)
+
+class TestLedsTimingStats(unittest.TestCase):
+
+    def test_layer_frames(self):
+        stats = LedsTimingStats()
+        layer = LedsLayer({u'uuid': u'1'}, LedsTimeline([(0.0, b'a'), (0.1, b'b'), (0.2, b'c')], 0.3), 1)
+        layer.stats = stats
+        layer.begin(0.0)
+        layer.update(0.001)
+        #late update: frame b is replaced by frame c before being shown
+        layer.update(0.25)
+
+        self.assertEqual(stats.frames, 2)
+        self.assertEqual(stats.dropped_frames, 1)
+        self.assertEqual(stats.late_frames, 1)
+        self.assertAlmostEqual(stats.lateness.max, 50.0)
+
+    def test_cycle_end_frame_not_dropped(self):
+        leds = APA102(num_led=3, transport=NullTransport())
+        compiler = LedsProfileCompiler(leds, {u'black': [0, 0, 0], u'yellow': [255, 255, 0]})
+        timeline = compiler.compile(SLIDE_PROFILE)
+        #last frame is due at the end of cycle, with first frame of next cycle
+        self.assertAlmostEqual(timeline.frames[-1][0], timeline.duration)
+
+        stats = LedsTimingStats()
+        layer = LedsLayer(SLIDE_PROFILE, timeline, SLIDE_PROFILE[u'repeat'])
+        layer.stats = stats
+        layer.begin(0.0)
+        deadline = layer.get_next_deadline()
+        while not layer.is_ended(deadline):
+            layer.update(deadline + 0.001)
+            deadline = layer.get_next_deadline()
+        layer.update(deadline + 0.001)
+
+        self.assertEqual(stats.dropped_frames, 0)
+        #end frame is only shown at the end of last cycle
+        self.assertEqual(stats.frames, 3 * (len(timeline.frames) - 1) + 1)
+        self.assertEqual(layer.pixels, timeline.frames[-1][1])
+
+class TestLedsRenderTracer(unittest.TestCase):
+
+    def test_trace(self):
+        tracer = LedsRenderTracer()
+        trace = tracer.begin()
+        trace.mark_lookup()
+        trace.mark_handoff()
+        #not recorded until frame is sent
+        tracer.flushed(True, monotonic())
+        self.assertEqual(tracer.traces, 0)
+        trace.mark_frame()
+        tracer.frame_loaded()
+        tracer.flushed(True, monotonic())
+
+        self.assertEqual(tracer.traces, 1)
+        summary = tracer.get_summary()
+        for stage in LedsRenderTracer.STAGES:
+            self.assertEqual(summary[stage][u'count'], 1)
+        self.assertLessEqual(summary[u'lookup'][u'p50'], summary[u'wire'][u'p50'])
+
+    def test_flush_without_frame(self):
+        tracer = LedsRenderTracer()
+        trace = tracer.begin()
+        start = monotonic()
+        trace.mark_frame()
+        #flush started before frame was loaded
+        tracer.flushed(True, start)
+        tracer.frame_loaded()
+        tracer.flushed(True, start)
+        self.assertEqual(tracer.traces, 0)
+        #flush skipped (unchanged frame)
+        tracer.flushed(False, monotonic())
+        self.assertEqual(tracer.traces, 0)
+
+        tracer.flushed(True, monotonic())
+        self.assertEqual(tracer.traces, 1)
+        self.assertIsNotNone(trace.wire)
+
+    def test_percentiles(self):
+        tracer = LedsRenderTracer(size=100)
+        for index in range(200):
+            trace = tracer.begin()
+            trace.entry -= index / 1000.0
+            trace.mark_frame()
+            tracer.frame_loaded()
+            tracer.flushed(True, monotonic())
+
+        summary = tracer.get_summary()[u'wire']
+        #only last 100 traces are kept
+        self.assertEqual(summary[u'count'], 100)
+        self.assertAlmostEqual(summary[u'p50'], 149.0, delta=1.0)
+        self.assertAlmostEqual(summary[u'p99'], 198.0, delta=1.0)
+        tracer.reset()
+        self.assertIsNone(tracer.get_summary()[u'wire'][u'p50'])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+import os
+import sys
+import wave
+import tempfile
+sys.path.append('../')
+from backend.audiosource import WavSource
+try:
+    import numpy
+    from backend.vad import VoiceActivityDetector, VadMonitor
+except ImportError:
+    numpy = None
+
+RATE = 16000
+
+def get_voice(duration, amplitude=0.3):
+    """
+    Return voiced sound: harmonics of a 140 Hz fundamental
+    """
+    times = numpy.arange(int(duration * RATE)) / float(RATE)
+    return amplitude / 3.0 * sum(numpy.sin(2.0 * numpy.pi * 140.0 * harmonic * times) / harmonic for harmonic in range(1, 20))
+
+def get_noise(duration, amplitude=0.003, seed=0):
+    return amplitude * numpy.random.RandomState(seed).randn(int(duration * RATE))
+
+def to_stereo(signal):
+    return numpy.repeat((numpy.clip(signal, -1.0, 1.0) * 32767).astype(u'<i2')[:, None], 2, axis=1)
+
+def get_changes(detector, samples, block_frames=512):
+    """
+    Return (time, speech) of speech state changes
+    """
+    changes = []
+    speech = False
+    for start in range(0, len(samples) - block_frames + 1, block_frames):
+        if detector.process(samples[start:start + block_frames])!=speech:
+            speech = not speech
+            changes.append((float(start + block_frames) / RATE, speech))
+    return changes
+
+@unittest.skipIf(numpy is None, u'NumPy is not installed')
+class TestVoiceActivityDetector(unittest.TestCase):
+
+    def setUp(self):
+        self.detector = VoiceActivityDetector(RATE, 512)
+
+    def test_frames(self):
+        #32 ms blocks are split in two 16 ms frames
+        self.assertEqual((self.detector.frames, self.detector.frame_size), (2, 256))
+        self.assertEqual(self.detector.onset_frames, 4)
+        self.assertEqual(self.detector.hangover_frames, 19)
+
+    def test_speech(self):
+        signal = numpy.concatenate([get_noise(1.0), get_voice(1.0) + get_noise(1.0, seed=1), get_noise(1.0, seed=2)])
+        changes = get_changes(self.detector, to_stereo(signal))
+
+        self.assertEqual(len(changes), 2)
+        #onset delay
+        self.assertEqual(changes[0][1], True)
+        self.assertTrue(1.0<changes[0][0]<1.1)
+        #hangover delay
+        self.assertEqual(changes[1][1], False)
+        self.assertTrue(2.25<changes[1][0]<2.4)
+
+    def test_short_pause(self):
+        signal = numpy.concatenate([get_noise(0.5), get_voice(0.5), numpy.zeros(int(0.15 * RATE)), get_voice(0.5), get_noise(1.0)])
+        changes = get_changes(self.detector, to_stereo(signal))
+
+        #pause is shorter than hangover
+        self.assertEqual([speech for _, speech in changes], [True, False])
+
+    def test_loud_noise(self):
+        signal = numpy.concatenate([get_noise(0.5), get_noise(1.0, amplitude=0.2, seed=1)])
+        self.assertEqual(get_changes(self.detector, to_stereo(signal)), [])
+        self.assertGreater(self.detector.flatness, 0.4)
+
+    def test_silence(self):
+        self.assertEqual(get_changes(self.detector, to_stereo(numpy.zeros(RATE))), [])
+
+@unittest.skipIf(numpy is None, u'NumPy is not installed')
+class TestVadMonitor(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mktemp(suffix=u'.wav')
+        signal = numpy.concatenate([get_noise(0.5), get_voice(0.5), get_noise(1.0, seed=1)])
+        wav = wave.open(self.path, 'wb')
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(RATE)
+        wav.writeframes(to_stereo(signal).tobytes())
+        wav.close()
+        self.changes = []
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_run(self):
+        monitor = VadMonitor(WavSource(self.path, block_frames=512), self.changes.append)
+        monitor.start()
+        monitor.join(2.0)
+
+        self.assertEqual(self.changes, [True, False])
+        self.assertEqual(monitor.blocks, 62)
+        self.assertFalse(monitor.is_speech())
+        self.assertGreater(monitor.get_cpu_usage(), 0.0)
+
+if __name__ == "__main__":
+    unittest.main()